@@ -0,0 +1,179 @@
+"""
+In-process cache of parsed session DataFrames.
+
+Entries are keyed by ``(session_id, version)`` so a stale frame can never be
+served after the underlying file changes, and the cache is bounded by the
+approximate in-memory size of the frames it holds (LRU eviction).
+
+Values derived from a frame (quantile sketches, row fingerprints, ...) are
+memoized per version next to it with :meth:`DataFrameCache.derive`, under a
+separate budget of a quarter of ``max_bytes``.
+
+:class:`ResponseCache` keeps whole encoded responses of endpoints that are
+pure functions of a session's data, keyed by the session's content version.
+"""
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Approximate memory footprint of a DataFrame, including object payloads."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+DERIVED_MAX_ENTRIES = 256
+
+
+class DataFrameCache:
+    """Thread-safe LRU cache of DataFrames bounded by total byte size.
+
+    Cached frames are shared between requests and must be treated as
+    read-only by callers; every cleaning function returns a new frame.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (session_id, version) -> (df, nbytes)
+        self._bytes = 0
+        self._derived = OrderedDict()  # (session_id, version, name) -> (value, nbytes)
+        self._derived_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, session_id: str, version) -> pd.DataFrame | None:
+        key = (session_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, session_id: str, version, df: pd.DataFrame):
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            self._drop_session(session_id)
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget: don't flush everything else for it
+                return
+            self._entries[(session_id, version)] = (df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def derive(self, session_id: str, version, name: str, compute):
+        """Return ``compute()`` for this frame version, computing it only once.
+
+        Derived values are kept even when the frame itself was too large to
+        cache, and are dropped with the session's other entries.
+        """
+        key = (session_id, version, name)
+        with self._lock:
+            if key in self._derived:
+                self._derived.move_to_end(key)
+                return self._derived[key][0]
+        value = compute()
+        parts = value if isinstance(value, tuple) else (value,)
+        nbytes = sum(int(getattr(part, "nbytes", 0)) for part in parts)  # arrays; sketches are small
+        with self._lock:
+            if key in self._derived or nbytes > self.max_bytes // 4:
+                return value
+            self._derived[key] = (value, nbytes)
+            self._derived_bytes += nbytes
+            while len(self._derived) > DERIVED_MAX_ENTRIES or self._derived_bytes > self.max_bytes // 4:
+                _, (_, evicted) = self._derived.popitem(last=False)
+                self._derived_bytes -= evicted
+        return value
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._drop_session(session_id)
+
+    def _drop_session(self, session_id: str):
+        for key in [k for k in self._entries if k[0] == session_id]:
+            _, nbytes = self._entries.pop(key)
+            self._bytes -= nbytes
+        for key in [k for k in self._derived if k[0] == session_id]:
+            _, nbytes = self._derived.pop(key)
+            self._derived_bytes -= nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "derived_entries": len(self._derived),
+                "derived_bytes": self._derived_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of encoded API responses bounded by total body size.
+
+    Entries are keyed by ``(session_id, version, key)``, where ``version`` is
+    the session's content version, so a response is never served for data
+    it was not computed from. Values are ``(body, headers)`` pairs.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (session_id, version, key) -> (body, headers)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, version, key):
+        entry_key = (session_id, version, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry
+
+    def put(self, session_id: str, version, key, body: bytes, headers: list):
+        if len(body) > self.max_bytes:
+            return
+        entry_key = (session_id, version, key)
+        with self._lock:
+            if entry_key in self._entries:
+                self._bytes -= len(self._entries.pop(entry_key)[0])
+            self._entries[entry_key] = (body, headers)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                self._bytes -= len(self._entries.pop(key)[0])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -6,9 +6,11 @@ Uses /tmp for ephemeral storage (Vercel serverless constraint).
 import os
 import sys
 import uuid
+import functools
+import hashlib
 import json
-import sqlite3
 import io
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -18,13 +20,29 @@ sys.path.insert(0, os.path.dirname(__file__))
 import pandas as pd
 import numpy as np
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+import baseline
 import cleaning as cl
+import compact
+import jobs
+import paging
+import plan
+import sampling
+import schema
+import storage
 import visualization as viz
-
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+from cache import DataFrameCache, ResponseCache
+from metadata import MetadataStore
+from metrics import Metrics, server_timing
+from parallel import ColumnExecutor
+from stats import StatsStore
+try:
+    import chunked
+except ImportError:  # out-of-core mode needs pyarrow
+    chunked = None
+from storage import build_row_index, iter_batches, load_df, read_rows, read_working_columns, save_working, scan_dtypes, scan_shape, sniff_csv, take_working_rows, write_upload
 
 # In Vercel serverless, /tmp is the only writable directory
 UPLOAD_FOLDER = Path("/tmp/dcb_uploads")
@@ -32,81 +50,391 @@ UPLOAD_FOLDER.mkdir(exist_ok=True)
 DB_PATH = UPLOAD_FOLDER / "metadata.db"
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 
+app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_FILE_SIZE + 1024 * 1024  # + multipart framing
+CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["ETag", "Server-Timing"])
+DF_CACHE_MAX_BYTES = 256 * 1024 * 1024  # per warm serverless instance
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # encoded summary / chart / report responses
+CHUNKED_MIN_BYTES = MAX_FILE_SIZE // 4  # working files this large are cleaned out of core
+HEATMAP_MAX_ROWS = 1000  # upper bound for ?heatmap_rows
+SAMPLE_MAX_ROWS = 1_000_000  # upper bound for ?sample
+SAMPLE_CONFIDENCE = 0.95  # level of the intervals of sampled estimates
+PREVIEW_MAX_ROWS = 1000  # upper bound for ?limit
+APPROX_MIN_ROWS = 1_000_000  # frames this long use quantile sketches for IQR statistics
+QUANTILE_EPSILON = 0.005  # rank error bound of those sketches
+PARALLEL_WORKERS = os.cpu_count() or 1  # workers for per-column statistics; 1 runs them serially
+PARALLEL_BACKEND = "thread"  # thread | process | serial (see parallel.py)
+JOB_WORKERS = 0  # jobs run inside the submitting request: the instance is frozen after each response
+TIMING_HEADER = "X-Server-Timing"  # requests sending "1" get a Server-Timing header of their spans
+
+df_cache = DataFrameCache(DF_CACHE_MAX_BYTES)
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+column_executor = ColumnExecutor(PARALLEL_WORKERS, PARALLEL_BACKEND)
+stats_store = StatsStore(column_executor)
+
+
+# ─── Instrumentation ───────────────────────────────────────────────────────────
+metrics = Metrics()
+metrics.instrument(cl, "cleaning")
+metrics.instrument(viz, "visualization", exclude=("safe_float",))
+metrics.instrument(plan, "plan", names=("execute",))
+metrics.instrument(sampling, "sampling", names=("draw",))
+metrics.instrument(schema, "schema", names=("optimize", "apply"))
+metrics.instrument(paging, "paging", names=("row_order", "records_json"))
+metrics.instrument(compact, "compact", names=("frame_table", "compress"))
+if chunked is not None:
+    metrics.instrument(chunked, "chunked", names=("clean_file",))
+metrics.instrument(storage, "storage", names=("load_df", "save_df", "read_working", "save_working", "scan_shape", "scan_dtypes", "build_row_index", "read_rows", "read_working_columns", "take_working_rows"))
+# Imported by name above, before they were wrapped
+load_df, save_working, scan_shape, scan_dtypes, build_row_index = storage.load_df, storage.save_working, storage.scan_shape, storage.scan_dtypes, storage.build_row_index
+read_rows, read_working_columns, take_working_rows = storage.read_rows, storage.read_working_columns, storage.take_working_rows
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with serialization timed as the ``serialize.json`` span."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with metrics.span("serialize.json") as span:
+            text = super().dumps(obj, **kwargs)
+            span["bytes_out"] = len(text)
+        return text
+
+
+app.json = TimedJSONProvider(app)
+
 
 # ─── DB helpers ────────────────────────────────────────────────────────────────
-def get_db():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
+metadata = MetadataStore(DB_PATH)
+metadata.migrate()
 
 
-def init_db():
-    conn = get_db()
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            original_filename TEXT,
-            upload_time TEXT,
-            original_path TEXT,
-            cleaned_path TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+# ─── Utility ───────────────────────────────────────────────────────────────────
+def get_session(session_id: str):
+    return metadata.get_session(session_id)
 
 
-init_db()
+def column_types(session: dict) -> dict | None:
+    """Column types chosen when the session's data was first parsed (schema.py)."""
+    return json.loads(session["schema"]) if session.get("schema") else None
 
 
-# ─── Utility ───────────────────────────────────────────────────────────────────
-def load_df(path: str) -> pd.DataFrame:
-    if path.endswith(".xlsx") or path.endswith(".xls"):
-        return pd.read_excel(path)
-    encodings = ["utf-8", "utf-8-sig", "latin-1", "cp1252", "iso-8859-1"]
-    for enc in encodings:
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except (UnicodeDecodeError, Exception):
-            continue
-    return pd.read_csv(path, encoding="latin-1", on_bad_lines="skip")
+def apply_schema(session: dict, df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` in the session's column types; the first frame parsed for a session chooses them."""
+    types = column_types(session)
+    if types is not None:
+        return schema.apply(df, types)
+    df, types, _ = schema.optimize(df)
+    session["schema"] = json.dumps(types)
+    metadata.update_session(session["session_id"], schema=session["schema"])
+    return df
 
 
-def save_df(df: pd.DataFrame, path: str):
-    if path.endswith(".xlsx"):
-        df.to_excel(path, index=False)
-    else:
-        df.to_csv(path, index=False)
+def load_original(session: dict) -> pd.DataFrame:
+    options = json.loads(session["csv_options"]) if session.get("csv_options") else None
+    return apply_schema(session, load_df(session["original_path"], options))
 
 
-def get_session(session_id: str):
-    conn = get_db()
-    row = conn.execute("SELECT * FROM sessions WHERE session_id=?", (session_id,)).fetchone()
-    conn.close()
-    return dict(row) if row else None
+def file_version(path: str) -> tuple:
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def current_source(session: dict) -> tuple:
+    cleaned = session["cleaned_path"]
+    if cleaned and os.path.exists(cleaned):
+        return cleaned, None
+    return session["original_path"], (json.loads(session["csv_options"]) if session.get("csv_options") else None)
+
+
+def pending_steps(session: dict) -> list:
+    """Steps queued with ?execution=lazy that have not run yet."""
+    return json.loads(session["pending_steps"]) if session.get("pending_steps") else []
+
+
+def set_pending_steps(session_id: str, steps: list):
+    metadata.update_session(session_id, bump_version=True, pending_steps=json.dumps(steps) if steps else None)
+    response_cache.invalidate(session_id)
+
+
+def load_working(session: dict) -> pd.DataFrame:
+    """Cached saved working frame, without queued lazy steps — shared, do not mutate."""
+    path, options = current_source(session)
+    version = file_version(path)
+    df = df_cache.get(session["session_id"], version)
+    if df is None:
+        df = apply_schema(session, load_df(path, options))
+        df_cache.put(session["session_id"], version, df)
+    return df
 
 
 def get_current_df(session_id: str) -> pd.DataFrame:
+    """Working frame with queued lazy steps applied (once, then saved) — shared, do not mutate."""
     session = get_session(session_id)
     if not session:
         raise ValueError("Session not found")
-    cleaned = session["cleaned_path"]
-    if cleaned and os.path.exists(cleaned):
-        return load_df(cleaned)
-    return load_df(session["original_path"])
+    df = load_working(session)
+    steps = pending_steps(session)
+    if not steps:
+        return df
+    cleaned, _, changed = plan.execute(df, steps, QUANTILE_EPSILON if use_approx(df) else None)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, changed))
+    set_pending_steps(session_id, [])
+    return load_working(get_session(session_id))
+
 
+def set_cleaned_path(session_id: str, path: str, row_count: int | None = None, dtypes: dict | None = None):
+    metadata.update_session(session_id, bump_version=True, cleaned_path=path, row_count=row_count, dtypes=json.dumps(dtypes) if dtypes else None)
+    response_cache.invalidate(session_id)
 
-def save_cleaned(df: pd.DataFrame, session_id: str, ext: str = ".csv"):
-    path = str(UPLOAD_FOLDER / f"{session_id}_cleaned{ext}")
-    save_df(df, path)
-    conn = get_db()
-    conn.execute("UPDATE sessions SET cleaned_path=? WHERE session_id=?", (path, session_id))
-    conn.commit()
-    conn.close()
+
+def content_version(session_id: str) -> int:
+    """Counter bumped whenever the session's data changes: saves, queued steps and resets."""
+    session = get_session(session_id)
+    return (session["version"] or 0) if session else 0
+
+
+def response_etag(session_id: str, version: int, path: str, args: dict) -> str:
+    params = sorted((name, str(value)) for name, value in args.items() if name != "session_id")
+    return f"{version}-{hashlib.sha1(json.dumps([session_id, path, params]).encode()).hexdigest()[:16]}"
+
+
+def not_modified(etag: str):
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_response(view):
+    """Serve a pure function of the session's data from ``response_cache``, with a weak ETag of the data version (If-None-Match → 304)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        session_id = request.args.get("session_id")
+        if not get_session(session_id):
+            return view(*args, **kwargs)
+        version = content_version(session_id)
+        etag = response_etag(session_id, version, request.path, request.args)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        encoding = compact.accepted_encoding(request.headers.get("Accept-Encoding", ""), compact.COMPRESS_MIN_BYTES)
+        key = (request.path, json.dumps(sorted(request.args.items(multi=True))), encoding)
+        entry = response_cache.get(session_id, version, key)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response.direct_passthrough = False
+            version = content_version(session_id)  # queued lazy steps run inside the view and bump it
+            etag = response_etag(session_id, version, request.path, request.args)
+            entry = (response.get_data(), [(name, value) for name, value in response.headers if name not in ("ETag", "Cache-Control", "Content-Length")])
+            response_cache.put(session_id, version, key, *entry)
+        response = app.response_class(entry[0], headers=entry[1])
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return wrapper
+
+
+def save_cleaned(df: pd.DataFrame, session_id: str, delta: dict | None = None):
+    """Write the working copy through to the cache; ``delta`` (cl.operation_delta) carries column statistics over."""
+    session = get_session(session_id)
+    old_version = file_version(current_source(session)[0])
+    df = apply_schema(session, df.reset_index(drop=True))
+    path = save_working(df, str(UPLOAD_FOLDER / f"{session_id}_cleaned"))
+    version = file_version(path)
+    df_cache.put(session_id, version, df)
+    if delta is None:
+        stats_store.invalidate(session_id)
+    else:
+        stats_store.advance(session_id, old_version, version, delta, df)
+    set_cleaned_path(session_id, path, len(df), {str(c): str(t) for c, t in df.dtypes.items()})
     return path
 
 
-def df_to_json_safe(df: pd.DataFrame) -> list:
-    return json.loads(df.head(200).to_json(orient="records", default_handler=str))
+def get_stats(session_id: str):
+    """Column statistics (stats.FrameStats) of the session's current working copy."""
+    return stats_store.get(session_id, file_version(current_source(get_session(session_id))[0]))
+
+
+def use_chunked(session_id: str) -> bool:
+    """?execution=chunked|memory forces a mode (lazy queues instead); otherwise large files stream out of core."""
+    execution = request.args.get("execution")
+    if chunked is None or execution in ("memory", "lazy"):
+        return False
+    session = get_session(session_id)
+    if not session:
+        return False
+    if execution == "chunked":
+        return True
+    return os.path.getsize(current_source(session)[0]) >= CHUNKED_MIN_BYTES
+
+
+def use_approx(df: pd.DataFrame) -> bool:
+    """?approx=1|0 forces a mode; otherwise frames of APPROX_MIN_ROWS or more use quantile sketches."""
+    approx = request.args.get("approx")
+    return approx == "1" or (approx != "0" and len(df) >= APPROX_MIN_ROWS)
+
+
+def get_sketches(session_id: str, df: pd.DataFrame) -> dict | None:
+    """Quantile sketches when use_approx(df), built once per file version."""
+    if not use_approx(df):
+        return None
+    return df_cache.derive(session_id, file_version(current_source(get_session(session_id))[0]), "sketches", lambda: cl.build_sketches(df, QUANTILE_EPSILON))
+
+
+def get_fingerprints(session_id: str, df: pd.DataFrame, path: str | None = None, subset: list | None = None, near: bool = False):
+    """Row fingerprints of a session frame (loaded from ``path``, default the working copy), computed once per file version."""
+    path = path or current_source(get_session(session_id))[0]
+    return df_cache.derive(session_id, file_version(path), ("fingerprints", tuple(subset) if subset else None, near), lambda: cl.row_fingerprints(df, subset, near))
+
+
+def sample_size() -> int | None:
+    """Rows asked for with ``?sample=N`` (see sampling.py); None for exact statistics."""
+    size = request.args.get("sample", type=int)
+    return min(size, SAMPLE_MAX_ROWS) if size and size > 0 else None
+
+
+def get_sample(session_id: str, size: int) -> sampling.Sample:
+    """Uniform row sample of the working data (queued steps applied), drawn once per file version."""
+    session = get_session(session_id)
+    if not session:
+        raise ValueError("Session not found")
+    if pending_steps(session):
+        get_current_df(session_id)
+        session = get_session(session_id)
+    path = current_source(session)[0]
+    version = file_version(path)
+
+    def draw():
+        df, total = df_cache.get(session_id, version), session["row_count"]
+        if df is None and total is not None and path.endswith(".feather"):
+            return sampling.Sample(take_working_rows(path, sampling.sample_positions(total, size)), total)
+        return sampling.draw(load_working(session) if df is None else df, size)
+    return df_cache.derive(session_id, version, ("sample", size), draw)
+
+
+def baseline_path(session_id: str) -> str:
+    return str(UPLOAD_FOLDER / f"{session_id}_baseline.npz")
+
+
+def save_baseline(session_id: str, df: pd.DataFrame, path: str) -> dict:
+    """Profile the original upload ``df`` (parsed from ``path``) and store it with the session."""
+    profile = baseline.build_baseline(df, get_fingerprints(session_id, df, path))
+    baseline.save_patterns(baseline_path(session_id), *viz.missing_patterns(df))
+    metadata.update_session(session_id, baseline=json.dumps(profile))
+    return profile
+
+
+def get_baseline(session: dict) -> tuple:
+    """``(profile, labels, patterns)`` of the original upload (see baseline.py), built on first use since the upload only streams the file."""
+    session_id, path = session["session_id"], baseline_path(session["session_id"])
+    if session.get("baseline") and os.path.exists(path):
+        profile = json.loads(session["baseline"])
+    else:
+        profile = save_baseline(session_id, load_original(session), session["original_path"])
+    labels, patterns = df_cache.derive(session_id, file_version(path), "baseline", lambda: baseline.load_patterns(path))
+    return profile, labels, patterns
+
+
+def clean_chunked(session_id: str, operation: str, **params) -> dict:
+    """Stream one operation into a new working copy, after any queued lazy steps."""
+    queued = pending_steps(get_session(session_id))
+    if queued:
+        set_pending_steps(session_id, [])
+        for step in queued:
+            queued_operation, queued_params = CHUNKED_PIPELINE_OPS[step["op"]](step)
+            clean_chunked(session_id, queued_operation, **queued_params)
+    session = get_session(session_id)
+    path, options = current_source(session)
+    result = chunked.clean_file(path, str(UPLOAD_FOLDER / f"{session_id}_cleaned"), operation, options,
+                                column_types=column_types(session), **params)
+    df_cache.invalidate(session_id)
+    stats_store.invalidate(session_id)
+    set_cleaned_path(session_id, result["path"], result["after"]["rows"])
+    return result
+
+
+def use_lazy() -> bool:
+    return request.args.get("execution") == "lazy"
+
+
+def queue_steps(session_id: str, steps) -> tuple:
+    """Validate steps and append them to the session's lazy plan; they run when the data is next read."""
+    session = get_session(session_id)
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+    path, options = current_source(session)
+    head = next(iter_batches(path, options, 1), None)
+    try:
+        steps = cl.parse_pipeline(steps, [] if head is None else list(head.columns))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    pending = pending_steps(session) + steps
+    set_pending_steps(session_id, pending)
+    return jsonify({"message": f"{len(steps)} step(s) queued; they run when the data is next read.",
+                    "pending": pending, "plan": plan.optimize(pending), "execution": "lazy"})
+
+
+def use_columnar() -> bool:
+    return request.args.get("format") == "columnar"  # tables as column arrays (see compact.py)
+
+
+def json_text_response(body: str):
+    """Response carrying JSON text, compressed when the client accepts it and it is large."""
+    data = body.encode()
+    encoding = compact.accepted_encoding(request.headers.get("Accept-Encoding", ""), len(data))
+    response = app.response_class(compact.compress(data, encoding) if encoding else data, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compact_response(payload: dict):
+    if use_columnar():
+        with metrics.span("serialize.columnar"):
+            payload = compact.columnar(payload)
+    return json_text_response(app.json.dumps(payload))
+
+
+def row_source(session: dict) -> tuple:
+    """``(frame, None)`` when the saved data is in memory or has no random access, else ``(None, row_index)``."""
+    path, options = current_source(session)
+    version = file_version(path)
+    df = df_cache.get(session["session_id"], version)
+    if df is not None:
+        return df, None
+    index = df_cache.derive(session["session_id"], version, "row_index", lambda: build_row_index(path, options))
+    return (load_working(session), None) if index is None else (None, index)
+
+
+def page_types(session: dict, path: str, options) -> dict | None:
+    """Types CSV preview pages are parsed into: the session's schema, or before one exists the whole-file types from one streamed pass."""
+    if not path.endswith(".csv"):
+        return None
+    return column_types(session) or df_cache.derive(session["session_id"], file_version(path), "csv_dtypes", lambda: scan_dtypes(path, options))
+
+
+def preview_window(session: dict, df, index, start: int, stop: int, columns, filters: list, sort, descending: bool) -> tuple:
+    """``(rows [start, stop) after filters and sort, total_rows)``: sliced in memory, read through the row index, or taken from Feather by position."""
+    session_id = session["session_id"]
+    path, options = current_source(session)
+    version = file_version(path)
+    if index is not None and not (filters or sort):
+        return read_rows(path, options, index, start, stop, columns, page_types(session, path, options)), index.rows
+    key = ("preview_order", json.dumps(filters), sort, descending)
+    if index is not None and path.endswith(".feather"):
+        keys = paging.key_columns(filters, sort)
+        order = df_cache.derive(session_id, version, key, lambda: paging.row_order(read_working_columns(path, keys), filters, sort, descending))
+        return take_working_rows(path, order[start:stop], columns), len(order)
+    if df is None:
+        df = load_working(session)
+    if filters or sort:
+        order = df_cache.derive(session_id, version, key, lambda: paging.row_order(df, filters, sort, descending))
+        window, total_rows = df.iloc[order[start:stop]], len(order)
+    else:
+        window, total_rows = df.iloc[start:stop], len(df)
+    return (window if columns is None else window[columns]), total_rows
 
 
 # ─── Endpoints ─────────────────────────────────────────────────────────────────
@@ -120,57 +448,102 @@ def upload():
     ext = Path(file.filename).suffix.lower()
     if ext not in (".csv", ".xlsx", ".xls"):
         return jsonify({"error": "Only CSV and XLSX files are supported"}), 400
-    content = file.read()
-    if len(content) > MAX_FILE_SIZE:
-        return jsonify({"error": "File size exceeds 50 MB limit"}), 400
     session_id = str(uuid.uuid4())
     save_path = str(UPLOAD_FOLDER / f"{session_id}_original{ext}")
-    with open(save_path, "wb") as f:
-        f.write(content)
     try:
-        df = load_df(save_path)
+        file_size = write_upload(file.stream, save_path, MAX_FILE_SIZE)
+    except ValueError:
+        return jsonify({"error": "File size exceeds 50 MB limit"}), 400
+    try:
+        csv_options = sniff_csv(save_path) if ext == ".csv" else None
+        rows, column_names, csv_options = scan_shape(save_path, csv_options)
     except Exception as e:
+        os.remove(save_path)
         return jsonify({"error": f"Could not parse file: {str(e)}"}), 400
-    conn = get_db()
-    conn.execute("INSERT INTO sessions VALUES (?,?,?,?,?)",
-                 (session_id, file.filename, datetime.utcnow().isoformat(), save_path, None))
-    conn.commit()
-    conn.close()
+    metadata.create_session(session_id, original_filename=file.filename, original_path=save_path,
+                            csv_options=json.dumps(csv_options) if csv_options else None, file_size=file_size, row_count=rows)
     return jsonify({"session_id": session_id, "filename": file.filename,
-                    "rows": df.shape[0], "columns": df.shape[1], "column_names": df.columns.tolist()})
+                    "rows": rows, "columns": len(column_names), "column_names": column_names})
 
 
 @app.route("/api/preview", methods=["GET"])
 def preview():
+    """Window ``?offset=&limit=`` (``n`` = limit) of the current rows, ``?columns=`` projected, ``?sort=&order=desc`` sorted, ``?filters=`` (JSON list) filtered; ``?format=columnar`` sends column arrays."""
     session_id = request.args.get("session_id")
-    n = int(request.args.get("n", 50))
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = max(0, min(request.args.get("limit", request.args.get("n", 50, type=int), type=int), PREVIEW_MAX_ROWS))
+    columns = request.args.get("columns").split(",") if request.args.get("columns") else None  # projection
+    sort, descending = request.args.get("sort") or None, request.args.get("order", "asc") == "desc"
+    session = get_session(session_id)
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+    steps = pending_steps(session)
+    df, index = (load_working(session), None) if steps else row_source(session)
+    all_columns = df.columns.tolist() if df is not None else index.columns
+    unknown = [c for c in (columns or []) + ([sort] if sort else []) if c not in all_columns]
+    if unknown:
+        return jsonify({"error": f"Unknown columns: {', '.join(map(str, unknown))}"}), 400
     try:
-        df = get_current_df(session_id)
+        filters = paging.parse_filters(request.args.get("filters"), all_columns)
+        if steps:  # evaluate only the rows shown; the working copy is left as is
+            epsilon = QUANTILE_EPSILON if use_approx(df) else None
+            if filters or sort:  # needs every row of the result, too big to cache
+                result, _, _ = plan.execute(df, steps, epsilon)
+                order = paging.row_order(result, filters, sort, descending)
+                window, total_rows = result.iloc[order[offset:offset + limit]], len(order)
+                window = (window if columns is None else window[columns]).set_axis(order[offset:offset + limit])
+            else:
+                key = ("preview", json.dumps(steps), epsilon, offset + limit, tuple(columns) if columns else None)
+                result, total_rows, _ = df_cache.derive(session_id, file_version(current_source(session)[0]), key, lambda: plan.execute(df, steps, epsilon, head=offset + limit, columns=columns))
+                window = result.iloc[offset:].set_axis(pd.RangeIndex(offset, max(offset, len(result))))
+        else:
+            window, total_rows = preview_window(session, df, index, offset, offset + limit, columns, filters, sort, descending)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 404
-    return jsonify({"rows": df_to_json_safe(df.head(n)), "columns": df.columns.tolist(),
-                    "total_rows": len(df), "total_columns": df.shape[1]})
+        return jsonify({"error": str(e)}), 400
+    body = paging.json_object({"columns": [str(c) for c in window.columns], "offset": offset, "limit": limit, "total_rows": int(total_rows),
+                               "total_columns": len(all_columns), "pending_steps": len(steps)},
+                              rows=compact.frame_table(window) if use_columnar() else paging.records_json(window),
+                              row_numbers=json.dumps(window.index.tolist()))
+    return json_text_response(body)
 
 
 @app.route("/api/summary", methods=["GET"])
+@cached_response
 def summary():
     session_id = request.args.get("session_id")
+    size = sample_size()
     try:
+        sample = get_sample(session_id, size) if size else None
+        if sample is not None and not sample.exact:
+            return sampled_summary(sample)
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
-    missing = cl.detect_missing(df)
-    duplicates = cl.detect_duplicates(df)
-    outliers = cl.detect_outliers(df)
-    quality = cl.compute_quality_score(df)
-    insights = cl.generate_insights(df, quality)
-    suggestions = cl.get_suggested_actions(df)
-    dtypes = cl.get_data_types_summary(df)
-    describe_raw = df.describe(include="all").to_dict()
-    describe_safe = {col: {k: (None if (isinstance(v, float) and np.isnan(v)) else v) for k, v in vd.items()} for col, vd in describe_raw.items()}
-    return jsonify({"missing": missing, "duplicates": duplicates, "outliers": outliers,
+    stats = get_stats(session_id)
+    profile = cl.build_profile(df, get_sketches(session_id, df), get_fingerprints(session_id, df), stats.null_counts(df), column_executor)
+    quality = profile["quality"]
+    insights = cl.generate_insights(df, quality, profile)
+    suggestions = cl.get_suggested_actions(df, profile)
+    dtypes = cl.get_data_types_summary(df, stats.unique_counts(df))
+    return compact_response({"missing": profile["missing"], "duplicates": profile["duplicates"], "outliers": profile["outliers"],
                     "quality": quality, "insights": insights, "suggestions": suggestions,
-                    "data_types": dtypes, "describe": describe_safe, "rows": df.shape[0], "columns": df.shape[1]})
+                    "data_types": dtypes, "describe": describe_json(stats.describe(df)), "rows": df.shape[0], "columns": df.shape[1]})
+
+
+def describe_json(describe: pd.DataFrame) -> dict:
+    """``describe()`` output by column, made JSON-safe (NaN as None)."""
+    return {col: {k: (None if (isinstance(v, float) and np.isnan(v)) else v) for k, v in vd.items()} for col, vd in describe.to_dict().items()}
+
+
+def sampled_summary(sample: sampling.Sample):
+    """The summary of a row sample, with counts and the quality score estimated for the whole frame."""
+    df = sample.frame
+    profile = sampling.estimate_profile(cl.build_profile(df, executor=column_executor), sample, SAMPLE_CONFIDENCE)
+    return compact_response({"missing": profile["missing"], "duplicates": profile["duplicates"], "outliers": profile["outliers"],
+                    "quality": profile["quality"], "insights": cl.generate_insights(df, profile["quality"], profile),
+                    "suggestions": cl.get_suggested_actions(df, profile), "data_types": cl.get_data_types_summary(df, executor=column_executor),
+                    "describe": describe_json(df.describe(include="all")), "rows": sample.total, "columns": df.shape[1],
+                    "sample": sample.info(SAMPLE_CONFIDENCE, exact_job="summary", approximate=["missing", "duplicates", "outliers", "quality", "insights", "suggestions", "data_types", "describe"])})
 
 
 @app.route("/api/clean/missing", methods=["POST"])
@@ -178,116 +551,249 @@ def clean_missing():
     session_id = request.args.get("session_id")
     data = request.get_json(silent=True) or {}
     strategy = data.get("strategy", "mean")
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "missing", "strategy": strategy}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "drop_missing" if strategy == "drop" else "fill_missing", strategy=strategy)
+        return jsonify({"message": f"Missing values handled using '{strategy}' strategy.",
+                        "before": result["before"], "after": result["after"], "fill_values": result.get("fill_values", {}), "execution": "chunked"})
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     before_missing = int(df.isnull().sum().sum())
     before_rows = len(df)
-    cleaned = cl.drop_missing(df) if strategy == "drop" else cl.fill_missing(df, strategy)
-    save_cleaned(cleaned, session_id)
+    fill_values = {} if strategy == "drop" else cl.compute_fill_values(df, strategy)
+    cleaned = cl.drop_missing(df) if strategy == "drop" else cl.fill_missing(df, strategy, fill_values)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, list(fill_values)))
     return jsonify({"message": f"Missing values handled using '{strategy}' strategy.",
                     "before": {"missing": before_missing, "rows": before_rows},
-                    "after": {"missing": int(cleaned.isnull().sum().sum()), "rows": len(cleaned)}})
+                    "after": {"missing": int(cleaned.isnull().sum().sum()), "rows": len(cleaned)},
+                    "fill_values": fill_values})
 
 
 @app.route("/api/clean/duplicates", methods=["POST"])
 def clean_duplicates():
     session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    subset, near = data.get("subset") or None, bool(data.get("near", False))  # row key columns; ignore case/whitespace/float noise
+    if subset is not None and not isinstance(subset, list):
+        return jsonify({"error": "subset must be a list of column names"}), 400
+    message = "Near-duplicate rows removed." if near else "Duplicate rows removed."
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "duplicates", "subset": subset, "near": near}])
+    if use_chunked(session_id):
+        try:
+            result = clean_chunked(session_id, "remove_duplicates", subset=subset, near=near)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"message": message, "before": {"duplicates": result["removed_rows"], "rows": result["before"]["rows"]},
+                        "after": {"duplicates": 0, "rows": result["after"]["rows"]}, "execution": "chunked"})
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
-    before = int(df.duplicated().sum())
-    cleaned = cl.remove_duplicates(df)
-    save_cleaned(cleaned, session_id)
-    return jsonify({"message": "Duplicate rows removed.", "before": {"duplicates": before, "rows": len(df)}, "after": {"duplicates": 0, "rows": len(cleaned)}})
+    unknown = [c for c in subset or [] if c not in df.columns]
+    if unknown:
+        return jsonify({"error": f"Unknown columns: {', '.join(map(str, unknown))}"}), 400
+    fingerprints = get_fingerprints(session_id, df, subset=subset, near=near)
+    before = int(cl.duplicate_mask(fingerprints).sum())
+    cleaned = cl.remove_duplicates(df, fingerprints=fingerprints)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned))
+    return jsonify({"message": message, "before": {"duplicates": before, "rows": len(df)}, "after": {"duplicates": 0, "rows": len(cleaned)}})
 
 
 @app.route("/api/clean/outliers", methods=["POST"])
 def clean_outliers():
     session_id = request.args.get("session_id")
+    mode = (request.get_json(silent=True) or {}).get("mode", "drop")  # drop | clip
+    if mode not in ("drop", "clip"):
+        return jsonify({"error": "mode must be 'drop' or 'clip'"}), 400
+    message = "Outliers capped to the IQR fences (winsorized)." if mode == "clip" else "Outliers removed using IQR method."
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "outliers", "mode": mode}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "remove_outliers", mode=mode)
+        return jsonify({"message": message, "before": {"outliers": result["outliers"], "rows": result["before"]["rows"]},
+                        "after": {"outliers": 0, "rows": result["after"]["rows"]}, "execution": "chunked"})
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
-    oi = cl.detect_outliers(df)
-    cleaned = cl.remove_outliers(df)
-    save_cleaned(cleaned, session_id)
-    return jsonify({"message": "Outliers removed using IQR method.", "before": {"outliers": oi["total_outliers"], "rows": len(df)}, "after": {"outliers": 0, "rows": len(cleaned)}})
+    sketches = get_sketches(session_id, df)
+    oi = cl.detect_outliers(df, sketches=sketches)
+    cleaned = cl.remove_outliers(df, mode, sketches)
+    capped = [col for col, info in oi["outliers_per_column"].items() if info["count"]] if mode == "clip" else []
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, capped))
+    return jsonify({"message": message, "before": {"outliers": oi["total_outliers"], "rows": len(df)}, "after": {"outliers": 0, "rows": len(cleaned)}})
 
 
 @app.route("/api/clean/normalize", methods=["POST"])
 def clean_normalize():
     session_id = request.args.get("session_id")
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "normalize"}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "normalize")
+        return jsonify({"message": "Numeric columns normalized (Min-Max scaling).", "rows": result["after"]["rows"], "columns": result["columns"], "execution": "chunked"})
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     cleaned = cl.normalize_data(df)
-    save_cleaned(cleaned, session_id)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, df.select_dtypes(include=[np.number]).columns))
     return jsonify({"message": "Numeric columns normalized (Min-Max scaling).", "rows": len(cleaned), "columns": cleaned.shape[1]})
 
 
 @app.route("/api/clean/standardize", methods=["POST"])
 def clean_standardize():
     session_id = request.args.get("session_id")
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "standardize"}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "standardize")
+        return jsonify({"message": "Numeric columns standardized (Z-score scaling).", "rows": result["after"]["rows"], "columns": result["columns"], "execution": "chunked"})
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     cleaned = cl.standardize_columns(df)
-    save_cleaned(cleaned, session_id)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, df.select_dtypes(include=[np.number]).columns))
     return jsonify({"message": "Numeric columns standardized (Z-score scaling).", "rows": len(cleaned), "columns": cleaned.shape[1]})
 
 
+CHUNKED_PIPELINE_OPS = {
+    "missing": lambda step: ("drop_missing" if step["strategy"] == "drop" else "fill_missing", {"strategy": step["strategy"]}),
+    "duplicates": lambda step: ("remove_duplicates", {"subset": step["subset"], "near": step["near"]}),
+    "outliers": lambda step: ("remove_outliers", {"mode": step["mode"]}),
+    "normalize": lambda step: ("normalize", {}),
+    "standardize": lambda step: ("standardize", {}),
+}
+
+
+@app.route("/api/clean/pipeline", methods=["POST"])
+def clean_pipeline():
+    """Body ``{"steps": [{"op": ..., params}, ...]}``; in memory the steps share one frame and the result is written once (?execution=lazy queues them)."""
+    session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    if use_lazy():
+        return queue_steps(session_id, data.get("steps"))
+    start = time.perf_counter()
+    if use_chunked(session_id):
+        path, options = current_source(get_session(session_id))
+        head = next(iter_batches(path, options, 1), None)
+        try:
+            steps = cl.parse_pipeline(data.get("steps"), [] if head is None else list(head.columns))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        report = []
+        for i, step in enumerate(steps):
+            jobs.report(i / len(steps), f"{i}/{len(steps)} steps done")
+            operation, params = CHUNKED_PIPELINE_OPS[step["op"]](step)
+            step_start = time.perf_counter()
+            result = clean_chunked(session_id, operation, **params)
+            entry = {**step, "ms": round((time.perf_counter() - step_start) * 1000, 2), "before": result["before"], "after": result["after"]}
+            if step["op"] == "missing": entry["fill_values"] = result.get("fill_values", {})
+            elif step["op"] == "duplicates": entry["duplicates"] = result["removed_rows"]
+            elif step["op"] == "outliers": entry["outliers"] = result["outliers"]
+            report.append(entry)
+        return jsonify({"message": f"Pipeline of {len(steps)} steps applied.", "steps": report, "before": report[0]["before"], "after": report[-1]["after"],
+                        "ms": round((time.perf_counter() - start) * 1000, 2), "execution": "chunked"})
+    try:
+        df = get_current_df(session_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    try:
+        steps = cl.parse_pipeline(data.get("steps"), df.columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cleaned, report, changed = cl.run_pipeline(df, steps, QUANTILE_EPSILON if use_approx(df) else None,
+                                               progress=lambda done, total: jobs.report(done / total, f"{done}/{total} steps done"))
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, changed))
+    return jsonify({"message": f"Pipeline of {len(steps)} steps applied.", "steps": report, "before": report[0]["before"], "after": report[-1]["after"],
+                    "ms": round((time.perf_counter() - start) * 1000, 2)})
+
+
 @app.route("/api/visualize", methods=["GET"])
+@cached_response
 def visualize():
     session_id = request.args.get("session_id")
+    heatmap_rows = max(0, min(request.args.get("heatmap_rows", 100, type=int), HEATMAP_MAX_ROWS))
+    heatmap_strategy, heatmap_encoding = request.args.get("heatmap_strategy", "head"), request.args.get("heatmap_encoding", "rle")
+    if heatmap_strategy not in viz.HEATMAP_STRATEGIES or heatmap_encoding not in viz.HEATMAP_ENCODINGS:
+        return jsonify({"error": "Unknown heatmap_strategy or heatmap_encoding"}), 400
     try:
         session = get_session(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
-        original_df = load_df(session["original_path"])
+        original, labels, patterns = get_baseline(session)  # the original upload, through its stored baseline
+        heatmap = viz.pattern_heatmap(original["columns"], labels, patterns, heatmap_rows, heatmap_strategy, heatmap_encoding)
+        size = sample_size()
+        current = get_sample(session_id, size) if size else None
+        if current is not None and not current.exact:
+            return sampled_charts(current, original, heatmap)
         current_df = get_current_df(session_id)
+        stats = get_stats(session_id)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    return jsonify({"bar_charts": viz.bar_chart_data(current_df), "histograms": viz.histogram_data(current_df),
-                    "boxplots": viz.boxplot_data(current_df), "correlation": viz.correlation_matrix(current_df),
-                    "missing_heatmap": viz.missing_heatmap(original_df), "before_after": viz.before_after_comparison(original_df, current_df)})
+    current_counts = viz.frame_counts(current_df, get_fingerprints(session_id, current_df), stats.null_counts(current_df))
+    return compact_response({"bar_charts": viz.bar_chart_data(current_df, stats), "histograms": viz.histogram_data(current_df, stats=stats),
+                    "original_histograms": original["histograms"],
+                    "boxplots": viz.boxplot_data(current_df, get_sketches(session_id, current_df), column_executor), "correlation": viz.correlation_matrix(current_df, stats),
+                    "missing_heatmap": heatmap, "before_after": viz.before_after_chart(original, current_counts)})
+
+
+def sampled_charts(current: sampling.Sample, original: dict, heatmap: dict):
+    """The charts of a row sample of the current data, with whole-frame estimates; ``original`` (the baseline) and the heatmap are exact."""
+    df = current.frame
+    return compact_response({"bar_charts": sampling.estimate_bar_charts(viz.bar_chart_data(df), current, SAMPLE_CONFIDENCE),
+                    "histograms": sampling.estimate_histograms(viz.histogram_data(df, executor=column_executor), current, SAMPLE_CONFIDENCE),
+                    "original_histograms": original["histograms"],
+                    "boxplots": sampling.estimate_boxplots(viz.boxplot_data(df, executor=column_executor), current, SAMPLE_CONFIDENCE),
+                    "correlation": sampling.estimate_correlation(viz.correlation_matrix(df), current, SAMPLE_CONFIDENCE), "missing_heatmap": heatmap,
+                    "before_after": sampling.estimate_before_after(viz.before_after_chart(original, viz.frame_counts(df)), current, SAMPLE_CONFIDENCE),
+                    "sample": current.info(SAMPLE_CONFIDENCE, exact_job="visualize",
+                                           approximate=["bar_charts", "histograms", "boxplots", "correlation", "before_after"])})
+
+
+EXPORT_MIMETYPES = {"csv": "text/csv", "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+
+
+def write_export(df: pd.DataFrame, fmt: str, target):
+    """Write ``df`` as CSV or Excel to a path or binary buffer."""
+    with metrics.span(f"serialize.{fmt}", rows=len(df), columns=df.shape[1]):
+        if fmt == "xlsx":
+            df.to_excel(target, index=False)
+        else:
+            df.to_csv(target, index=False)
 
 
 @app.route("/api/download", methods=["GET"])
 def download():
     session_id = request.args.get("session_id")
-    fmt = request.args.get("format", "csv")
+    fmt = "xlsx" if request.args.get("format") == "xlsx" else "csv"
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
     buf = io.BytesIO()
-    if fmt == "xlsx":
-        df.to_excel(buf, index=False)
-        buf.seek(0)
-        return send_file(buf, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                         as_attachment=True, download_name=f"cleaned_data_{session_id[:8]}.xlsx")
-    buf.write(df.to_csv(index=False).encode())
+    write_export(df, fmt, buf)
     buf.seek(0)
-    return send_file(buf, mimetype="text/csv", as_attachment=True, download_name=f"cleaned_data_{session_id[:8]}.csv")
+    return send_file(buf, mimetype=EXPORT_MIMETYPES[fmt], as_attachment=True, download_name=f"cleaned_data_{session_id[:8]}.{fmt}")
 
 
 @app.route("/api/report", methods=["GET"])
+@cached_response
 def report():
     session_id = request.args.get("session_id")
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
-    quality = cl.compute_quality_score(df)
-    insights = cl.generate_insights(df, quality)
-    missing = cl.detect_missing(df)
-    dup = cl.detect_duplicates(df)
-    outlier = cl.detect_outliers(df)
+    profile = cl.build_profile(df, get_sketches(session_id, df), get_fingerprints(session_id, df), get_stats(session_id).null_counts(df), column_executor)
+    quality = profile["quality"]
+    insights = cl.generate_insights(df, quality, profile)
+    missing, dup, outlier = profile["missing"], profile["duplicates"], profile["outliers"]
     lines = [
         "DATA CLEANING BASICS — QUALITY REPORT",
         f"Generated: {datetime.utcnow().isoformat()} UTC",
@@ -311,16 +817,155 @@ def report():
 @app.route("/api/reset", methods=["POST"])
 def reset():
     session_id = request.args.get("session_id")
-    conn = get_db()
-    conn.execute("UPDATE sessions SET cleaned_path=NULL WHERE session_id=?", (session_id,))
-    conn.commit()
-    conn.close()
+    metadata.update_session(session_id, bump_version=True, cleaned_path=None, pending_steps=None, row_count=None, dtypes=None)
+    df_cache.invalidate(session_id)
+    response_cache.invalidate(session_id)
+    stats_store.invalidate(session_id)
     return jsonify({"message": "Dataset reset to original."})
 
 
+# ─── Background jobs ───────────────────────────────────────────────────────────
+JOB_ENDPOINTS = {
+    "missing": ("/api/clean/missing", "POST"), "duplicates": ("/api/clean/duplicates", "POST"), "outliers": ("/api/clean/outliers", "POST"),
+    "normalize": ("/api/clean/normalize", "POST"), "standardize": ("/api/clean/standardize", "POST"), "pipeline": ("/api/clean/pipeline", "POST"),
+    "summary": ("/api/summary", "GET"), "visualize": ("/api/visualize", "GET"), "download": ("/api/download", "GET"),
+}
+
+
+CACHED_PATHS = ("/api/summary", "/api/visualize")  # job endpoints wrapped in cached_response
+
+
+def run_job(job: dict) -> tuple:
+    """Run a job through the endpoint it stands for; downloads write their file to /tmp. Returns ``(result, fields)`` for ``jobs.JobQueue``."""
+    path, method = JOB_ENDPOINTS[job["kind"]]
+    args = {**(job["args"] or {}), "session_id": job["session_id"]}
+    # The job keeps the Server-Timing of the request it ran
+    with app.test_request_context(path, method=method, query_string=args, json=job["params"] or {}, headers={TIMING_HEADER: "1"}):
+        if job["kind"] == "download":
+            fmt = "xlsx" if args.get("format") == "xlsx" else "csv"
+            df = get_current_df(job["session_id"])
+            jobs.report(0.5, f"Writing {fmt.upper()} file")
+            result_path = str(UPLOAD_FOLDER / f"{job['job_id']}_export.{fmt}")
+            write_export(df, fmt, result_path)
+            return {"filename": f"cleaned_data_{job['session_id'][:8]}.{fmt}", "format": fmt, "bytes": os.path.getsize(result_path)}, {"result_path": result_path}
+        response = app.full_dispatch_request()
+    result = response.get_json()
+    if response.status_code >= 400:
+        raise RuntimeError((result or {}).get("error", f"{job['kind']} failed ({response.status_code})"))
+    return result, {"etag": response.headers.get("ETag"), "timing": response.headers.get("Server-Timing")}
+
+
+job_queue = jobs.JobQueue(metadata.connection, run_job, JOB_WORKERS)
+
+
+@app.before_request
+def start_jobs():
+    job_queue.start()
+
+
+def public_job(job: dict) -> dict:
+    return {key: value for key, value in job.items() if key != "result_path"}
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Body ``{"kind": ..., "params": {...}, "args": {...}}``: the JSON body and query string of the endpoint the job runs.
+
+    A finished job's ``etag`` sent back as ``If-None-Match`` gets a 304 instead of a new job while the data is unchanged.
+    """
+    session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    if data.get("kind") not in JOB_ENDPOINTS:
+        return jsonify({"error": f"kind must be one of {', '.join(JOB_ENDPOINTS)}"}), 400
+    if not get_session(session_id):
+        return jsonify({"error": "Session not found"}), 404
+    path = JOB_ENDPOINTS[data["kind"]][0]
+    if path in CACHED_PATHS:
+        etag = response_etag(session_id, content_version(session_id), path, data.get("args") or {})
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+    return jsonify(public_job(job_queue.submit(session_id, data["kind"], data.get("params"), data.get("args")))), 202
+
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify({"jobs": [public_job(job) for job in job_queue.list(request.args.get("session_id"))]})
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(public_job(job))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"]}), 500
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}"}), 409
+    if job["result_path"]:
+        if not os.path.exists(job["result_path"]):
+            return jsonify({"error": "Result file no longer exists"}), 410
+        return send_file(job["result_path"], mimetype=EXPORT_MIMETYPES[job["result"]["format"]], as_attachment=True, download_name=job["result"]["filename"])
+    return jsonify(job["result"])
+
+
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({"error": "File size exceeds 50 MB limit"}), 413
+
+
+# ─── Request metrics ───────────────────────────────────────────────────────────
+@app.before_request
+def start_timing():
+    request.environ["dcb.start"] = time.perf_counter()
+    if request.headers.get(TIMING_HEADER) == "1":
+        request.environ["dcb.traced"] = True
+        metrics.start_trace()
+
+
+@app.after_request
+def record_timing(response):
+    start = request.environ.pop("dcb.start", None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe_request(endpoint, request.method, response.status_code, elapsed, response.content_length or 0)
+    if request.environ.pop("dcb.traced", False):
+        response.headers["Server-Timing"] = server_timing(metrics.end_trace(), elapsed)
+    return response
+
+
+@app.teardown_request
+def end_timing(error=None):
+    if request.environ.pop("dcb.traced", False):
+        metrics.end_trace()
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Span and request metrics in the Prometheus text format (per serverless instance)."""
+    gauges = {}
+    for source, stats in (("frames", df_cache.stats()), ("responses", response_cache.stats())):
+        for name, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.setdefault(f"cache_{name}", {})[source] = value
+    for name, value in metadata.stats().items():
+        if isinstance(value, int):
+            gauges.setdefault(f"metadata_{name}", {})["sqlite"] = value
+    return app.response_class(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({"status": "ok", "cache": df_cache.stats(), "responses": response_cache.stats(), "executor": column_executor.stats(), "metadata": metadata.stats()})
 
 
 # Vercel expects a WSGI `app` object at module level — already defined above.
@@ -0,0 +1,168 @@
+"""
+Background jobs persisted in the metadata database.
+
+A job runs one API operation (a cleaning step, a pipeline, the summary, an
+export) outside the request that submitted it, so long operations are not
+cut off by client or proxy timeouts. The submitter gets a job id back at
+once and polls the job's status and progress.
+
+Every job is a row of the ``jobs`` table (see metadata.py): its
+parameters, status (queued → running → done | failed), progress in [0, 1]
+with a message, and once done its JSON result, the path of any file it
+produced and the ETag of the response it stands for. Rows survive
+restarts: queued jobs are picked up again, while jobs that were running
+when the process stopped are marked failed, since a cleaning step cut off
+half-way cannot safely be replayed.
+
+Jobs of one session run one at a time in submission order, so each step
+sees the working copy the previous one saved; jobs of different sessions
+run concurrently on the worker threads. With ``workers=0`` a job runs inside
+``submit`` instead (serverless hosts freeze the process after a response).
+The queue assumes one server process owns the jobs table.
+"""
+import json
+import queue
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+_current = threading.local()
+
+
+def report(progress: float, message: str | None = None):
+    """Record the progress of the job running on this thread; a no-op outside jobs."""
+    jobs = getattr(_current, "queue", None)
+    if jobs is not None:
+        jobs.update(_current.job_id, progress=round(min(max(progress, 0.0), 1.0), 4), message=message)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class JobQueue:
+    """Runs submitted jobs on worker threads and keeps their state in the database.
+
+    ``connect()`` returns a context manager yielding a connection to the
+    metadata database (rows as ``sqlite3.Row``) that commits on exit, such
+    as ``metadata.MetadataStore.connection``; ``run(job)`` executes a job
+    dict and returns ``(result, fields)``: the JSON result and other columns
+    to store with it (``result_path``, ``etag``). It raises to fail the job.
+    """
+
+    def __init__(self, connect, run, workers: int = 2):
+        self._connect = connect
+        self._run = run
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._waiting = {}  # session_id -> job ids queued behind the session's running job
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+
+    def start(self):
+        """Recover jobs left by a previous process and start the workers (once)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status='failed', error=?, finished=? WHERE status='running'",
+                ("Interrupted by a server restart", _now()),
+            )
+            queued = conn.execute("SELECT job_id, session_id FROM jobs WHERE status='queued' ORDER BY created").fetchall()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        for row in queued:
+            self._dispatch(row["job_id"], row["session_id"])
+
+    def submit(self, session_id: str, kind: str, params: dict | None = None, args: dict | None = None) -> dict:
+        job_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, session_id, kind, params, args, status, progress, created)"
+                " VALUES (?,?,?,?,?,?,?,?)",
+                (job_id, session_id, kind, json.dumps(params or {}), json.dumps(args or {}), "queued", 0.0, _now()),
+            )
+        self._dispatch(job_id, session_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        return _decode(row) if row else None
+
+    def list(self, session_id: str) -> list:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE session_id=? ORDER BY created", (session_id,)).fetchall()
+        return [_decode(row) for row in rows]
+
+    def update(self, job_id: str, **fields):
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{name}=?' for name in fields)} WHERE job_id=?",
+                (*fields.values(), job_id),
+            )
+
+    def _dispatch(self, job_id: str, session_id: str):
+        with self._lock:
+            if session_id in self._waiting:
+                self._waiting[session_id].append(job_id)  # the session's current runner picks it up
+                return
+            self._waiting[session_id] = deque()
+        if self.workers > 0:
+            self._queue.put((job_id, session_id))
+        else:
+            self._run_session(job_id, session_id)
+
+    def _work(self):
+        while True:
+            try:
+                self._run_session(*self._queue.get())
+            except Exception:
+                pass  # the database refused a job's status update; the worker carries on with the next job
+
+    def _run_session(self, job_id: str, session_id: str):
+        """Run ``job_id``, then every job queued behind it for the same session.
+
+        If a job's bookkeeping raises, the jobs still queued behind it are
+        handed to a new runner, so the session is never left marked busy.
+        """
+        try:
+            while True:
+                self._execute(self.get(job_id))
+                with self._lock:
+                    waiting = self._waiting[session_id]
+                    if not waiting:
+                        del self._waiting[session_id]
+                        return
+                    job_id = waiting.popleft()
+        finally:
+            with self._lock:
+                waiting = self._waiting.pop(session_id, None)  # None once the loop has drained it
+            for queued in waiting or ():
+                self._dispatch(queued, session_id)
+
+    def _execute(self, job: dict):
+        """Run one job and store its outcome; any error, including one storing the result, fails it."""
+        _current.queue, _current.job_id = self, job["job_id"]
+        try:
+            self.update(job["job_id"], status="running", started=_now())
+            result, fields = self._run(job)
+            self.update(job["job_id"], status="done", progress=1.0, result=json.dumps(result), finished=_now(),
+                        **fields)
+        except Exception as e:
+            self.update(job["job_id"], status="failed", error=str(e), finished=_now())
+        finally:
+            _current.queue = None
+
+
+def _decode(row) -> dict:
+    job = dict(row)
+    for name in ("params", "args", "result"):
+        job[name] = json.loads(job[name]) if job[name] else None
+    return job
@@ -0,0 +1,246 @@
+"""
+SQLite metadata store: upload sessions and background jobs.
+
+Each thread holds one connection for as long as it lives, and every
+``with store.connection()`` block on that thread reuses it, so a request no
+longer pays a file open and a schema parse per query, and sqlite3's
+per-connection statement cache keeps the parameterized statements below
+prepared across requests. When a thread exits its connection is kept for
+the next thread (servers that start a thread per request reuse them too). The database runs in WAL mode: readers never
+block the writer, and a commit appends to the log instead of rewriting the
+rollback journal.
+
+The schema is versioned with ``PRAGMA user_version``. Every function in
+MIGRATIONS runs once, in order, in its own transaction. Steps only add
+things and skip what already exists, so databases created before the schema
+was versioned (which already have some of the columns) migrate like new
+ones. New columns go into a new step at the end of the list.
+"""
+import queue
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+TOUCH_INTERVAL = timedelta(minutes=1)  # resolution of sessions.last_access
+
+
+def _add_columns(conn: sqlite3.Connection, table: str, columns: dict):
+    existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column, kind in columns.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+
+def _initial_schema(conn: sqlite3.Connection):
+    """The tables as they were before the schema was versioned."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            original_filename TEXT,
+            upload_time TEXT,
+            original_path TEXT,
+            cleaned_path TEXT
+        )
+        """
+    )
+    _add_columns(conn, "sessions", {"csv_options": "TEXT", "pending_steps": "TEXT", "version": "INTEGER"})
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            session_id TEXT,
+            kind TEXT,
+            params TEXT,
+            args TEXT,
+            status TEXT,
+            progress REAL,
+            message TEXT,
+            result TEXT,
+            result_path TEXT,
+            error TEXT,
+            created TEXT,
+            started TEXT,
+            finished TEXT
+        )
+        """
+    )
+    _add_columns(conn, "jobs", {"etag": "TEXT"})
+
+
+def _session_details(conn: sqlite3.Connection):
+    _add_columns(conn, "sessions", {"file_size": "INTEGER", "row_count": "INTEGER", "dtypes": "TEXT",
+                                    "last_access": "TEXT"})
+    conn.execute("CREATE INDEX IF NOT EXISTS sessions_upload_time ON sessions (upload_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id, created)")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+
+def _job_timing(conn: sqlite3.Connection):
+    _add_columns(conn, "jobs", {"timing": "TEXT"})  # Server-Timing of the request a job ran
+
+
+def _session_baseline(conn: sqlite3.Connection):
+    _add_columns(conn, "sessions", {"baseline": "TEXT"})  # profile of the original upload (see baseline.py)
+
+
+def _session_schema(conn: sqlite3.Connection):
+    _add_columns(conn, "sessions", {"schema": "TEXT"})  # column types chosen at upload (see schema.py)
+
+
+MIGRATIONS = [_initial_schema, _session_details, _job_timing, _session_baseline, _session_schema]
+
+SESSION_FIELDS = {
+    "original_filename", "upload_time", "original_path", "cleaned_path", "csv_options", "pending_steps",
+    "file_size", "row_count", "dtypes", "last_access", "baseline", "schema",
+}
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class _Held:
+    """A thread's connection and how deeply its ``connection()`` blocks are nested."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.depth = 0
+
+
+class MetadataStore:
+    """Per-thread connections to the metadata database plus the session queries."""
+
+    def __init__(self, path: str, pool_size: int = 8, timeout: float = 10.0):
+        self.path = str(path)
+        self.pool_size = pool_size  # connections of exited threads kept for new ones
+        self.timeout = timeout
+        self._local = threading.local()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._held = 0
+        self.journal_mode = None
+
+    def _open(self) -> sqlite3.Connection:
+        # Not tied to the opening thread: an exited thread's connection moves to the next one
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        # WAL is stored in the file; filesystems without shared memory keep the rollback journal
+        self.journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    def _thread_connection(self) -> _Held:
+        held = getattr(self._local, "held", None)
+        if held is None:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            held = self._local.held = _Held(conn)
+            with self._lock:
+                self._held += 1
+            weakref.finalize(held, self._release, conn)  # runs when the thread's locals are cleared
+        return held
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._held -= 1
+            keep = self._idle.qsize() < self.pool_size
+        if keep:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """The calling thread's connection; the block's changes commit when it exits cleanly.
+
+        A block nested in another on the same thread joins the outer block's
+        transaction, which commits or rolls back as a whole.
+        """
+        held = self._thread_connection()
+        held.depth += 1
+        try:
+            yield held.conn
+            if held.depth == 1:
+                held.conn.commit()
+        except BaseException:
+            if held.depth == 1:
+                held.conn.rollback()
+            raise
+        finally:
+            held.depth -= 1
+
+    def migrate(self):
+        """Bring the schema up to date, one migration per transaction."""
+        with self.connection() as conn:
+            while True:
+                conn.execute("BEGIN IMMEDIATE")  # concurrent processes migrate one after another
+                current = conn.execute("PRAGMA user_version").fetchone()[0]
+                if current >= len(MIGRATIONS):
+                    conn.commit()
+                    return
+                MIGRATIONS[current](conn)
+                conn.execute(f"PRAGMA user_version = {current + 1}")
+                conn.commit()
+
+    def get_session(self, session_id: str) -> dict | None:
+        """The session's row; records the access in ``last_access`` (at most once a minute)."""
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM sessions WHERE session_id=?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            session = dict(row)
+            now = datetime.utcnow()
+            if not session["last_access"] or now - datetime.fromisoformat(session["last_access"]) >= TOUCH_INTERVAL:
+                session["last_access"] = now.isoformat()
+                conn.execute("UPDATE sessions SET last_access=? WHERE session_id=?", (session["last_access"], session_id))
+        return session
+
+    def create_session(self, session_id: str, **fields):
+        fields = {"upload_time": _now(), "last_access": _now(), **fields}
+        self._check_fields(fields)
+        with self.connection() as conn:
+            conn.execute(
+                f"INSERT INTO sessions (session_id, version, {', '.join(fields)})"
+                f" VALUES (?, 0, {', '.join('?' for _ in fields)})",
+                (session_id, *fields.values()),
+            )
+
+    def update_session(self, session_id: str, bump_version: bool = False, **fields):
+        """Set session columns; ``bump_version`` also advances the content version."""
+        self._check_fields(fields)
+        assignments = [f"{name}=?" for name in fields]
+        if bump_version:
+            assignments.append("version=COALESCE(version, 0) + 1")
+        with self.connection() as conn:
+            conn.execute(f"UPDATE sessions SET {', '.join(assignments)} WHERE session_id=?",
+                         (*fields.values(), session_id))
+
+    @staticmethod
+    def _check_fields(fields: dict):
+        unknown = set(fields) - SESSION_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown session columns: {', '.join(sorted(unknown))}")
+
+    def stats(self) -> dict:
+        with self.connection() as conn:
+            sessions, last_upload = conn.execute("SELECT COUNT(*), MAX(upload_time) FROM sessions").fetchone()
+            jobs = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            schema = conn.execute("PRAGMA user_version").fetchone()[0]
+        return {
+            "sessions": sessions,
+            "jobs": jobs,
+            "last_upload": last_upload,
+            "schema_version": schema,
+            "journal_mode": self.journal_mode,
+            "thread_connections": self._held,
+            "idle_connections": self._idle.qsize(),
+            "opened_connections": self._opened,
+        }
@@ -0,0 +1,144 @@
+"""
+Column-parallel execution of per-column statistics.
+
+Per-column work (value counts, describe, quartiles, histograms, ...) does
+not depend on the other columns, so a :class:`ColumnExecutor` splits the
+columns into one contiguous group per worker, runs a group function on each
+group and merges the per-column results. Group functions take the frame of
+one group (plus shared arguments) and return ``{column: result}``; they must
+be module-level functions so the process backend can pickle them.
+
+Backends:
+
+* ``"thread"`` — a thread pool. The NumPy/pandas kernels doing the work
+  (sorting, hashing, reductions) release the GIL for most of their time.
+* ``"process"`` — a process pool for work that holds the GIL. NumPy-backed
+  columns are handed to the workers in shared memory instead of through
+  pickles; other columns are pickled.
+* ``"serial"`` — everything on the calling thread.
+
+Frames smaller than ``min_cells`` run serially, where pool overhead would
+outweigh the gain, and so does everything once a pool fails to start (no
+``/dev/shm`` on serverless hosts, for instance).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ("serial", "thread", "process")
+
+
+def map_columns(fn, df: pd.DataFrame, *args, executor=None) -> dict:
+    """``fn(df, *args)``, split by column groups across ``executor`` when given."""
+    if executor is None:
+        return fn(df, *args)
+    return executor.map_columns(fn, df, *args)
+
+
+class ColumnExecutor:
+    """Runs group functions over column groups of a frame on a pool of workers."""
+
+    def __init__(self, workers: int | None = None, backend: str = "thread", min_cells: int = 1_000_000):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.backend = backend if self.workers > 1 else "serial"
+        self.min_cells = min_cells
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                pool_class = ThreadPoolExecutor if self.backend == "thread" else ProcessPoolExecutor
+                self._pool = pool_class(max_workers=self.workers)
+            return self._pool
+
+    def map_columns(self, fn, df: pd.DataFrame, *args) -> dict:
+        """Merged ``fn(group, *args)`` over column groups of ``df``, in column order."""
+        n_groups = min(self.workers, df.shape[1])
+        if self.backend == "serial" or n_groups < 2 or df.size < self.min_cells:
+            return fn(df, *args)
+        groups = [df.iloc[:, part] for part in np.array_split(np.arange(df.shape[1]), n_groups)]
+        try:
+            if self.backend == "thread":
+                pool = self._get_pool()
+                parts = [f.result() for f in [pool.submit(fn, group, *args) for group in groups]]
+            else:
+                parts = self._map_shared(fn, groups, args)
+        except (OSError, BrokenProcessPool):
+            self.shutdown()
+            self.backend = "serial"
+            return fn(df, *args)
+        merged = {}
+        for part in parts:
+            merged.update(part)
+        return merged
+
+    def _map_shared(self, fn, groups: list, args: tuple) -> list:
+        blocks = []
+        try:
+            futures = []
+            for group in groups:
+                spec = _share(group, blocks)
+                futures.append(self._get_pool().submit(_run_shared, fn, spec, group.index, args))
+            return [f.result() for f in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "backend": self.backend, "min_cells": self.min_cells}
+
+
+def _share(frame: pd.DataFrame, blocks: list) -> list:
+    """Copy ``frame``'s NumPy-backed columns into new shared memory blocks.
+
+    Returns one ``(column, block_name, dtype_or_series)`` entry per column;
+    columns that are not plain NumPy arrays are passed as the Series itself.
+    """
+    spec = []
+    for i in range(frame.shape[1]):
+        col, series = frame.columns[i], frame.iloc[:, i]
+        if not isinstance(series.dtype, np.dtype) or series.dtype.kind not in "biufcmM":
+            spec.append((col, None, series))
+            continue
+        values = series.to_numpy()
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+        spec.append((col, block.name, values.dtype.str))
+    return spec
+
+
+def _run_shared(fn, spec: list, index: pd.Index, args: tuple) -> dict:
+    """Worker side of the process backend: rebuild the group frame and run ``fn``."""
+    blocks, data = [], {}
+    for col, name, payload in spec:
+        if name is None:
+            data[col] = payload
+            continue
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        data[col] = pd.Series(np.ndarray(len(index), np.dtype(payload), buffer=block.buf), index=index, copy=False)
+    try:
+        return fn(pd.DataFrame(data, index=index), *args)
+    finally:
+        data.clear()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # the result still views the block; it is unmapped with it
@@ -0,0 +1,178 @@
+"""
+Lazy execution of cleaning steps.
+
+A plan is a list of steps in the ``cleaning.parse_pipeline`` format. Queuing
+a step computes nothing; :func:`execute` optimizes the plan and evaluates it
+only when the data is read. The optimizer only makes rewrites that leave the
+result unchanged:
+
+* a run of consecutive scalings collapses into its last one — min-max and
+  z-score results do not depend on an earlier positive rescaling of a column;
+* exact, full-row duplicate removal moves ahead of min-max normalization, so
+  the scaling is fitted and applied on fewer rows. A duplicate never holds a
+  column's min or max alone, and rows equal before scaling stay equal after.
+  Other filters stay put: moving them would change the statistics the
+  transforms before them are fitted on;
+* columns the caller did not ask for and no later step reads are never
+  transformed (projection pushdown).
+
+During evaluation filters become a selection of source row positions and
+transforms become per-column elementwise functions, fitted on the rows still
+selected. No intermediate frame is copied, and with ``head=n`` the output
+columns are evaluated on the first n surviving rows only.
+"""
+import numpy as np
+import pandas as pd
+
+from cleaning import (build_sketches, compute_fill_values, duplicate_mask, fill_missing, iqr_bounds,
+                      row_fingerprints, scale_column, scaling_params)
+
+SCALINGS = ("normalize", "standardize")
+
+
+def is_filter(step: dict) -> bool:
+    """Whether a step only removes rows."""
+    return (
+        step["op"] == "duplicates"
+        or (step["op"] == "missing" and step["strategy"] == "drop")
+        or (step["op"] == "outliers" and step["mode"] == "drop")
+    )
+
+
+def _commutes(flt: dict, transform: dict) -> bool:
+    """Whether filter ``flt`` gives the same result when run before ``transform``."""
+    return flt["op"] == "duplicates" and not flt["subset"] and not flt["near"] and transform["op"] == "normalize"
+
+
+def _fuse(steps: list) -> list:
+    fused = []
+    for step in steps:
+        if fused and step["op"] in SCALINGS and fused[-1]["op"] in SCALINGS:
+            fused[-1] = step
+        else:
+            fused.append(step)
+    return fused
+
+
+def optimize(steps: list) -> list:
+    """Reorder and fuse parsed steps into an equivalent, cheaper plan."""
+    ordered = []
+    for step in _fuse(steps):
+        i = len(ordered)
+        if is_filter(step):
+            while i and _commutes(step, ordered[i - 1]):
+                i -= 1
+        ordered.insert(i, step)
+    return _fuse(ordered)
+
+
+def _live_columns(steps: list, columns, wanted) -> list:
+    """For each step, the columns that still matter after it runs."""
+    live = set(wanted)
+    after = []
+    for step in reversed(steps):
+        after.append(set(live))
+        if is_filter(step):
+            live |= set(step["subset"] or columns) if step["op"] == "duplicates" else set(columns)
+    return after[::-1]
+
+
+class _View:
+    """Rows of ``base`` still selected, plus per-column transforms to apply to them."""
+
+    def __init__(self, base: pd.DataFrame):
+        self.base = base
+        self.rows = np.arange(len(base))
+        self.chains = {col: [] for col in base.columns}
+        self.memo = {}  # column -> values over all selected rows
+
+    def column(self, col, rows: np.ndarray | None = None) -> pd.Series:
+        """Current values of ``col`` over the selected rows, or over positions ``rows`` of them."""
+        if col in self.memo:
+            return self.memo[col] if rows is None else self.memo[col].iloc[rows]
+        series = self.base[col].iloc[self.rows if rows is None else self.rows[rows]]
+        for fn in self.chains[col]:
+            series = fn(series)
+        if rows is None:
+            self.memo[col] = series
+        return series
+
+    def frame(self, columns, rows: np.ndarray | None = None) -> pd.DataFrame:
+        positions = self.rows if rows is None else self.rows[rows]
+        return pd.DataFrame({col: self.column(col, rows) for col in columns}, index=self.base.index[positions])
+
+    def numeric(self, columns) -> list:
+        """The columns whose current dtype is numeric, found without evaluating them."""
+        return self.frame(columns, np.arange(0)).select_dtypes(include=[np.number]).columns.tolist()
+
+    def keep(self, mask: np.ndarray):
+        self.rows = self.rows[mask]
+        self.memo = {col: series[mask] for col, series in self.memo.items()}
+
+    def transform(self, col, fn):
+        self.chains[col].append(fn)
+        if col in self.memo:
+            self.memo[col] = fn(self.memo[col])
+
+
+def _filler(strategy: str, value):
+    return lambda s: fill_missing(s.to_frame(), strategy, {s.name: value})[s.name]
+
+
+def _clipper(lower: float, upper: float):
+    # Fences are fractional, so integer columns are widened before capping
+    return lambda s: (s.astype("float64") if pd.api.types.is_integer_dtype(s.dtype) else s).clip(lower, upper)
+
+
+def _scaler(offset: float, scale: float):
+    return lambda s: scale_column(s, offset, scale)
+
+
+def execute(df: pd.DataFrame, steps: list, epsilon: float | None = None, head: int | None = None,
+            columns: list | None = None) -> tuple:
+    """Evaluate a plan of parsed pipeline steps against ``df``.
+
+    Gives the same frame as ``cleaning.run_pipeline`` (up to float rounding)
+    without copying intermediates. Returns ``(frame, total_rows, changed)``:
+    the result, cut to its first ``head`` rows and to ``columns`` when given;
+    the row count of the whole result; and the columns any step rewrote, for
+    ``cleaning.operation_delta``. With ``epsilon`` the outlier fences come
+    from quantile sketches.
+    """
+    steps = optimize(steps)
+    wanted = list(df.columns) if columns is None else [col for col in df.columns if col in set(columns)]
+    view = _View(df)
+    changed = set()
+    for step, live in zip(steps, _live_columns(steps, df.columns, wanted)):
+        op = step["op"]
+        live = [col for col in df.columns if col in live]
+        if op == "missing" and step["strategy"] == "drop":
+            mask = np.zeros(len(view.rows), dtype=bool)
+            for col in df.columns:
+                mask |= view.column(col).isna().to_numpy()
+            view.keep(~mask)
+        elif op == "missing":
+            cols = [col for col in live if view.column(col).isna().any()]
+            for col, value in compute_fill_values(view.frame(cols), step["strategy"]).items():
+                view.transform(col, _filler(step["strategy"], value))
+                changed.add(col)
+        elif op == "duplicates":
+            key = view.frame(step["subset"] or df.columns)
+            view.keep(~duplicate_mask(row_fingerprints(key, near=step["near"])))
+        elif op == "outliers":
+            num = view.frame(view.numeric(df.columns if step["mode"] == "drop" else live))
+            lower, upper = iqr_bounds(num, build_sketches(num, epsilon) if epsilon else None)
+            outside = (num < lower) | (num > upper)
+            if step["mode"] == "drop":
+                view.keep(~outside.any(axis=1).to_numpy(dtype=bool))
+            else:
+                for col in outside.columns[outside.any()]:
+                    view.transform(col, _clipper(lower[col], upper[col]))
+                    changed.add(col)
+        else:
+            offset, scale = scaling_params(view.frame(view.numeric(live)), op)
+            for col in offset.index:
+                view.transform(col, _scaler(offset[col], scale[col]))
+                changed.add(col)
+    rows = None if head is None else np.arange(min(max(head, 0), len(view.rows)))
+    return view.frame(wanted, rows), len(view.rows), [col for col in df.columns if col in changed]
@@ -0,0 +1,269 @@
+"""
+Row samples of large frames and estimates with confidence intervals.
+
+With ``?sample=N`` the summary and charts are computed by the usual
+functions on N rows drawn uniformly without replacement (a simple random
+sample: what a reservoir sample gives, drawn directly since the row count
+is known). The draw is seeded, so a version of the data always yields the
+same sample and the same numbers. The helpers here turn the sample's
+results into estimates for the whole frame:
+
+* counts are scaled by the sampling fraction and get an interval from the
+  Wilson score interval of the underlying proportion, narrowed by the
+  finite population correction;
+* quartiles get distribution-free intervals from order statistics, means
+  a normal interval, correlations a Fisher z interval;
+* the quality score gets the range of scores over its ratios' intervals.
+
+Cells are treated as independent draws, which understates the width a
+little when values in a row move together. Duplicate counts assume
+duplicated rows come in pairs: a pair survives sampling with probability
+f² of the fraction f, so the duplicate rate is estimated as the sample's
+rate divided by f.
+"""
+import statistics
+
+import numpy as np
+import pandas as pd
+
+import cleaning as cl
+
+CONFIDENCE = 0.95
+SEED = 0
+
+
+class Sample:
+    """A row sample of a frame of ``total`` rows; ``frame.index`` holds the sampled row positions."""
+
+    def __init__(self, frame: pd.DataFrame, total: int):
+        self.frame = frame
+        self.total = total
+
+    @property
+    def fraction(self) -> float:
+        return len(self.frame) / self.total if self.total else 1.0
+
+    @property
+    def exact(self) -> bool:
+        return len(self.frame) >= self.total
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.frame.memory_usage(deep=False).sum())
+
+    def info(self, confidence: float = CONFIDENCE, **extra) -> dict:
+        """The ``sample`` block of a response."""
+        return {"method": "uniform", "seed": SEED, "rows": len(self.frame), "total_rows": self.total,
+                "fraction": round(self.fraction, 6), "confidence": confidence, **extra}
+
+
+def sample_positions(total: int, size: int, seed: int = SEED) -> np.ndarray:
+    """Sorted positions of ``size`` of ``total`` rows drawn uniformly without replacement."""
+    if size >= total:
+        return np.arange(total)
+    return np.sort(np.random.default_rng(seed).choice(total, size, replace=False))
+
+
+def draw(df: pd.DataFrame, size: int) -> Sample:
+    """Uniform sample of ``size`` rows of ``df``."""
+    positions = sample_positions(len(df), size)
+    frame = df.iloc[positions]
+    frame.index = pd.Index(positions)
+    return Sample(frame, len(df))
+
+
+def _z(confidence: float) -> float:
+    return statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def proportion_interval(hits: int, n: int, population: int | None = None, confidence: float = CONFIDENCE) -> tuple:
+    """Wilson score interval of a proportion seen as ``hits`` of ``n`` draws from ``population`` units."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = _z(confidence)
+    p = hits / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    low, high = max(centre - half, 0.0), min(centre + half, 1.0)
+    if population and population > 1:
+        # Shrink towards the observed proportion; a census (n = population) has no error
+        fpc = np.sqrt(max(population - n, 0) / (population - 1))
+        low, high = p - (p - low) * fpc, p + (high - p) * fpc
+    return float(low), float(high)
+
+
+def estimate_count(hits: int, n: int, population: int, confidence: float = CONFIDENCE) -> tuple:
+    """``(count, [low, high])``: the population count of units like ``hits`` of ``n`` sampled ones."""
+    if n <= 0:
+        return 0, [0, population]
+    low, high = proportion_interval(hits, n, population, confidence)
+    return int(round(hits / n * population)), [int(np.floor(low * population)), int(np.ceil(high * population))]
+
+
+def quantile_interval(values: np.ndarray, q: float, confidence: float = CONFIDENCE) -> list:
+    """Distribution-free interval of the ``q`` quantile from sorted sample ``values``."""
+    n = len(values)
+    if n == 0:
+        return [None, None]
+    half = _z(confidence) * np.sqrt(n * q * (1 - q))
+    low = min(max(int(np.floor(n * q - half)), 0), n - 1)
+    high = min(max(int(np.ceil(n * q + half)), 0), n - 1)
+    return [_float(values[low]), _float(values[high])]
+
+
+def mean_interval(series: pd.Series, confidence: float = CONFIDENCE) -> list:
+    values = series.dropna()
+    if len(values) < 2:
+        return [None, None]
+    half = _z(confidence) * float(values.std()) / np.sqrt(len(values))
+    mean = float(values.mean())
+    return [round(mean - half, 4), round(mean + half, 4)]
+
+
+def correlation_interval(r: float, n: int, confidence: float = CONFIDENCE) -> list:
+    """Fisher z interval of a Pearson correlation over ``n`` complete pairs."""
+    if r is None or n <= 3:
+        return [None, None]
+    centre = np.arctanh(np.clip(r, -0.999999, 0.999999))
+    half = _z(confidence) / np.sqrt(n - 3)
+    return [round(float(np.tanh(centre - half)), 4), round(float(np.tanh(centre + half)), 4)]
+
+
+def _float(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _duplicate_rate(duplicates: int, sample: Sample, confidence: float) -> tuple:
+    """Estimated duplicate-row rate and its interval, under the pair model above."""
+    n, f = len(sample.frame), sample.fraction
+    ceiling = 1 - 1 / max(sample.total, 1)
+    low, high = proportion_interval(duplicates, n, sample.total, confidence)
+    rate = duplicates / n if n else 0.0
+    return min(rate / f, ceiling), min(low / f, ceiling), min(high / f, ceiling)
+
+
+# ── whole-frame estimates ──
+def estimate_profile(profile: dict, sample: Sample, confidence: float = CONFIDENCE) -> dict:
+    """``cleaning.build_profile`` output of a sample, as estimates for the whole frame.
+
+    Counts are scaled to the frame with an ``interval`` each; the quality
+    score gets the ``interval`` of scores over its ratios' intervals.
+    """
+    n, total = len(sample.frame), sample.total
+    columns = sample.frame.shape[1]
+    missing = profile["missing"]
+    per_column = {}
+    for col, info in missing["missing_per_column"].items():
+        count, interval = estimate_count(info["count"], n, total, confidence)
+        per_column[col] = {"count": count, "pct": info["pct"], "interval": interval}
+    total_missing, missing_interval = estimate_count(missing["total_missing"], n * columns, total * columns,
+                                                     confidence)
+    missing_low, missing_high = proportion_interval(missing["total_missing"], n * columns, total * columns,
+                                                    confidence)
+
+    dup_rate, dup_low, dup_high = _duplicate_rate(profile["duplicates"]["duplicate_rows"], sample, confidence)
+
+    outliers = profile["outliers"]
+    per_column_outliers = {}
+    numeric_cells = 0
+    for col, info in outliers["outliers_per_column"].items():
+        present = n - missing["missing_per_column"][col]["count"]
+        numeric_cells += present
+        count, interval = estimate_count(info["count"], present, round(present / sample.fraction), confidence)
+        per_column_outliers[col] = {**info, "count": count, "interval": interval}
+    total_outliers, outlier_interval = estimate_count(outliers["total_outliers"], numeric_cells,
+                                                      round(numeric_cells / sample.fraction), confidence)
+    outlier_low, outlier_high = proportion_interval(outliers["total_outliers"], numeric_cells,
+                                                    round(numeric_cells / sample.fraction), confidence)
+
+    cells = n * columns
+    quality = cl.quality_from_ratios(missing["total_missing"] / max(cells, 1), dup_rate,
+                                     outliers["total_outliers"] / max(numeric_cells, 1))
+    worst = cl.quality_from_ratios(missing_high, dup_high, outlier_high)["score"]
+    best = cl.quality_from_ratios(missing_low, dup_low, outlier_low)["score"]
+    return {
+        "missing": {**missing, "total_rows": total, "missing_per_column": per_column,
+                    "total_missing": total_missing, "interval": missing_interval},
+        "duplicates": {"duplicate_rows": int(round(dup_rate * total)),
+                       "interval": [int(np.floor(dup_low * total)), int(np.ceil(dup_high * total))]},
+        "outliers": {**outliers, "outliers_per_column": per_column_outliers, "total_outliers": total_outliers,
+                     "interval": outlier_interval},
+        "numeric_columns": profile["numeric_columns"],
+        "quality": {**quality, "interval": [worst, best]},
+    }
+
+
+def estimate_bar_charts(charts: list, sample: Sample, confidence: float = CONFIDENCE) -> list:
+    """Value-count bars scaled to the frame and column-mean bars, each with an ``interval``."""
+    df, n = sample.frame, len(sample.frame)
+    result = []
+    for chart in charts:
+        if "column" in chart:
+            data = []
+            for bar in chart["data"]:
+                count, interval = estimate_count(bar["value"], n, sample.total, confidence)
+                data.append({**bar, "value": count, "interval": interval})
+        else:
+            data = [{**bar, "interval": mean_interval(df[bar["label"]], confidence)} for bar in chart["data"]]
+        result.append({**chart, "data": data})
+    return result
+
+
+def estimate_histograms(histograms: list, sample: Sample, confidence: float = CONFIDENCE) -> list:
+    """Histogram counts scaled to the frame, each bin with an ``interval``."""
+    result = []
+    for hist in histograms:
+        n = int(sample.frame[hist["column"]].notna().sum())
+        population = round(n / sample.fraction)
+        data = []
+        for bin_ in hist["data"]:
+            count, interval = estimate_count(bin_["count"], n, population, confidence)
+            data.append({**bin_, "count": count, "interval": interval})
+        result.append({**hist, "data": data})
+    return result
+
+
+def estimate_boxplots(boxplots: list, sample: Sample, confidence: float = CONFIDENCE) -> list:
+    """Box plots with ``intervals`` for the quartiles; min, max and outliers are the sample's."""
+    result = []
+    for box in boxplots:
+        values = np.sort(sample.frame[box["column"]].dropna().to_numpy(dtype="float64"))
+        intervals = {key: quantile_interval(values, q, confidence)
+                     for key, q in (("Q1", 0.25), ("median", 0.5), ("Q3", 0.75))}
+        result.append({**box, "intervals": intervals})
+    return result
+
+
+def estimate_correlation(correlation: dict, sample: Sample, confidence: float = CONFIDENCE) -> dict:
+    """The correlation matrix with an ``intervals`` matrix over each pair's complete rows."""
+    columns = correlation["columns"]
+    if not columns:
+        return correlation
+    present = sample.frame[columns].notna().to_numpy(dtype="float64")
+    pairs = present.T @ present
+    intervals = {
+        row["column"]: {col: correlation_interval(row["values"][col], int(pairs[i, j]), confidence)
+                        for j, col in enumerate(columns)}
+        for i, row in enumerate(correlation["matrix"])
+    }
+    return {**correlation, "intervals": intervals}
+
+
+def estimate_before_after(charts: list, after: Sample, confidence: float = CONFIDENCE) -> list:
+    """``visualization.before_after_chart`` with a sample's counts as "After", scaled to its frame.
+
+    The row count is the frame's own; missing and duplicate counts get an
+    ``interval``. The "Before" bars are left as they are.
+    """
+    n, total, columns = len(after.frame), after.total, after.frame.shape[1]
+    _, missing, duplicates = (chart["data"][1]["value"] for chart in charts)
+    missing, missing_interval = estimate_count(missing, n * columns, total * columns, confidence)
+    rate, low, high = _duplicate_rate(duplicates, after, confidence)
+    estimates = [
+        {"value": total},
+        {"value": missing, "interval": missing_interval},
+        {"value": int(round(rate * total)), "interval": [int(np.floor(low * total)), int(np.ceil(high * total))]},
+    ]
+    return [{**chart, "data": [chart["data"][0], {**chart["data"][1], **estimate}]}
+            for chart, estimate in zip(charts, estimates)]
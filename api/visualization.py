@@ -1,6 +1,13 @@
+import base64
+
 import pandas as pd
 import numpy as np
 
+from parallel import map_columns
+
+HEATMAP_STRATEGIES = ("head", "uniform", "stratified")
+HEATMAP_ENCODINGS = ("rle", "bits")
+
 
 def safe_float(val):
     if val is None or (isinstance(val, float) and np.isnan(val)):
@@ -8,71 +15,164 @@ def safe_float(val):
     return float(val)
 
 
-def bar_chart_data(df: pd.DataFrame) -> list:
+def bar_chart_data(df: pd.DataFrame, stats=None) -> list:
     result = []
     cat_cols = df.select_dtypes(include=["object", "category"]).columns
     num_cols = df.select_dtypes(include=[np.number]).columns
     for col in list(cat_cols)[:3]:
-        counts = df[col].value_counts().head(10)
-        result.append({"type": "bar", "title": f"Value Counts – {col}", "data": [{"label": str(k), "value": int(v)} for k, v in counts.items()], "xKey": "label", "yKey": "value"})
+        counts = df[col].value_counts() if stats is None else stats.value_counts(df, col)
+        counts = counts[counts > 0].head(10)  # categoricals count unused categories as zero
+        result.append({"type": "bar", "title": f"Value Counts – {col}", "column": col, "data": [{"label": str(k), "value": int(v)} for k, v in counts.items()], "xKey": "label", "yKey": "value"})
     if len(num_cols) >= 2:
-        means = df[num_cols].mean().dropna()
+        means = df[num_cols].mean().dropna() if stats is None else pd.Series({col: stats.mean(df, col) for col in num_cols}, dtype="float64").dropna()
         result.append({"type": "bar", "title": "Column Means (Numeric)", "data": [{"label": col, "value": round(float(v), 4)} for col, v in means.items()], "xKey": "label", "yKey": "value"})
     return result
 
 
-def histogram_data(df: pd.DataFrame, bins: int = 15) -> list:
+def _histograms(frame: pd.DataFrame, bins: int) -> dict:
+    return {col: np.histogram(frame[col].dropna(), bins=bins) for col in frame.columns}
+
+
+def histogram_data(df: pd.DataFrame, bins: int = 15, stats=None, executor=None) -> list:
+    """Histograms of the first numeric columns: cached bins from ``stats``, else split across ``executor``'s workers."""
     result = []
-    num_cols = df.select_dtypes(include=[np.number]).columns
-    for col in list(num_cols)[:4]:
-        series = df[col].dropna()
-        if len(series) == 0:
+    num_cols = list(df.select_dtypes(include=[np.number]).columns)[:4]
+    hists = stats.histograms(df, num_cols, bins) if stats is not None else map_columns(_histograms, df[num_cols], bins, executor=executor)
+    for col in num_cols:
+        counts, bin_edges = hists[col]
+        if counts.sum() == 0:
             continue
-        counts, bin_edges = np.histogram(series, bins=bins)
         data = [{"bin": f"{round(float(bin_edges[i]), 2)}–{round(float(bin_edges[i+1]), 2)}", "count": int(counts[i])} for i in range(len(counts))]
         result.append({"type": "histogram", "title": f"Distribution – {col}", "column": col, "data": data, "xKey": "bin", "yKey": "count"})
     return result
 
 
-def boxplot_data(df: pd.DataFrame) -> list:
-    result = []
-    num_cols = df.select_dtypes(include=[np.number]).columns
-    for col in list(num_cols)[:5]:
-        series = df[col].dropna()
+def _boxplots(frame: pd.DataFrame, sketches: dict | None = None) -> dict:
+    result = {}
+    for col in frame.columns:
+        series = frame[col].dropna()
         if len(series) == 0:
+            result[col] = None
             continue
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
+        if sketches is not None:
+            Q1, median, Q3 = sketches[col].quantiles([0.25, 0.5, 0.75])
+        else:
+            Q1, median, Q3 = series.quantile(0.25), series.median(), series.quantile(0.75)
         IQR = Q3 - Q1
         lower_fence = Q1 - 1.5 * IQR
         upper_fence = Q3 + 1.5 * IQR
         outliers = series[(series < lower_fence) | (series > upper_fence)].tolist()
-        result.append({"type": "boxplot", "title": f"Box Plot – {col}", "column": col, "min": safe_float(series.min()), "Q1": safe_float(Q1), "median": safe_float(series.median()), "Q3": safe_float(Q3), "max": safe_float(series.max()), "whisker_low": safe_float(float(series[series >= lower_fence].min())), "whisker_high": safe_float(float(series[series <= upper_fence].max())), "outliers": [safe_float(o) for o in outliers[:50]]})
+        result[col] = {"type": "boxplot", "title": f"Box Plot – {col}", "column": col, "min": safe_float(series.min()), "Q1": safe_float(Q1), "median": safe_float(median), "Q3": safe_float(Q3), "max": safe_float(series.max()), "whisker_low": safe_float(float(series[series >= lower_fence].min())), "whisker_high": safe_float(float(series[series <= upper_fence].max())), "outliers": [safe_float(o) for o in outliers[:50]]}
     return result
 
 
-def correlation_matrix(df: pd.DataFrame) -> dict:
+def boxplot_data(df: pd.DataFrame, sketches: dict | None = None, executor=None) -> list:
+    num_cols = list(df.select_dtypes(include=[np.number]).columns)[:5]
+    boxes = map_columns(_boxplots, df[num_cols], sketches, executor=executor)
+    return [boxes[col] for col in num_cols if boxes[col] is not None]
+
+
+def correlation_matrix(df: pd.DataFrame, stats=None) -> dict:
     num_cols = df.select_dtypes(include=[np.number]).columns
     if len(num_cols) < 2:
         return {"columns": [], "matrix": []}
-    corr = df[num_cols].corr()
+    corr = df[num_cols].corr() if stats is None else stats.correlation(df, list(num_cols))
     columns = list(corr.columns)
     matrix = [{"column": row_col, "values": {col: (None if pd.isna(corr.loc[row_col, col]) else round(float(corr.loc[row_col, col]), 4)) for col in columns}} for row_col in columns]
     return {"columns": columns, "matrix": matrix}
 
 
-def missing_heatmap(df: pd.DataFrame) -> dict:
-    cols = df.columns.tolist()
-    rows = []
-    for idx, row in df.head(100).iterrows():
-        row_data = {col: (1 if pd.isna(row[col]) else 0) for col in cols}
-        rows.append({"row": int(idx), **row_data})
-    return {"columns": cols, "rows": rows}
+def missing_patterns(df: pd.DataFrame) -> tuple:
+    """``(labels, patterns)``: each row's missing-value pattern id (numbered by first appearance) and each pattern's isna() row,
+    so ``patterns[labels]`` is the whole isna() bitmap. Rows are keyed by their isna() bits packed into 64-bit words, exactly."""
+    width = max(1, -(-df.shape[1] // 64)) * 8
+    packed = np.zeros((len(df), width), dtype=np.uint8)
+    for j in range(df.shape[1]):
+        packed[:, j // 8] |= df.iloc[:, j].isna().to_numpy(dtype=np.uint8) << np.uint8(7 - j % 8)
+    if width == 8:
+        labels = pd.factorize(packed.view(np.uint64).ravel())[0]
+    else:
+        _, first, inverse = np.unique(packed.view(np.dtype((np.void, width))).ravel(), return_index=True, return_inverse=True)
+        order = np.empty(len(first), dtype=np.intp)
+        order[np.argsort(first)] = np.arange(len(first))
+        labels = order[inverse.ravel()]
+    _, first = np.unique(labels, return_index=True)
+    return labels, df.iloc[first].isna().to_numpy()
+
+
+def sample_positions(df: pd.DataFrame | None, n: int, strategy: str = "head", labels: np.ndarray | None = None) -> np.ndarray:
+    """Sorted positions of an n-row sample: head, uniform (evenly spread) or stratified by missing-value pattern.
+    Pass the ``labels`` of missing_patterns to sample without ``df``."""
+    total = len(df) if labels is None else len(labels)
+    if strategy not in HEATMAP_STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+    if total <= n:
+        return np.arange(total)
+    if strategy == "head":
+        return np.arange(n)
+    if strategy == "uniform":
+        return np.unique(np.linspace(0, total - 1, n).round().astype(np.int64))
+    if labels is None:
+        labels = missing_patterns(df)[0]
+    counts = np.bincount(labels)
+    # One row per pattern, the rest of the sample shared in proportion to pattern size: never more than n
+    quota = np.minimum(counts, 1 + max(n - len(counts), 0) * counts // total)
+    # Rows grouped by pattern (in file order); take `quota` evenly spaced ranks of each group
+    order = np.argsort(labels, kind="stable")
+    rank = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    size, q = np.repeat(counts, counts), np.repeat(quota, counts)
+    positions = np.sort(order[(rank * q) // size != ((rank - 1) * q) // size])
+    if len(positions) > n:
+        positions = positions[np.linspace(0, len(positions) - 1, n).astype(np.int64)]
+    return positions
+
+
+def missing_heatmap(df: pd.DataFrame, max_rows: int = 100, strategy: str = "head", encoding: str = "rle") -> dict:
+    """Missing map of a row sample from one isna() bitmap: per-column present/missing run lengths ("rle", starting with a present run)
+    or base64 row-major packed bits ("bits", 1 = missing, ``row_bytes`` per row)."""
+    if encoding not in HEATMAP_ENCODINGS:
+        raise ValueError(f"Unknown heatmap encoding: {encoding}")
+    positions = sample_positions(df, max_rows, strategy)
+    return _heatmap(df.columns, positions, len(df), df.iloc[positions].isna().to_numpy(), strategy, encoding)
+
+
+def pattern_heatmap(columns: list, labels: np.ndarray, patterns: np.ndarray, max_rows: int = 100, strategy: str = "head", encoding: str = "rle") -> dict:
+    """missing_heatmap of the frame that missing_patterns gave ``labels`` and ``patterns``."""
+    if encoding not in HEATMAP_ENCODINGS:
+        raise ValueError(f"Unknown heatmap encoding: {encoding}")
+    positions = sample_positions(None, max_rows, strategy, labels)
+    return _heatmap(columns, positions, len(labels), patterns[labels[positions]], strategy, encoding)
+
+
+def _heatmap(columns, positions: np.ndarray, total: int, mask: np.ndarray, strategy: str, encoding: str) -> dict:
+    result = {"columns": [str(c) for c in columns], "rows": positions.tolist(), "total_rows": total, "strategy": strategy, "encoding": encoding}
+    if encoding == "bits":
+        packed = np.packbits(mask, axis=1)
+        result.update(row_bytes=packed.shape[1], bits=base64.b64encode(packed.tobytes()).decode("ascii"))
+        return result
+    runs = []
+    for column in mask.T:
+        lengths = np.diff(np.concatenate([[0], np.flatnonzero(np.diff(column)) + 1, [len(column)]])).tolist()
+        runs.append([0] + lengths if len(column) and column[0] else lengths)
+    result["runs"] = runs
+    return result
+
+
+def _duplicate_count(df: pd.DataFrame, fingerprints: np.ndarray | None) -> int:
+    return int(df.duplicated().sum()) if fingerprints is None else int(pd.Series(fingerprints).duplicated().sum())
+
+
+def frame_counts(df: pd.DataFrame, fingerprints: np.ndarray | None = None, null_counts: pd.Series | None = None) -> dict:
+    """Row, missing-cell and duplicate-row counts compared before and after cleaning; cached fingerprints / null counts skip rescans."""
+    missing = df.isnull().sum() if null_counts is None else null_counts
+    return {"rows": len(df), "missing": int(missing.sum()), "duplicates": _duplicate_count(df, fingerprints)}
+
+
+def before_after_chart(before: dict, after: dict) -> list:
+    """Bar charts of two frame_counts results (or anything with the same keys)."""
+    return [{"type": "bar", "title": f"{title}: Before vs After", "data": [{"label": "Before", "value": before[key]}, {"label": "After", "value": after[key]}], "xKey": "label", "yKey": "value"}
+            for key, title in (("rows", "Row Count"), ("missing", "Missing Values"), ("duplicates", "Duplicate Rows"))]
 
 
-def before_after_comparison(before_df: pd.DataFrame, after_df: pd.DataFrame) -> list:
-    return [
-        {"type": "bar", "title": "Row Count: Before vs After", "data": [{"label": "Before", "value": len(before_df)}, {"label": "After", "value": len(after_df)}], "xKey": "label", "yKey": "value"},
-        {"type": "bar", "title": "Missing Values: Before vs After", "data": [{"label": "Before", "value": int(before_df.isnull().sum().sum())}, {"label": "After", "value": int(after_df.isnull().sum().sum())}], "xKey": "label", "yKey": "value"},
-        {"type": "bar", "title": "Duplicate Rows: Before vs After", "data": [{"label": "Before", "value": int(before_df.duplicated().sum())}, {"label": "After", "value": int(after_df.duplicated().sum())}], "xKey": "label", "yKey": "value"},
-    ]
+def before_after_comparison(before_df: pd.DataFrame, after_df: pd.DataFrame, before_fingerprints: np.ndarray | None = None, after_fingerprints: np.ndarray | None = None) -> list:
+    return before_after_chart(frame_counts(before_df, before_fingerprints), frame_counts(after_df, after_fingerprints))
@@ -1,112 +1,545 @@
 import os
 import uuid
+import functools
+import hashlib
 import json
-import sqlite3
 import io
+import time
 from pathlib import Path
 from datetime import datetime
 
 import pandas as pd
 import numpy as np
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+import baseline
 import cleaning as cl
+import compact
+import jobs
+import paging
+import plan
+import sampling
+import schema
+import storage
 import visualization as viz
-
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+from cache import DataFrameCache, ResponseCache
+from metadata import MetadataStore
+from metrics import Metrics, server_timing
+from parallel import ColumnExecutor
+from stats import StatsStore
+try:
+    import chunked
+except ImportError:  # out-of-core mode needs pyarrow
+    chunked = None
+from storage import (build_row_index, iter_batches, load_df, read_rows, read_working_columns, save_working, scan_dtypes,
+                     scan_shape, sniff_csv, take_working_rows, write_upload)
 
 UPLOAD_FOLDER = Path(__file__).parent / "uploads"
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 DB_PATH = UPLOAD_FOLDER / "metadata.db"
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 
+app = Flask(__name__)
+# Reject oversized bodies before they are read; leave room for multipart framing
+app.config["MAX_CONTENT_LENGTH"] = MAX_FILE_SIZE + 1024 * 1024
+CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["ETag", "Server-Timing"])
+DF_CACHE_MAX_BYTES = 512 * 1024 * 1024  # parsed frames kept in memory
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # encoded summary / chart / report responses
+CHUNKED_MIN_BYTES = MAX_FILE_SIZE // 2  # working files this large are cleaned out of core
+HEATMAP_MAX_ROWS = 1000  # upper bound for ?heatmap_rows
+SAMPLE_MAX_ROWS = 1_000_000  # upper bound for ?sample
+SAMPLE_CONFIDENCE = 0.95  # level of the intervals of sampled estimates
+PREVIEW_MAX_ROWS = 1000  # upper bound for ?limit
+APPROX_MIN_ROWS = 1_000_000  # frames this long use quantile sketches for IQR statistics
+QUANTILE_EPSILON = 0.005  # rank error bound of those sketches
+PARALLEL_WORKERS = os.cpu_count() or 1  # workers for per-column statistics; 1 runs them serially
+PARALLEL_BACKEND = "thread"  # thread | process | serial (see parallel.py)
+JOB_WORKERS = 2  # background job threads (see jobs.py)
+TIMING_HEADER = "X-Server-Timing"  # requests sending "1" get a Server-Timing header of their spans
+
+df_cache = DataFrameCache(DF_CACHE_MAX_BYTES)
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+column_executor = ColumnExecutor(PARALLEL_WORKERS, PARALLEL_BACKEND)
+stats_store = StatsStore(column_executor)
+
+
+# ──────────────────────────── Instrumentation ──────────────────────────────
+metrics = Metrics()
+metrics.instrument(cl, "cleaning")
+metrics.instrument(viz, "visualization", exclude=("safe_float",))
+metrics.instrument(plan, "plan", names=("execute",))
+metrics.instrument(sampling, "sampling", names=("draw",))
+metrics.instrument(schema, "schema", names=("optimize", "apply"))
+metrics.instrument(paging, "paging", names=("row_order", "records_json"))
+metrics.instrument(compact, "compact", names=("frame_table", "compress"))
+if chunked is not None:
+    metrics.instrument(chunked, "chunked", names=("clean_file",))
+metrics.instrument(storage, "storage", names=("load_df", "save_df", "read_working", "save_working", "scan_shape",
+                                              "scan_dtypes", "build_row_index", "read_rows", "read_working_columns",
+                                              "take_working_rows"))
+# Imported by name above, before they were wrapped
+load_df, save_working, scan_shape, scan_dtypes, build_row_index = (storage.load_df, storage.save_working,
+                                                                   storage.scan_shape, storage.scan_dtypes,
+                                                                   storage.build_row_index)
+read_rows, read_working_columns, take_working_rows = (storage.read_rows, storage.read_working_columns,
+                                                      storage.take_working_rows)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with serialization timed as the ``serialize.json`` span."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        with metrics.span("serialize.json") as span:
+            text = super().dumps(obj, **kwargs)
+            span["bytes_out"] = len(text)
+        return text
+
+
+app.json = TimedJSONProvider(app)
+
 
 # ──────────────────────────── Database helpers ─────────────────────────────
-def get_db():
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_db():
-    conn = get_db()
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            original_filename TEXT,
-            upload_time TEXT,
-            original_path TEXT,
-            cleaned_path TEXT
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
+metadata = MetadataStore(DB_PATH)
+metadata.migrate()
 
 
-init_db()
+# ──────────────────────────── Utility helpers ──────────────────────────────
+def get_session(session_id: str) -> dict | None:
+    return metadata.get_session(session_id)
 
 
-# ──────────────────────────── Utility helpers ──────────────────────────────
-def load_df(path: str) -> pd.DataFrame:
-    if path.endswith(".xlsx") or path.endswith(".xls"):
-        return pd.read_excel(path)
-    # Try common encodings in order; many real-world CSVs are not pure UTF-8
-    encodings = ["utf-8", "utf-8-sig", "latin-1", "cp1252", "iso-8859-1"]
-    for enc in encodings:
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except (UnicodeDecodeError, Exception):
-            continue
-    # Last resort: ignore undecodable bytes
-    return pd.read_csv(path, encoding="latin-1", on_bad_lines="skip")
+def column_types(session: dict) -> dict | None:
+    """The session's schema: the column types chosen when its data was first parsed (see schema.py)."""
+    return json.loads(session["schema"]) if session.get("schema") else None
 
 
-def save_df(df: pd.DataFrame, path: str):
-    if path.endswith(".xlsx"):
-        df.to_excel(path, index=False)
-    else:
-        df.to_csv(path, index=False)
+def apply_schema(session: dict, df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` in the session's column types; the first frame parsed for a session chooses them."""
+    types = column_types(session)
+    if types is not None:
+        return schema.apply(df, types)
+    df, types, _ = schema.optimize(df)
+    session["schema"] = json.dumps(types)
+    metadata.update_session(session["session_id"], schema=session["schema"])
+    return df
 
 
-def get_session(session_id: str) -> dict | None:
-    conn = get_db()
-    row = conn.execute(
-        "SELECT * FROM sessions WHERE session_id=?", (session_id,)
-    ).fetchone()
-    conn.close()
-    return dict(row) if row else None
+def load_original(session: dict) -> pd.DataFrame:
+    """Parse the uploaded file with the CSV options detected at upload time, in the session's column types."""
+    options = json.loads(session["csv_options"]) if session.get("csv_options") else None
+    return apply_schema(session, load_df(session["original_path"], options))
+
+
+def file_version(path: str) -> tuple:
+    """Identity of a file's current contents, used as the cache version key."""
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def current_source(session: dict) -> tuple:
+    """Path of the session's current data and the CSV options to parse it."""
+    cleaned = session["cleaned_path"]
+    if cleaned and os.path.exists(cleaned):
+        return cleaned, None
+    options = json.loads(session["csv_options"]) if session.get("csv_options") else None
+    return session["original_path"], options
+
+
+def pending_steps(session: dict) -> list:
+    """Cleaning steps queued with ``?execution=lazy`` that have not run yet."""
+    return json.loads(session["pending_steps"]) if session.get("pending_steps") else []
+
+
+def set_pending_steps(session_id: str, steps: list):
+    metadata.update_session(session_id, bump_version=True, pending_steps=json.dumps(steps) if steps else None)
+    response_cache.invalidate(session_id)
+
+
+def load_working(session: dict) -> pd.DataFrame:
+    """Return the session's saved working frame, served from the cache when possible.
+
+    Queued lazy steps are not applied. The returned frame is shared with
+    other requests and must not be mutated.
+    """
+    path, options = current_source(session)
+    version = file_version(path)
+    df = df_cache.get(session["session_id"], version)
+    if df is None:
+        df = apply_schema(session, load_df(path, options))
+        df_cache.put(session["session_id"], version, df)
+    return df
 
 
 def get_current_df(session_id: str) -> pd.DataFrame:
+    """Return the session's working frame with every queued lazy step applied.
+
+    Queued steps run here, once, and their result becomes the working copy.
+    The returned frame is shared with other requests and must not be mutated.
+    """
     session = get_session(session_id)
     if not session:
         raise ValueError("Session not found")
-    cleaned = session["cleaned_path"]
-    if cleaned and os.path.exists(cleaned):
-        return load_df(cleaned)
-    return load_df(session["original_path"])
+    df = load_working(session)
+    steps = pending_steps(session)
+    if not steps:
+        return df
+    epsilon = QUANTILE_EPSILON if use_approx(df) else None
+    cleaned, _, changed = plan.execute(df, steps, epsilon)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, changed))
+    set_pending_steps(session_id, [])
+    return load_working(get_session(session_id))
 
 
-def save_cleaned(df: pd.DataFrame, session_id: str, ext: str = ".csv"):
-    path = str(UPLOAD_FOLDER / f"{session_id}_cleaned{ext}")
-    save_df(df, path)
-    conn = get_db()
-    conn.execute(
-        "UPDATE sessions SET cleaned_path=? WHERE session_id=?",
-        (path, session_id),
-    )
-    conn.commit()
-    conn.close()
+def set_cleaned_path(session_id: str, path: str, row_count: int | None = None, dtypes: dict | None = None):
+    metadata.update_session(session_id, bump_version=True, cleaned_path=path, row_count=row_count,
+                            dtypes=json.dumps(dtypes) if dtypes else None)
+    response_cache.invalidate(session_id)
+
+
+def content_version(session_id: str) -> int:
+    """Counter bumped whenever the session's data changes: saves, queued steps and resets."""
+    session = get_session(session_id)
+    return (session["version"] or 0) if session else 0
+
+
+def response_etag(session_id: str, version: int, path: str, args: dict) -> str:
+    """Validator of an endpoint's response for one data version and query string."""
+    params = sorted((name, str(value)) for name, value in args.items() if name != "session_id")
+    digest = hashlib.sha1(json.dumps([session_id, path, params]).encode()).hexdigest()[:16]
+    return f"{version}-{digest}"
+
+
+def not_modified(etag: str):
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_response(view):
+    """Serve a view that is a pure function of the session's data from ``response_cache``.
+
+    Responses carry a weak ETag of the data version and query string, and a
+    matching ``If-None-Match`` gets a 304 before anything is loaded. Only
+    successful responses are cached, per accepted content encoding.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        session_id = request.args.get("session_id")
+        if not get_session(session_id):
+            return view(*args, **kwargs)
+        version = content_version(session_id)
+        etag = response_etag(session_id, version, request.path, request.args)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        encoding = compact.accepted_encoding(request.headers.get("Accept-Encoding", ""), compact.COMPRESS_MIN_BYTES)
+        key = (request.path, json.dumps(sorted(request.args.items(multi=True))), encoding)
+        entry = response_cache.get(session_id, version, key)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            response.direct_passthrough = False  # files from send_file are read into the cache too
+            # Queued lazy steps run inside the view and bump the version; cache under the one computed from
+            version = content_version(session_id)
+            etag = response_etag(session_id, version, request.path, request.args)
+            entry = (response.get_data(), [(name, value) for name, value in response.headers
+                                           if name not in ("ETag", "Cache-Control", "Content-Length")])
+            response_cache.put(session_id, version, key, *entry)
+        response = app.response_class(entry[0], headers=entry[1])
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    return wrapper
+
+
+def save_cleaned(df: pd.DataFrame, session_id: str, delta: dict | None = None):
+    """Persist the session's working copy in the binary columnar format.
+
+    ``delta`` (from ``cl.operation_delta``) carries the session's column
+    statistics over to the new version; without it they start afresh.
+    """
+    session = get_session(session_id)
+    old_version = file_version(current_source(session)[0])
+    df = apply_schema(session, df.reset_index(drop=True))
+    path = save_working(df, str(UPLOAD_FOLDER / f"{session_id}_cleaned"))
+    version = file_version(path)
+    # Write-through: the next request reads the frame we just produced
+    df_cache.put(session_id, version, df)
+    if delta is None:
+        stats_store.invalidate(session_id)
+    else:
+        stats_store.advance(session_id, old_version, version, delta, df)
+    set_cleaned_path(session_id, path, len(df), {str(c): str(t) for c, t in df.dtypes.items()})
     return path
 
 
-def df_to_json_safe(df: pd.DataFrame) -> list:
-    """Convert dataframe to JSON-serialisable list of dicts."""
-    return json.loads(df.head(200).to_json(orient="records", default_handler=str))
+def get_stats(session_id: str):
+    """Column statistics of the session's current working copy (``stats.FrameStats``)."""
+    path, _ = current_source(get_session(session_id))
+    return stats_store.get(session_id, file_version(path))
+
+
+def use_chunked(session_id: str) -> bool:
+    """Whether a cleaning request should stream the file instead of loading it.
+
+    ``?execution=chunked`` or ``?execution=memory`` forces a mode; otherwise
+    files of at least CHUNKED_MIN_BYTES are processed out of core.
+    ``?execution=lazy`` queues the step instead (see :func:`queue_steps`).
+    """
+    execution = request.args.get("execution")
+    if chunked is None or execution in ("memory", "lazy"):
+        return False
+    session = get_session(session_id)
+    if not session:
+        return False  # let the in-memory path report the 404
+    if execution == "chunked":
+        return True
+    path, _ = current_source(session)
+    return os.path.getsize(path) >= CHUNKED_MIN_BYTES
+
+
+def use_approx(df: pd.DataFrame) -> bool:
+    """Whether IQR statistics of ``df`` should come from quantile sketches.
+
+    ``?approx=1`` or ``?approx=0`` forces a mode; otherwise frames of at least
+    APPROX_MIN_ROWS rows are summarised approximately.
+    """
+    approx = request.args.get("approx")
+    return approx == "1" or (approx != "0" and len(df) >= APPROX_MIN_ROWS)
+
+
+def get_sketches(session_id: str, df: pd.DataFrame) -> dict | None:
+    """Quantile sketches of the working frame, or None for exact quantiles
+    (see :func:`use_approx`).
+
+    The sketches are built once per file version and shared by the summary,
+    report, box plots and outlier removal.
+    """
+    if not use_approx(df):
+        return None
+    path, _ = current_source(get_session(session_id))
+    return df_cache.derive(
+        session_id, file_version(path), "sketches", lambda: cl.build_sketches(df, QUANTILE_EPSILON)
+    )
+
+
+def get_fingerprints(session_id: str, df: pd.DataFrame, path: str | None = None,
+                     subset: list | None = None, near: bool = False):
+    """Row fingerprints of a session frame, computed once per file version.
+
+    ``path`` is the file ``df`` was loaded from and defaults to the current
+    working copy; pass the original upload's path for the original frame.
+    """
+    if path is None:
+        path, _ = current_source(get_session(session_id))
+    name = ("fingerprints", tuple(subset) if subset else None, near)
+    return df_cache.derive(
+        session_id, file_version(path), name, lambda: cl.row_fingerprints(df, subset, near)
+    )
+
+
+def sample_size() -> int | None:
+    """Rows asked for with ``?sample=N`` (see sampling.py); None for exact statistics."""
+    size = request.args.get("sample", type=int)
+    return min(size, SAMPLE_MAX_ROWS) if size and size > 0 else None
+
+
+def get_sample(session_id: str, size: int) -> sampling.Sample:
+    """Uniform row sample of the working data, with queued lazy steps applied.
+
+    The sample is drawn once per file version. A saved Feather working copy
+    that is not in memory is sampled by reading only the sampled rows.
+    """
+    session = get_session(session_id)
+    if not session:
+        raise ValueError("Session not found")
+    if pending_steps(session):
+        get_current_df(session_id)
+        session = get_session(session_id)
+    path, _ = current_source(session)
+    version = file_version(path)
+
+    def draw():
+        df = df_cache.get(session_id, version)
+        total = session["row_count"]
+        if df is None and total is not None and path.endswith(".feather"):
+            return sampling.Sample(take_working_rows(path, sampling.sample_positions(total, size)), total)
+        return sampling.draw(load_working(session) if df is None else df, size)
+
+    return df_cache.derive(session_id, version, ("sample", size), draw)
+
+
+def baseline_path(session_id: str) -> str:
+    return str(UPLOAD_FOLDER / f"{session_id}_baseline.npz")
+
+
+def save_baseline(session_id: str, df: pd.DataFrame, path: str) -> dict:
+    """Profile the original upload ``df`` (parsed from ``path``) and store it with the session."""
+    profile = baseline.build_baseline(df, get_fingerprints(session_id, df, path))
+    baseline.save_patterns(baseline_path(session_id), *viz.missing_patterns(df))
+    metadata.update_session(session_id, baseline=json.dumps(profile))
+    return profile
+
+
+def get_baseline(session: dict) -> tuple:
+    """``(profile, labels, patterns)`` of the original upload (see baseline.py).
+
+    The upload only streams the file, so the baseline is built the first
+    time it is asked for and kept from then on.
+    """
+    session_id = session["session_id"]
+    path = baseline_path(session_id)
+    if session.get("baseline") and os.path.exists(path):
+        profile = json.loads(session["baseline"])
+    else:
+        profile = save_baseline(session_id, load_original(session), session["original_path"])
+    labels, patterns = df_cache.derive(session_id, file_version(path), "baseline", lambda: baseline.load_patterns(path))
+    return profile, labels, patterns
+
+
+def clean_chunked(session_id: str, operation: str, **params) -> dict:
+    """Run one cleaning operation batch by batch and make it the working copy.
+
+    Steps still queued by lazy requests are streamed first, in order.
+    """
+    queued = pending_steps(get_session(session_id))
+    if queued:
+        set_pending_steps(session_id, [])
+        for step in queued:
+            queued_operation, queued_params = CHUNKED_PIPELINE_OPS[step["op"]](step)
+            clean_chunked(session_id, queued_operation, **queued_params)
+    session = get_session(session_id)
+    path, options = current_source(session)
+    result = chunked.clean_file(
+        path, str(UPLOAD_FOLDER / f"{session_id}_cleaned"), operation, options,
+        column_types=column_types(session), **params
+    )
+    df_cache.invalidate(session_id)
+    stats_store.invalidate(session_id)
+    set_cleaned_path(session_id, result["path"], result["after"]["rows"])
+    return result
+
+
+def use_lazy() -> bool:
+    """Whether ``?execution=lazy`` asks to queue a cleaning step instead of running it."""
+    return request.args.get("execution") == "lazy"
+
+
+def queue_steps(session_id: str, steps) -> tuple:
+    """Validate pipeline steps and append them to the session's lazy plan.
+
+    Nothing runs until the data is next read: /api/preview evaluates only the
+    rows it returns, and every other endpoint applies the whole plan once and
+    saves the result as the working copy.
+    """
+    session = get_session(session_id)
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+    path, options = current_source(session)
+    head = next(iter_batches(path, options, 1), None)
+    try:
+        steps = cl.parse_pipeline(steps, [] if head is None else list(head.columns))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    pending = pending_steps(session) + steps
+    set_pending_steps(session_id, pending)
+    return jsonify(
+        {
+            "message": f"{len(steps)} step(s) queued; they run when the data is next read.",
+            "pending": pending,
+            "plan": plan.optimize(pending),
+            "execution": "lazy",
+        }
+    )
+
+
+def use_columnar() -> bool:
+    """Whether ``?format=columnar`` asks for tables as column arrays (see compact.py)."""
+    return request.args.get("format") == "columnar"
+
+
+def json_text_response(body: str):
+    """Response carrying JSON text, compressed when the client accepts it and it is large."""
+    data = body.encode()
+    encoding = compact.accepted_encoding(request.headers.get("Accept-Encoding", ""), len(data))
+    response = app.response_class(compact.compress(data, encoding) if encoding else data, mimetype="application/json")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def compact_response(payload: dict):
+    """``jsonify(payload)``, with tables made columnar on request and the body compressed."""
+    if use_columnar():
+        with metrics.span("serialize.columnar"):
+            payload = compact.columnar(payload)
+    return json_text_response(app.json.dumps(payload))
+
+
+def row_source(session: dict) -> tuple:
+    """``(frame, None)`` when the saved data is in memory or has no random access, else ``(None, row_index)``."""
+    path, options = current_source(session)
+    version = file_version(path)
+    df = df_cache.get(session["session_id"], version)
+    if df is not None:
+        return df, None
+    index = df_cache.derive(session["session_id"], version, "row_index", lambda: build_row_index(path, options))
+    return (load_working(session), None) if index is None else (None, index)
+
+
+def page_types(session: dict, path: str, options: dict | None) -> dict | None:
+    """Column types CSV preview pages are parsed into, so pages agree with each other and the whole file.
+
+    The session's schema once its data has been parsed; before that the
+    types a whole-file parse would infer, found in one streamed pass.
+    """
+    if not path.endswith(".csv"):
+        return None
+    types = column_types(session)
+    if types is None:
+        types = df_cache.derive(session["session_id"], file_version(path), "csv_dtypes",
+                                lambda: scan_dtypes(path, options))
+    return types
+
+
+def preview_window(session: dict, df: pd.DataFrame | None, index, start: int, stop: int, columns: list | None,
+                   filters: list, sort: str | None, descending: bool) -> tuple:
+    """Rows ``[start, stop)`` of the session's saved data after filters and sort.
+
+    ``df`` and ``index`` come from :func:`row_source`. Returns ``(frame,
+    total_rows)`` where ``total_rows`` counts the rows passing the filters.
+    A frame in memory is sliced. Otherwise unsorted windows are read from the
+    file through its row-offset index, and sorted or filtered windows of
+    Feather working copies read the key columns, then take just the window's
+    rows; CSVs are parsed whole for those.
+    """
+    session_id = session["session_id"]
+    path, options = current_source(session)
+    version = file_version(path)
+    if index is not None and not (filters or sort):
+        return read_rows(path, options, index, start, stop, columns, page_types(session, path, options)), index.rows
+    if index is not None and path.endswith(".feather"):
+        keys = paging.key_columns(filters, sort)
+        order = df_cache.derive(
+            session_id, version, ("preview_order", json.dumps(filters), sort, descending),
+            lambda: paging.row_order(read_working_columns(path, keys), filters, sort, descending),
+        )
+        return take_working_rows(path, order[start:stop], columns), len(order)
+    if df is None:
+        df = load_working(session)
+    if filters or sort:
+        order = df_cache.derive(
+            session_id, version, ("preview_order", json.dumps(filters), sort, descending),
+            lambda: paging.row_order(df, filters, sort, descending),
+        )
+        window, total_rows = df.iloc[order[start:stop]], len(order)
+    else:
+        window, total_rows = df.iloc[start:stop], len(df)
+    return (window if columns is None else window[columns]), total_rows
 
 
 # ──────────────────────────── Endpoints ───────────────────────────────────
@@ -124,105 +557,201 @@ def upload():
     if ext not in (".csv", ".xlsx", ".xls"):
         return jsonify({"error": "Only CSV and XLSX files are supported"}), 400
 
-    content = file.read()
-    if len(content) > MAX_FILE_SIZE:
-        return jsonify({"error": "File size exceeds 50 MB limit"}), 400
-
     session_id = str(uuid.uuid4())
     save_path = str(UPLOAD_FOLDER / f"{session_id}_original{ext}")
 
-    with open(save_path, "wb") as f:
-        f.write(content)
+    # Stream to disk in chunks instead of holding the whole body in memory
+    try:
+        file_size = write_upload(file.stream, save_path, MAX_FILE_SIZE)
+    except ValueError:
+        return jsonify({"error": "File size exceeds 50 MB limit"}), 400
 
     try:
-        df = load_df(save_path)
+        csv_options = sniff_csv(save_path) if ext == ".csv" else None
+        rows, column_names, csv_options = scan_shape(save_path, csv_options)
     except Exception as e:
+        os.remove(save_path)
         return jsonify({"error": f"Could not parse file: {str(e)}"}), 400
 
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO sessions VALUES (?,?,?,?,?)",
-        (session_id, file.filename, datetime.utcnow().isoformat(), save_path, None),
+    metadata.create_session(
+        session_id, original_filename=file.filename, original_path=save_path,
+        csv_options=json.dumps(csv_options) if csv_options else None, file_size=file_size, row_count=rows,
     )
-    conn.commit()
-    conn.close()
 
     return jsonify(
         {
             "session_id": session_id,
             "filename": file.filename,
-            "rows": df.shape[0],
-            "columns": df.shape[1],
-            "column_names": df.columns.tolist(),
+            "rows": rows,
+            "columns": len(column_names),
+            "column_names": column_names,
         }
     )
 
 
 @app.route("/api/preview", methods=["GET"])
 def preview():
+    """A window of the session's current rows.
+
+    ``?offset=&limit=`` select the window (``n`` is an older name for
+    ``limit``), ``?columns=a,b`` projects it, ``?sort=col&order=desc`` sorts
+    and ``?filters=[{"column": ..., "op": "gt", "value": ...}]`` filters the
+    rows before the window is cut. Pages past the first are read without
+    parsing the rows before them. ``?format=columnar`` sends the rows as
+    column arrays.
+    """
     session_id = request.args.get("session_id")
-    n = int(request.args.get("n", 50))
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = request.args.get("limit", request.args.get("n", 50, type=int), type=int)
+    limit = max(0, min(limit, PREVIEW_MAX_ROWS))
+    columns = request.args.get("columns")  # comma-separated projection
+    columns = columns.split(",") if columns else None
+    sort = request.args.get("sort") or None
+    descending = request.args.get("order", "asc") == "desc"
+    session = get_session(session_id)
+    if not session:
+        return jsonify({"error": "Session not found"}), 404
+    steps = pending_steps(session)
+    df, index = (load_working(session), None) if steps else row_source(session)
+    all_columns = df.columns.tolist() if df is not None else index.columns
+    unknown = [c for c in (columns or []) + ([sort] if sort else []) if c not in all_columns]
+    if unknown:
+        return jsonify({"error": f"Unknown columns: {', '.join(map(str, unknown))}"}), 400
     try:
-        df = get_current_df(session_id)
+        filters = paging.parse_filters(request.args.get("filters"), all_columns)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 404
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(
+    try:
+        if steps:
+            # Only the rows shown are evaluated; the working copy is left as is
+            epsilon = QUANTILE_EPSILON if use_approx(df) else None
+            ordered = bool(filters or sort)
+            if ordered:
+                # Sorting and filtering need every row of the result, which is too big to cache
+                result, _, _ = plan.execute(df, steps, epsilon)
+                order = paging.row_order(result, filters, sort, descending)
+                window, total_rows = result.iloc[order[offset:offset + limit]], len(order)
+                window = (window if columns is None else window[columns]).set_axis(order[offset:offset + limit])
+            else:
+                key = ("preview", json.dumps(steps), epsilon, offset + limit, tuple(columns) if columns else None)
+                result, total_rows, _ = df_cache.derive(
+                    session_id, file_version(current_source(session)[0]), key,
+                    lambda: plan.execute(df, steps, epsilon, head=offset + limit, columns=columns),
+                )
+                window = result.iloc[offset:].set_axis(pd.RangeIndex(offset, max(offset, len(result))))
+        else:
+            window, total_rows = preview_window(session, df, index, offset, offset + limit, columns, filters, sort,
+                                                descending)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    body = paging.json_object(
         {
-            "rows": df_to_json_safe(df.head(n)),
-            "columns": df.columns.tolist(),
-            "total_rows": len(df),
-            "total_columns": df.shape[1],
-        }
+            "columns": [str(c) for c in window.columns],
+            "offset": offset,
+            "limit": limit,
+            "total_rows": int(total_rows),
+            "total_columns": len(all_columns),
+            "pending_steps": len(steps),
+        },
+        rows=compact.frame_table(window) if use_columnar() else paging.records_json(window),
+        row_numbers=json.dumps(window.index.tolist()),
     )
+    return json_text_response(body)
 
 
 @app.route("/api/summary", methods=["GET"])
+@cached_response
 def summary():
     session_id = request.args.get("session_id")
+    size = sample_size()
     try:
+        sample = get_sample(session_id, size) if size else None
+        if sample is not None and not sample.exact:
+            return sampled_summary(sample)
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
-    missing = cl.detect_missing(df)
-    duplicates = cl.detect_duplicates(df)
-    outliers = cl.detect_outliers(df)
-    quality = cl.compute_quality_score(df)
-    insights = cl.generate_insights(df, quality)
-    suggestions = cl.get_suggested_actions(df)
-    dtypes = cl.get_data_types_summary(df)
-
-    describe_raw = df.describe(include="all").to_dict()
-    # Make describe JSON-safe
-    describe_safe = {}
-    for col, val_dict in describe_raw.items():
-        describe_safe[col] = {
-            k: (None if (isinstance(v, float) and np.isnan(v)) else v)
-            for k, v in val_dict.items()
-        }
+    stats = get_stats(session_id)
+    profile = cl.build_profile(
+        df, get_sketches(session_id, df), get_fingerprints(session_id, df), stats.null_counts(df), column_executor
+    )
+    quality = profile["quality"]
+    insights = cl.generate_insights(df, quality, profile)
+    suggestions = cl.get_suggested_actions(df, profile)
+    dtypes = cl.get_data_types_summary(df, stats.unique_counts(df))
 
-    return jsonify(
+    return compact_response(
         {
-            "missing": missing,
-            "duplicates": duplicates,
-            "outliers": outliers,
+            "missing": profile["missing"],
+            "duplicates": profile["duplicates"],
+            "outliers": profile["outliers"],
             "quality": quality,
             "insights": insights,
             "suggestions": suggestions,
             "data_types": dtypes,
-            "describe": describe_safe,
+            "describe": describe_json(stats.describe(df)),
             "rows": df.shape[0],
             "columns": df.shape[1],
         }
     )
 
 
+def describe_json(describe: pd.DataFrame) -> dict:
+    """``describe()`` output by column, made JSON-safe (NaN as None)."""
+    return {
+        col: {k: (None if (isinstance(v, float) and np.isnan(v)) else v) for k, v in val_dict.items()}
+        for col, val_dict in describe.to_dict().items()
+    }
+
+
+def sampled_summary(sample: sampling.Sample):
+    """The summary computed on a row sample, with counts and the quality score estimated for the whole frame.
+
+    ``describe`` and ``data_types`` are the sample's own.
+    """
+    df = sample.frame
+    profile = sampling.estimate_profile(cl.build_profile(df, executor=column_executor), sample, SAMPLE_CONFIDENCE)
+    return compact_response(
+        {
+            "missing": profile["missing"],
+            "duplicates": profile["duplicates"],
+            "outliers": profile["outliers"],
+            "quality": profile["quality"],
+            "insights": cl.generate_insights(df, profile["quality"], profile),
+            "suggestions": cl.get_suggested_actions(df, profile),
+            "data_types": cl.get_data_types_summary(df, executor=column_executor),
+            "describe": describe_json(df.describe(include="all")),
+            "rows": sample.total,
+            "columns": df.shape[1],
+            "sample": sample.info(SAMPLE_CONFIDENCE, exact_job="summary",
+                                  approximate=["missing", "duplicates", "outliers", "quality", "insights",
+                                               "suggestions", "data_types", "describe"]),
+        }
+    )
+
+
 @app.route("/api/clean/missing", methods=["POST"])
 def clean_missing():
     session_id = request.args.get("session_id")
     data = request.get_json(silent=True) or {}
     strategy = data.get("strategy", "mean")  # mean | median | mode | drop
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "missing", "strategy": strategy}])
+    if use_chunked(session_id):
+        op = "drop_missing" if strategy == "drop" else "fill_missing"
+        result = clean_chunked(session_id, op, strategy=strategy)
+        return jsonify(
+            {
+                "message": f"Missing values handled using '{strategy}' strategy.",
+                "before": result["before"],
+                "after": result["after"],
+                "fill_values": result.get("fill_values", {}),
+                "execution": "chunked",
+            }
+        )
     try:
         df = get_current_df(session_id)
     except ValueError as e:
@@ -231,12 +760,14 @@ def clean_missing():
     before_missing = int(df.isnull().sum().sum())
     before_rows = len(df)
 
+    fill_values = {}
     if strategy == "drop":
         cleaned = cl.drop_missing(df)
     else:
-        cleaned = cl.fill_missing(df, strategy)
+        fill_values = cl.compute_fill_values(df, strategy)
+        cleaned = cl.fill_missing(df, strategy, fill_values)
 
-    save_cleaned(cleaned, session_id)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, list(fill_values)))
     after_missing = int(cleaned.isnull().sum().sum())
 
     return jsonify(
@@ -244,6 +775,7 @@ def clean_missing():
             "message": f"Missing values handled using '{strategy}' strategy.",
             "before": {"missing": before_missing, "rows": before_rows},
             "after": {"missing": after_missing, "rows": len(cleaned)},
+            "fill_values": fill_values,
         }
     )
 
@@ -251,18 +783,43 @@ def clean_missing():
 @app.route("/api/clean/duplicates", methods=["POST"])
 def clean_duplicates():
     session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    subset = data.get("subset") or None  # columns that make up the row key
+    near = bool(data.get("near", False))  # ignore case, whitespace and float noise
+    if subset is not None and not isinstance(subset, list):
+        return jsonify({"error": "subset must be a list of column names"}), 400
+    message = "Near-duplicate rows removed." if near else "Duplicate rows removed."
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "duplicates", "subset": subset, "near": near}])
+    if use_chunked(session_id):
+        try:
+            result = clean_chunked(session_id, "remove_duplicates", subset=subset, near=near)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(
+            {
+                "message": message,
+                "before": {"duplicates": result["removed_rows"], "rows": result["before"]["rows"]},
+                "after": {"duplicates": 0, "rows": result["after"]["rows"]},
+                "execution": "chunked",
+            }
+        )
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
+    unknown = [c for c in subset or [] if c not in df.columns]
+    if unknown:
+        return jsonify({"error": f"Unknown columns: {', '.join(map(str, unknown))}"}), 400
 
-    before = int(df.duplicated().sum())
-    cleaned = cl.remove_duplicates(df)
-    save_cleaned(cleaned, session_id)
+    fingerprints = get_fingerprints(session_id, df, subset=subset, near=near)
+    before = int(cl.duplicate_mask(fingerprints).sum())
+    cleaned = cl.remove_duplicates(df, fingerprints=fingerprints)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned))
 
     return jsonify(
         {
-            "message": "Duplicate rows removed.",
+            "message": message,
             "before": {"duplicates": before, "rows": len(df)},
             "after": {"duplicates": 0, "rows": len(cleaned)},
         }
@@ -272,19 +829,42 @@ def clean_duplicates():
 @app.route("/api/clean/outliers", methods=["POST"])
 def clean_outliers():
     session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode", "drop")  # drop | clip
+    if mode not in ("drop", "clip"):
+        return jsonify({"error": "mode must be 'drop' or 'clip'"}), 400
+    message = (
+        "Outliers capped to the IQR fences (winsorized)."
+        if mode == "clip"
+        else "Outliers removed using IQR method."
+    )
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "outliers", "mode": mode}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "remove_outliers", mode=mode)
+        return jsonify(
+            {
+                "message": message,
+                "before": {"outliers": result["outliers"], "rows": result["before"]["rows"]},
+                "after": {"outliers": 0, "rows": result["after"]["rows"]},
+                "execution": "chunked",
+            }
+        )
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
-    oi = cl.detect_outliers(df)
+    sketches = get_sketches(session_id, df)
+    oi = cl.detect_outliers(df, sketches=sketches)
     before = oi["total_outliers"]
-    cleaned = cl.remove_outliers(df)
-    save_cleaned(cleaned, session_id)
+    cleaned = cl.remove_outliers(df, mode, sketches)
+    capped = [col for col, info in oi["outliers_per_column"].items() if info["count"]] if mode == "clip" else []
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, capped))
 
     return jsonify(
         {
-            "message": "Outliers removed using IQR method.",
+            "message": message,
             "before": {"outliers": before, "rows": len(df)},
             "after": {"outliers": 0, "rows": len(cleaned)},
         }
@@ -294,13 +874,25 @@ def clean_outliers():
 @app.route("/api/clean/normalize", methods=["POST"])
 def clean_normalize():
     session_id = request.args.get("session_id")
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "normalize"}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "normalize")
+        return jsonify(
+            {
+                "message": "Numeric columns normalized (Min-Max scaling).",
+                "rows": result["after"]["rows"],
+                "columns": result["columns"],
+                "execution": "chunked",
+            }
+        )
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
     cleaned = cl.normalize_data(df)
-    save_cleaned(cleaned, session_id)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, df.select_dtypes(include=[np.number]).columns))
 
     return jsonify(
         {
@@ -314,13 +906,25 @@ def clean_normalize():
 @app.route("/api/clean/standardize", methods=["POST"])
 def clean_standardize():
     session_id = request.args.get("session_id")
+    if use_lazy():
+        return queue_steps(session_id, [{"op": "standardize"}])
+    if use_chunked(session_id):
+        result = clean_chunked(session_id, "standardize")
+        return jsonify(
+            {
+                "message": "Numeric columns standardized (Z-score scaling).",
+                "rows": result["after"]["rows"],
+                "columns": result["columns"],
+                "execution": "chunked",
+            }
+        )
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
     cleaned = cl.standardize_columns(df)
-    save_cleaned(cleaned, session_id)
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, df.select_dtypes(include=[np.number]).columns))
 
     return jsonify(
         {
@@ -331,63 +935,196 @@ def clean_standardize():
     )
 
 
+CHUNKED_PIPELINE_OPS = {
+    "missing": lambda step: ("drop_missing" if step["strategy"] == "drop" else "fill_missing", {"strategy": step["strategy"]}),
+    "duplicates": lambda step: ("remove_duplicates", {"subset": step["subset"], "near": step["near"]}),
+    "outliers": lambda step: ("remove_outliers", {"mode": step["mode"]}),
+    "normalize": lambda step: ("normalize", {}),
+    "standardize": lambda step: ("standardize", {}),
+}
+
+
+@app.route("/api/clean/pipeline", methods=["POST"])
+def clean_pipeline():
+    """Run an ordered list of cleaning steps in one request.
+
+    Body: ``{"steps": [{"op": "missing", "strategy": "median"},
+    {"op": "duplicates"}, {"op": "outliers", "mode": "clip"}, ...]}``. In
+    memory the steps share one frame and the result is written once; in
+    chunked mode each step streams the previous step's working copy; with
+    ``?execution=lazy`` the steps are queued.
+    """
+    session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    if use_lazy():
+        return queue_steps(session_id, data.get("steps"))
+    start = time.perf_counter()
+    if use_chunked(session_id):
+        path, options = current_source(get_session(session_id))
+        head = next(iter_batches(path, options, 1), None)
+        try:
+            steps = cl.parse_pipeline(data.get("steps"), [] if head is None else list(head.columns))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        report = []
+        for i, step in enumerate(steps):
+            jobs.report(i / len(steps), f"{i}/{len(steps)} steps done")
+            operation, params = CHUNKED_PIPELINE_OPS[step["op"]](step)
+            step_start = time.perf_counter()
+            result = clean_chunked(session_id, operation, **params)
+            entry = {**step, "ms": round((time.perf_counter() - step_start) * 1000, 2),
+                     "before": result["before"], "after": result["after"]}
+            if step["op"] == "missing":
+                entry["fill_values"] = result.get("fill_values", {})
+            elif step["op"] == "duplicates":
+                entry["duplicates"] = result["removed_rows"]
+            elif step["op"] == "outliers":
+                entry["outliers"] = result["outliers"]
+            report.append(entry)
+        return jsonify(
+            {
+                "message": f"Pipeline of {len(steps)} steps applied.",
+                "steps": report,
+                "before": report[0]["before"],
+                "after": report[-1]["after"],
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+                "execution": "chunked",
+            }
+        )
+    try:
+        df = get_current_df(session_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    try:
+        steps = cl.parse_pipeline(data.get("steps"), df.columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    epsilon = QUANTILE_EPSILON if use_approx(df) else None
+    cleaned, report, changed = cl.run_pipeline(
+        df, steps, epsilon, progress=lambda done, total: jobs.report(done / total, f"{done}/{total} steps done")
+    )
+    save_cleaned(cleaned, session_id, cl.operation_delta(df, cleaned, changed))
+
+    return jsonify(
+        {
+            "message": f"Pipeline of {len(steps)} steps applied.",
+            "steps": report,
+            "before": report[0]["before"],
+            "after": report[-1]["after"],
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+    )
+
+
 @app.route("/api/visualize", methods=["GET"])
+@cached_response
 def visualize():
     session_id = request.args.get("session_id")
+    heatmap_rows = max(0, min(request.args.get("heatmap_rows", 100, type=int), HEATMAP_MAX_ROWS))
+    heatmap_strategy = request.args.get("heatmap_strategy", "head")  # head | uniform | stratified
+    heatmap_encoding = request.args.get("heatmap_encoding", "rle")  # rle | bits
+    if heatmap_strategy not in viz.HEATMAP_STRATEGIES or heatmap_encoding not in viz.HEATMAP_ENCODINGS:
+        return jsonify({"error": "Unknown heatmap_strategy or heatmap_encoding"}), 400
+    size = sample_size()
     try:
         # Always compare original vs current cleaned
         session = get_session(session_id)
         if not session:
             return jsonify({"error": "Session not found"}), 404
 
-        original_df = load_df(session["original_path"])
+        # The original upload is compared through its stored baseline profile
+        original, labels, patterns = get_baseline(session)
+        heatmap = viz.pattern_heatmap(original["columns"], labels, patterns, heatmap_rows, heatmap_strategy,
+                                      heatmap_encoding)
+        current = get_sample(session_id, size) if size else None
+        if current is not None and not current.exact:
+            return sampled_charts(current, original, heatmap)
         current_df = get_current_df(session_id)
+        stats = get_stats(session_id)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    return jsonify(
+    return compact_response(
+        {
+            "bar_charts": viz.bar_chart_data(current_df, stats),
+            "histograms": viz.histogram_data(current_df, stats=stats),
+            "original_histograms": original["histograms"],
+            "boxplots": viz.boxplot_data(current_df, get_sketches(session_id, current_df), column_executor),
+            "correlation": viz.correlation_matrix(current_df, stats),
+            "missing_heatmap": heatmap,
+            "before_after": viz.before_after_chart(
+                original,
+                viz.frame_counts(current_df, get_fingerprints(session_id, current_df), stats.null_counts(current_df)),
+            ),
+        }
+    )
+
+
+def sampled_charts(current: sampling.Sample, original: dict, heatmap: dict):
+    """The charts computed on a row sample of the current data, with whole-frame estimates.
+
+    ``original`` is the upload's baseline profile; the comparison's "Before"
+    bars and the heatmap of the original are exact.
+    """
+    df = current.frame
+    return compact_response(
         {
-            "bar_charts": viz.bar_chart_data(current_df),
-            "histograms": viz.histogram_data(current_df),
-            "boxplots": viz.boxplot_data(current_df),
-            "correlation": viz.correlation_matrix(current_df),
-            "missing_heatmap": viz.missing_heatmap(original_df),
-            "before_after": viz.before_after_comparison(original_df, current_df),
+            "bar_charts": sampling.estimate_bar_charts(viz.bar_chart_data(df), current, SAMPLE_CONFIDENCE),
+            "histograms": sampling.estimate_histograms(viz.histogram_data(df, executor=column_executor), current,
+                                                       SAMPLE_CONFIDENCE),
+            "boxplots": sampling.estimate_boxplots(viz.boxplot_data(df, executor=column_executor), current,
+                                                   SAMPLE_CONFIDENCE),
+            "original_histograms": original["histograms"],
+            "correlation": sampling.estimate_correlation(viz.correlation_matrix(df), current, SAMPLE_CONFIDENCE),
+            "missing_heatmap": heatmap,
+            "before_after": sampling.estimate_before_after(
+                viz.before_after_chart(original, viz.frame_counts(df)), current, SAMPLE_CONFIDENCE
+            ),
+            "sample": current.info(SAMPLE_CONFIDENCE, exact_job="visualize",
+                                   approximate=["bar_charts", "histograms", "boxplots", "correlation",
+                                                "before_after"]),
         }
     )
 
 
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def write_export(df: pd.DataFrame, fmt: str, target):
+    """Write ``df`` as CSV or Excel to a path or binary buffer."""
+    with metrics.span(f"serialize.{fmt}", rows=len(df), columns=df.shape[1]):
+        if fmt == "xlsx":
+            df.to_excel(target, index=False)
+        else:
+            df.to_csv(target, index=False)
+
+
 @app.route("/api/download", methods=["GET"])
 def download():
     session_id = request.args.get("session_id")
-    fmt = request.args.get("format", "csv")
+    fmt = "xlsx" if request.args.get("format") == "xlsx" else "csv"
     try:
         df = get_current_df(session_id)
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
     buf = io.BytesIO()
-    if fmt == "xlsx":
-        df.to_excel(buf, index=False)
-        buf.seek(0)
-        return send_file(
-            buf,
-            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            as_attachment=True,
-            download_name=f"cleaned_data_{session_id[:8]}.xlsx",
-        )
-    else:
-        buf.write(df.to_csv(index=False).encode())
-        buf.seek(0)
-        return send_file(
-            buf,
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=f"cleaned_data_{session_id[:8]}.csv",
-        )
+    write_export(df, fmt, buf)
+    buf.seek(0)
+    return send_file(
+        buf,
+        mimetype=EXPORT_MIMETYPES[fmt],
+        as_attachment=True,
+        download_name=f"cleaned_data_{session_id[:8]}.{fmt}",
+    )
 
 
 @app.route("/api/report", methods=["GET"])
+@cached_response
 def report():
     """Download a simple text quality report."""
     session_id = request.args.get("session_id")
@@ -396,11 +1133,15 @@ def report():
     except ValueError as e:
         return jsonify({"error": str(e)}), 404
 
-    quality = cl.compute_quality_score(df)
-    insights = cl.generate_insights(df, quality)
-    missing = cl.detect_missing(df)
-    dup = cl.detect_duplicates(df)
-    outlier = cl.detect_outliers(df)
+    profile = cl.build_profile(
+        df, get_sketches(session_id, df), get_fingerprints(session_id, df), get_stats(session_id).null_counts(df),
+        column_executor,
+    )
+    quality = profile["quality"]
+    insights = cl.generate_insights(df, quality, profile)
+    missing = profile["missing"]
+    dup = profile["duplicates"]
+    outlier = profile["outliers"]
 
     lines = [
         "DATA CLEANING BASICS — QUALITY REPORT",
@@ -445,18 +1186,184 @@ def report():
 def reset():
     """Reset cleaned file back to original."""
     session_id = request.args.get("session_id")
-    conn = get_db()
-    conn.execute(
-        "UPDATE sessions SET cleaned_path=NULL WHERE session_id=?", (session_id,)
-    )
-    conn.commit()
-    conn.close()
+    metadata.update_session(session_id, bump_version=True, cleaned_path=None, pending_steps=None, row_count=None,
+                            dtypes=None)
+    df_cache.invalidate(session_id)
+    response_cache.invalidate(session_id)
+    stats_store.invalidate(session_id)
     return jsonify({"message": "Dataset reset to original."})
 
 
+# ──────────────────────────── Background jobs ──────────────────────────────
+JOB_ENDPOINTS = {
+    "missing": ("/api/clean/missing", "POST"),
+    "duplicates": ("/api/clean/duplicates", "POST"),
+    "outliers": ("/api/clean/outliers", "POST"),
+    "normalize": ("/api/clean/normalize", "POST"),
+    "standardize": ("/api/clean/standardize", "POST"),
+    "pipeline": ("/api/clean/pipeline", "POST"),
+    "summary": ("/api/summary", "GET"),
+    "visualize": ("/api/visualize", "GET"),
+    "download": ("/api/download", "GET"),
+}
+
+
+CACHED_PATHS = ("/api/summary", "/api/visualize")  # job endpoints wrapped in cached_response
+
+
+def run_job(job: dict) -> tuple:
+    """Run a job through the endpoint it stands for; returns ``(result, fields)`` for ``jobs.JobQueue``.
+
+    ``params`` is the endpoint's JSON body and ``args`` its query string.
+    Downloads write their file next to the uploads instead of streaming it.
+    """
+    path, method = JOB_ENDPOINTS[job["kind"]]
+    args = {**(job["args"] or {}), "session_id": job["session_id"]}
+    headers = {TIMING_HEADER: "1"}  # the job keeps the Server-Timing of the request it ran
+    with app.test_request_context(path, method=method, query_string=args, json=job["params"] or {}, headers=headers):
+        if job["kind"] == "download":
+            fmt = "xlsx" if args.get("format") == "xlsx" else "csv"
+            df = get_current_df(job["session_id"])
+            jobs.report(0.5, f"Writing {fmt.upper()} file")
+            result_path = str(UPLOAD_FOLDER / f"{job['job_id']}_export.{fmt}")
+            write_export(df, fmt, result_path)
+            filename = f"cleaned_data_{job['session_id'][:8]}.{fmt}"
+            result = {"filename": filename, "format": fmt, "bytes": os.path.getsize(result_path)}
+            return result, {"result_path": result_path}
+        response = app.full_dispatch_request()
+    result = response.get_json()
+    if response.status_code >= 400:
+        raise RuntimeError((result or {}).get("error", f"{job['kind']} failed ({response.status_code})"))
+    return result, {"etag": response.headers.get("ETag"), "timing": response.headers.get("Server-Timing")}
+
+
+job_queue = jobs.JobQueue(metadata.connection, run_job, JOB_WORKERS)
+
+
+@app.before_request
+def start_jobs():
+    # Started with the first request, so the debug reloader's parent process never runs jobs
+    job_queue.start()
+
+
+def public_job(job: dict) -> dict:
+    return {key: value for key, value in job.items() if key != "result_path"}
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Run a cleaning step, pipeline, summary or export in the background.
+
+    Body: ``{"kind": "pipeline", "params": {...}, "args": {...}}`` where
+    ``params`` is the JSON body and ``args`` the query string the endpoint
+    would take. Returns the job at once; poll ``/api/jobs/<job_id>`` and
+    fetch ``/api/jobs/<job_id>/result`` when it is done. Finished jobs of
+    cached endpoints carry the response's ETag: sending it back as
+    ``If-None-Match`` gets a 304 instead of a new job while the data is
+    unchanged.
+    """
+    session_id = request.args.get("session_id")
+    data = request.get_json(silent=True) or {}
+    if data.get("kind") not in JOB_ENDPOINTS:
+        return jsonify({"error": f"kind must be one of {', '.join(JOB_ENDPOINTS)}"}), 400
+    if not get_session(session_id):
+        return jsonify({"error": "Session not found"}), 404
+    path = JOB_ENDPOINTS[data["kind"]][0]
+    if path in CACHED_PATHS:
+        etag = response_etag(session_id, content_version(session_id), path, data.get("args") or {})
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+    job = job_queue.submit(session_id, data["kind"], data.get("params"), data.get("args"))
+    return jsonify(public_job(job)), 202
+
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    session_id = request.args.get("session_id")
+    return jsonify({"jobs": [public_job(job) for job in job_queue.list(session_id)]})
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(public_job(job))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"]}), 500
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}"}), 409
+    if job["result_path"]:
+        if not os.path.exists(job["result_path"]):
+            return jsonify({"error": "Result file no longer exists"}), 410
+        return send_file(
+            job["result_path"],
+            mimetype=EXPORT_MIMETYPES[job["result"]["format"]],
+            as_attachment=True,
+            download_name=job["result"]["filename"],
+        )
+    return jsonify(job["result"])
+
+
+@app.errorhandler(413)
+def too_large(e):
+    return jsonify({"error": "File size exceeds 50 MB limit"}), 413
+
+
+# ──────────────────────────── Request metrics ──────────────────────────────
+@app.before_request
+def start_timing():
+    request.environ["dcb.start"] = time.perf_counter()
+    if request.headers.get(TIMING_HEADER) == "1":
+        request.environ["dcb.traced"] = True
+        metrics.start_trace()
+
+
+@app.after_request
+def record_timing(response):
+    start = request.environ.pop("dcb.start", None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe_request(endpoint, request.method, response.status_code, elapsed, response.content_length or 0)
+    if request.environ.pop("dcb.traced", False):
+        response.headers["Server-Timing"] = server_timing(metrics.end_trace(), elapsed)
+    return response
+
+
+@app.teardown_request
+def end_timing(error=None):
+    # Requests that failed before after_request still close their trace
+    if request.environ.pop("dcb.traced", False):
+        metrics.end_trace()
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Span and request metrics in the Prometheus text format."""
+    gauges = {}
+    for source, stats in (("frames", df_cache.stats()), ("responses", response_cache.stats())):
+        for name, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.setdefault(f"cache_{name}", {})[source] = value
+    for name, value in metadata.stats().items():
+        if isinstance(value, int):
+            gauges.setdefault(f"metadata_{name}", {})["sqlite"] = value
+    return app.response_class(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({"status": "ok", "cache": df_cache.stats(), "responses": response_cache.stats(),
+                    "executor": column_executor.stats(), "metadata": metadata.stats()})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+"""
+Baseline profile of a session's original upload.
+
+The before/after charts compare the current data with the file as it was
+uploaded, which never changes. Its statistics are therefore computed once,
+the first time a chart needs them (the upload itself only streams the
+file), and kept with the session: the profile (row count, null counts,
+duplicate count, histogram bins) as JSON in the ``sessions.baseline``
+column, and the rows' missing-value patterns for the heatmap in a
+compressed ``.npz`` next to the upload. Each row's pattern id
+plus one isna() row per distinct pattern rebuild the heatmap of any row
+sample exactly, for every sampling strategy, in a fraction of the size of
+the bitmap. Charts then only need the current frame.
+"""
+import numpy as np
+import pandas as pd
+
+import visualization as viz
+
+
+def build_baseline(df: pd.DataFrame, fingerprints: np.ndarray | None = None) -> dict:
+    """JSON-ready profile of the original frame; ``rows``, ``missing`` and ``duplicates``
+    are the keys ``visualization.before_after_chart`` compares."""
+    null_counts = df.isnull().sum()
+    return {
+        **viz.frame_counts(df, fingerprints, null_counts),
+        "columns": [str(c) for c in df.columns],
+        "null_counts": {str(col): int(n) for col, n in null_counts.items()},
+        "histograms": viz.histogram_data(df),
+    }
+
+
+def save_patterns(path: str, labels: np.ndarray, patterns: np.ndarray):
+    """Write ``visualization.missing_patterns`` output, with labels in the narrowest integer type."""
+    dtype = np.min_scalar_type(max(len(patterns) - 1, 0))
+    with open(path, "wb") as f:
+        np.savez_compressed(f, labels=labels.astype(dtype), patterns=patterns)
+
+
+def load_patterns(path: str) -> tuple:
+    """``(labels, patterns)`` as written by :func:`save_patterns`."""
+    with np.load(path) as data:
+        return data["labels"].astype(np.intp), data["patterns"]
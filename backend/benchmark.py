@@ -0,0 +1,456 @@
+"""
+Offline benchmarks of the cleaning and chart functions and of the API.
+
+Generates synthetic datasets over a grid of shapes (narrow or wide), row
+counts, null densities, duplicate ratios and categorical cardinalities,
+then times every public function in cleaning.py and visualization.py and
+the load-time type narrowing of schema.py on each, plus the main endpoints through Flask's test client (no server
+needed). Results go to a JSON file; with ``--baseline`` every timing is
+compared with a previous run and the script exits with status 1 when one
+regressed past the thresholds, so it can gate CI.
+
+    python benchmark.py --rows 10000 100000 --shape narrow wide -o bench.json
+    python benchmark.py --rows 1000000 --only "remove_*" "GET *" --baseline bench.json
+
+Times are the median of ``--repeat`` runs after ``--warmup`` untimed ones.
+Peak memory is measured in one more run under tracemalloc, which sees
+NumPy and pandas buffers (not Arrow's); it is the peak of allocations made
+by the call itself, on top of the input frame. Endpoint runs upload the
+dataset as a CSV for every repeat, so each request sees fresh caches, and
+datasets over the upload size limit skip them.
+"""
+import argparse
+import fnmatch
+import functools
+import glob
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import cleaning as cl
+import schema
+import visualization as viz
+
+SHAPES = {"narrow": 8, "wide": 100}
+COLUMN_KINDS = ("float", "int", "category", "float", "category", "date", "int", "float")
+NULLS = {"float": np.nan, "int": np.nan, "category": None, "date": np.datetime64("NaT")}
+PIPELINE = [{"op": "missing", "strategy": "median"}, {"op": "duplicates"}, {"op": "outliers", "mode": "clip"},
+            {"op": "normalize"}]
+
+
+def make_dataset(rows: int, columns: int, null_density: float = 0.05, duplicate_ratio: float = 0.05,
+                 cardinality: int = 20, seed: int = 0) -> pd.DataFrame:
+    """A frame of ``rows`` x ``columns`` mixed-type synthetic data.
+
+    Columns cycle through COLUMN_KINDS. Each cell of the distinct rows is
+    missing with probability ``null_density``; ``duplicate_ratio`` of the
+    rows are exact copies of other rows; categorical columns draw from
+    ``cardinality`` labels; about 1% of float values are far outliers.
+    """
+    rng = np.random.default_rng(seed)
+    distinct = rows - int(rows * duplicate_ratio)
+    copies = rng.integers(0, max(distinct, 1), rows - distinct)
+    order = rng.permutation(rows)
+    data = {}
+    for i in range(columns):
+        kind = COLUMN_KINDS[i % len(COLUMN_KINDS)]
+        name = f"{kind}_{i}"
+        if kind == "float":
+            values = rng.normal(50.0, 15.0, rows)
+            values[rng.random(rows) < 0.01] *= 10
+        elif kind == "int":
+            values = rng.integers(0, 1000, rows)
+        elif kind == "category":
+            labels = np.array([f"{name}_{k}" for k in range(cardinality)], dtype=object)
+            values = labels[rng.integers(0, cardinality, rows)]
+        else:
+            values = np.datetime64("2020-01-01") + rng.integers(0, 1500, rows).astype("timedelta64[D]")
+        missing = rng.random(distinct) < null_density
+        if missing.any():
+            if kind == "int":
+                values = values.astype("float64")  # as pandas reads integer columns with gaps
+            values[:distinct][missing] = NULLS[kind]
+        values[distinct:] = values[copies]
+        data[name] = values[order]
+    return pd.DataFrame(data)
+
+
+class Fixtures:
+    """Inputs some functions need besides the frame, built once per dataset and not timed."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    @functools.cached_property
+    def fingerprints(self):
+        return cl.row_fingerprints(self.df)
+
+    @functools.cached_property
+    def sketches(self):
+        return cl.build_sketches(self.df)
+
+    @functools.cached_property
+    def quality(self):
+        return cl.compute_quality_score(self.df)
+
+    @functools.cached_property
+    def patterns(self):
+        return viz.missing_patterns(self.df)
+
+    @functools.cached_property
+    def optimized(self):
+        return schema.optimize(self.df)
+
+    @functools.cached_property
+    def filled(self):
+        return cl.fill_missing(self.df, "mean")
+
+    @functools.cached_property
+    def pipeline(self):
+        return cl.parse_pipeline(PIPELINE, list(self.df.columns))
+
+    @functools.cached_property
+    def cleaned(self):
+        return cl.run_pipeline(self.df, self.pipeline)[0]
+
+
+# (name, fixtures used, call); names in brackets are variants of one function
+CLEANING_CASES = [
+    ("detect_missing", (), lambda fx: cl.detect_missing(fx.df)),
+    ("compute_fill_values[mean]", (), lambda fx: cl.compute_fill_values(fx.df, "mean")),
+    ("compute_fill_values[median]", (), lambda fx: cl.compute_fill_values(fx.df, "median")),
+    ("compute_fill_values[mode]", (), lambda fx: cl.compute_fill_values(fx.df, "mode")),
+    ("fill_missing[mean]", (), lambda fx: cl.fill_missing(fx.df, "mean")),
+    ("fill_missing[median]", (), lambda fx: cl.fill_missing(fx.df, "median")),
+    ("fill_missing[mode]", (), lambda fx: cl.fill_missing(fx.df, "mode")),
+    ("drop_missing", (), lambda fx: cl.drop_missing(fx.df)),
+    ("near_duplicate_key", (), lambda fx: cl.near_duplicate_key(fx.df)),
+    ("row_fingerprints", (), lambda fx: cl.row_fingerprints(fx.df)),
+    ("row_fingerprints[near]", (), lambda fx: cl.row_fingerprints(fx.df, near=True)),
+    ("duplicate_mask", ("fingerprints",), lambda fx: cl.duplicate_mask(fx.fingerprints)),
+    ("detect_duplicates", (), lambda fx: cl.detect_duplicates(fx.df)),
+    ("remove_duplicates", (), lambda fx: cl.remove_duplicates(fx.df)),
+    ("remove_duplicates[near]", (), lambda fx: cl.remove_duplicates(fx.df, near=True)),
+    ("build_sketches", (), lambda fx: cl.build_sketches(fx.df)),
+    ("iqr_bounds", (), lambda fx: cl.iqr_bounds(fx.df)),
+    ("iqr_bounds[sketches]", ("sketches",), lambda fx: cl.iqr_bounds(fx.df, fx.sketches)),
+    ("detect_outliers", (), lambda fx: cl.detect_outliers(fx.df)),
+    ("remove_outliers[drop]", (), lambda fx: cl.remove_outliers(fx.df, "drop")),
+    ("remove_outliers[clip]", (), lambda fx: cl.remove_outliers(fx.df, "clip")),
+    ("scaling_params[normalize]", (), lambda fx: cl.scaling_params(fx.df, "normalize")),
+    ("scaling_params[standardize]", (), lambda fx: cl.scaling_params(fx.df, "standardize")),
+    ("normalize_data", (), lambda fx: cl.normalize_data(fx.df)),
+    ("standardize_columns", (), lambda fx: cl.standardize_columns(fx.df)),
+    ("build_profile", (), lambda fx: cl.build_profile(fx.df)),
+    ("compute_quality_score", (), lambda fx: cl.compute_quality_score(fx.df)),
+    ("quality_from_ratios", (), lambda fx: cl.quality_from_ratios(0.1, 0.05, 0.02)),
+    ("generate_insights", ("quality",), lambda fx: cl.generate_insights(fx.df, fx.quality)),
+    ("get_suggested_actions", (), lambda fx: cl.get_suggested_actions(fx.df)),
+    ("operation_delta", ("filled",), lambda fx: cl.operation_delta(fx.df, fx.filled, fx.df.columns)),
+    ("get_data_types_summary", (), lambda fx: cl.get_data_types_summary(fx.df)),
+    ("parse_pipeline", (), lambda fx: cl.parse_pipeline(PIPELINE, list(fx.df.columns))),
+    ("run_pipeline", ("pipeline",), lambda fx: cl.run_pipeline(fx.df, fx.pipeline)),
+    ("schema.optimize", (), lambda fx: schema.optimize(fx.df)),
+    ("schema.apply", ("optimized",), lambda fx: schema.apply(fx.df, fx.optimized[1])),
+]
+
+VISUALIZATION_CASES = [
+    ("bar_chart_data", (), lambda fx: viz.bar_chart_data(fx.df)),
+    ("histogram_data", (), lambda fx: viz.histogram_data(fx.df)),
+    ("boxplot_data", (), lambda fx: viz.boxplot_data(fx.df)),
+    ("boxplot_data[sketches]", ("sketches",), lambda fx: viz.boxplot_data(fx.df, fx.sketches)),
+    ("correlation_matrix", (), lambda fx: viz.correlation_matrix(fx.df)),
+    ("sample_positions[head]", (), lambda fx: viz.sample_positions(fx.df, 100, "head")),
+    ("sample_positions[uniform]", (), lambda fx: viz.sample_positions(fx.df, 100, "uniform")),
+    ("sample_positions[stratified]", (), lambda fx: viz.sample_positions(fx.df, 100, "stratified")),
+    ("missing_heatmap[rle]", (), lambda fx: viz.missing_heatmap(fx.df, 100, "stratified", "rle")),
+    ("missing_heatmap[bits]", (), lambda fx: viz.missing_heatmap(fx.df, 100, "stratified", "bits")),
+    ("missing_patterns", (), lambda fx: viz.missing_patterns(fx.df)),
+    ("pattern_heatmap", ("patterns",),
+     lambda fx: viz.pattern_heatmap(fx.df.columns, *fx.patterns, 100, "stratified", "rle")),
+    ("frame_counts", ("fingerprints",), lambda fx: viz.frame_counts(fx.df, fx.fingerprints)),
+    ("before_after_comparison", ("cleaned",), lambda fx: viz.before_after_comparison(fx.df, fx.cleaned)),
+]
+
+# (name, method, path, query, JSON body); every cleaning call starts from a reset session
+ENDPOINT_CALLS = [
+    ("POST /api/upload", None, None, None, None),
+    ("GET /api/preview", "get", "/api/preview", {"limit": 100}, None),
+    ("GET /api/summary", "get", "/api/summary", {}, None),
+    ("GET /api/visualize", "get", "/api/visualize", {}, None),
+    ("GET /api/summary[sample]", "get", "/api/summary", {"sample": 10000}, None),
+    ("GET /api/visualize[sample]", "get", "/api/visualize", {"sample": 10000}, None),
+    ("GET /api/report", "get", "/api/report", {}, None),
+    ("POST /api/clean/missing", "post", "/api/clean/missing", {}, {"strategy": "mean"}),
+    ("POST /api/clean/duplicates", "post", "/api/clean/duplicates", {}, {}),
+    ("POST /api/clean/outliers", "post", "/api/clean/outliers", {}, {"mode": "drop"}),
+    ("POST /api/clean/normalize", "post", "/api/clean/normalize", {}, {}),
+    ("POST /api/clean/standardize", "post", "/api/clean/standardize", {}, {}),
+    ("POST /api/clean/pipeline", "post", "/api/clean/pipeline", {}, {"steps": PIPELINE}),
+    ("GET /api/visualize[cleaned]", "get", "/api/visualize", {}, None),
+    ("GET /api/download", "get", "/api/download", {"format": "csv"}, None),
+]
+
+
+def _traced(call) -> int:
+    """Peak bytes allocated while ``call()`` runs."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(call, repeat: int = 3, warmup: int = 1, memory: bool = True) -> dict:
+    for _ in range(warmup):
+        call()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return {
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "runs": repeat,
+        "peak_mb": round(_traced(call) / 2**20, 3) if memory else None,
+    }
+
+
+def bench_functions(df: pd.DataFrame, cases: list, only: list, repeat: int, warmup: int, memory: bool):
+    fx = Fixtures(df)
+    for name, needs, fn in cases:
+        if not _selected(name, only):
+            continue
+        try:
+            for need in needs:
+                getattr(fx, need)
+            yield name, {"status": "ok", **measure(functools.partial(fn, fx), repeat, warmup, memory)}
+        except Exception as e:
+            yield name, {"status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def _request(client, method: str, path: str, query: dict, body, session_id: str):
+    response = getattr(client, method)(path, query_string={"session_id": session_id, **query}, json=body)
+    response.get_data()  # streamed bodies (downloads) are produced here
+    if response.status_code >= 400:
+        raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def _endpoint_pass(client, upload_folder, csv_path: str, calls: list, trace: bool) -> dict:
+    """One run of ``calls`` against a fresh upload: name -> seconds, or peak bytes with ``trace``."""
+    results = {}
+
+    def timed(name, call):
+        if trace:
+            results[name] = _traced(call)
+        else:
+            start = time.perf_counter()
+            call()
+            results[name] = time.perf_counter() - start
+
+    uploaded = {}
+
+    def upload():
+        with open(csv_path, "rb") as f:
+            response = client.post("/api/upload", data={"file": (f, "benchmark.csv")}, content_type="multipart/form-data")
+        if response.status_code >= 400:
+            raise RuntimeError(f"/api/upload returned {response.status_code}: {response.get_json()}")
+        uploaded["session_id"] = response.get_json()["session_id"]
+
+    timed("POST /api/upload", upload)
+    session_id = uploaded["session_id"]
+    try:
+        for name, method, path, query, body in calls:
+            if method is None:
+                continue
+            if path.startswith("/api/clean/"):
+                client.post("/api/reset", query_string={"session_id": session_id})
+            timed(name, functools.partial(_request, client, method, path, query, body, session_id))
+    finally:
+        for path in glob.glob(str(upload_folder / f"{session_id}_*")):
+            os.remove(path)
+    return results
+
+
+def bench_endpoints(app, df: pd.DataFrame, only: list, repeat: int, memory: bool):
+    calls = [call for call in ENDPOINT_CALLS if call[1] is None or _selected(call[0], only)]
+    if not any(_selected(call[0], only) for call in calls):
+        return
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        df.to_csv(csv_path, index=False)
+        if os.path.getsize(csv_path) > app.MAX_FILE_SIZE:
+            for name, *_ in calls:
+                if _selected(name, only):
+                    yield name, {"status": "skipped", "error": "CSV exceeds the upload size limit"}
+            return
+        client = app.app.test_client()
+        try:
+            runs = [_endpoint_pass(client, app.UPLOAD_FOLDER, csv_path, calls, False) for _ in range(repeat)]
+            peaks = _endpoint_pass(client, app.UPLOAD_FOLDER, csv_path, calls, True) if memory else {}
+        except Exception as e:
+            for name, *_ in calls:
+                if _selected(name, only):
+                    yield name, {"status": "error", "error": f"{type(e).__name__}: {e}"}
+            return
+        for name, *_ in calls:
+            if not _selected(name, only):
+                continue
+            times = [run[name] for run in runs]
+            yield name, {
+                "status": "ok",
+                "seconds": statistics.median(times),
+                "min_seconds": min(times),
+                "runs": repeat,
+                "peak_mb": round(peaks[name] / 2**20, 3) if memory else None,
+            }
+    finally:
+        os.remove(csv_path)
+
+
+def _selected(name: str, only: list) -> bool:
+    return not only or any(fnmatch.fnmatchcase(name, pattern) for pattern in only)
+
+
+def _key(result: dict) -> tuple:
+    return result["dataset"], result["group"], result["name"]
+
+
+def compare(results: list, baseline: dict, threshold: float, memory_threshold: float, min_seconds: float) -> list:
+    """Annotate ``results`` with their baseline figures; returns the regressed ones.
+
+    A timing regresses when it is over ``threshold`` (a fraction) slower than
+    the baseline and at least ``min_seconds`` slower in absolute terms, so
+    sub-millisecond noise does not fail a run; peak memory likewise with
+    ``memory_threshold`` and a 1 MB floor.
+    """
+    previous = {_key(r): r for r in baseline.get("results", []) if r["status"] == "ok"}
+    regressed = []
+    for result in results:
+        base = previous.get(_key(result))
+        if result["status"] != "ok" or base is None:
+            continue
+        result["baseline_seconds"] = base["seconds"]
+        result["ratio"] = round(result["seconds"] / base["seconds"], 3) if base["seconds"] else None
+        slower = result["seconds"] - base["seconds"]
+        result["regression"] = []
+        if slower >= min_seconds and result["seconds"] > base["seconds"] * (1 + threshold):
+            result["regression"].append("time")
+        if result["peak_mb"] is not None and base.get("peak_mb") is not None:
+            result["baseline_peak_mb"] = base["peak_mb"]
+            if result["peak_mb"] - base["peak_mb"] >= 1.0 and result["peak_mb"] > base["peak_mb"] * (1 + memory_threshold):
+                result["regression"].append("memory")
+        if result["regression"]:
+            regressed.append(result)
+    return regressed
+
+
+def _print_result(result: dict):
+    if result["status"] != "ok":
+        print(f"  {result['group']:<14} {result['name']:<32} {result['status']}: {result['error']}")
+        return
+    memory = f"{result['peak_mb']:9.1f} MB" if result["peak_mb"] is not None else ""
+    compared = f"  x{result['ratio']}" if result.get("ratio") is not None else ""
+    flag = f"  REGRESSION ({', '.join(result['regression'])})" if result.get("regression") else ""
+    print(f"  {result['group']:<14} {result['name']:<32} {result['seconds'] * 1000:10.2f} ms{memory}{compared}{flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--shape", nargs="+", default=["narrow"], choices=list(SHAPES))
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000])
+    parser.add_argument("--null-density", nargs="+", type=float, default=[0.05])
+    parser.add_argument("--duplicate-ratio", nargs="+", type=float, default=[0.05])
+    parser.add_argument("--cardinality", nargs="+", type=int, default=[20])
+    parser.add_argument("--groups", nargs="+", default=["cleaning", "visualization", "endpoints"],
+                        choices=["cleaning", "visualization", "endpoints"])
+    parser.add_argument("--only", nargs="+", default=[], metavar="PATTERN",
+                        help="run only the cases whose name matches one of these glob patterns")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs before timing (functions only)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed slowdown as a fraction")
+    parser.add_argument("--memory-threshold", type=float, default=0.20, help="allowed peak memory growth")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    memory = not args.no_memory
+    app = None
+    if "endpoints" in args.groups:
+        # Imported up front: it instruments cleaning and visualization (metrics.py) in place,
+        # which must not change the function timings between the first dataset and the next
+        import app
+    datasets, results = [], []
+    grid = itertools.product(args.shape, args.rows, args.null_density, args.duplicate_ratio, args.cardinality)
+    for shape, rows, nulls, duplicates, cardinality in grid:
+        name = f"{shape}-{rows}r-n{nulls:g}-d{duplicates:g}-c{cardinality}"
+        start = time.perf_counter()
+        df = make_dataset(rows, SHAPES[shape], nulls, duplicates, cardinality, args.seed)
+        datasets.append({
+            "name": name, "shape": shape, "rows": rows, "columns": df.shape[1], "null_density": nulls,
+            "duplicate_ratio": duplicates, "cardinality": cardinality,
+            "memory_mb": round(df.memory_usage(deep=True).sum() / 2**20, 3),
+        })
+        print(f"{name}: {df.shape[0]} x {df.shape[1]}, generated in {time.perf_counter() - start:.2f} s")
+        runs = []
+        if "cleaning" in args.groups:
+            runs.append(("cleaning", bench_functions(df, CLEANING_CASES, args.only, args.repeat, args.warmup, memory)))
+        if "visualization" in args.groups:
+            runs.append(("visualization",
+                         bench_functions(df, VISUALIZATION_CASES, args.only, args.repeat, args.warmup, memory)))
+        if "endpoints" in args.groups:
+            runs.append(("endpoints", bench_endpoints(app, df, args.only, args.repeat, memory)))
+        for group, cases in runs:
+            for case, measured in cases:
+                result = {"dataset": name, "group": group, "name": case, **measured}
+                results.append(result)
+                if args.baseline is None:
+                    _print_result(result)
+
+    regressed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressed = compare(results, baseline, args.threshold, args.memory_threshold, args.min_seconds)
+        for result in results:
+            _print_result(result)
+    report = {
+        "created": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "settings": {name: value for name, value in vars(args).items() if name not in ("output", "baseline")},
+        "baseline": args.baseline,
+        "datasets": datasets,
+        "results": results,
+        "regressions": [list(_key(r)) for r in regressed],
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"{len(results)} results written to {args.output}")
+    if regressed:
+        print(f"{len(regressed)} regression(s) beyond the thresholds")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Out-of-core execution of the cleaning operations.
+
+The session file is streamed in fixed-size row batches. Every operation
+makes two passes: the first gathers per-column statistics (mean/variance,
+min/max, a mergeable quantile sketch, heavy-hitter counts for modes) and the
+dtype each column must have across all batches; the second transforms each
+batch and appends it to a Feather working copy. Peak memory is one batch
+plus the fixed-size per-column summaries — except duplicate removal, which
+keeps one 64-bit hash per distinct row seen so far, so its memory grows with
+the number of distinct rows (8 bytes each). The hashes sit in a sorted
+``uint64`` array: each batch is looked up with ``np.searchsorted`` and its
+new hashes are merged in with one ``np.insert``.
+
+Medians and quartiles come from ``cleaning.QuantileSketch`` (rank error
+within about ``QUANTILE_EPSILON``) and modes from bounded heavy-hitter
+counts, so both are approximate on large columns.
+
+Given the session's column types, each output batch is cast to them with
+``schema.apply``, as the in-memory path casts its result. A Feather file
+holds one dictionary per categorical column, so the first pass also
+collects the distinct values of those columns and every batch is coded
+against the same categories.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import schema
+from cleaning import QuantileSketch, near_duplicate_key
+from storage import iter_batches
+
+CHUNK_ROWS = 100_000
+QUANTILE_EPSILON = 0.001  # rank error of the median / IQR sketches
+MODE_CAPACITY = 10_000  # distinct values tracked per column for the mode
+STANDARDIZE_DDOF = 0  # population std, as sklearn's StandardScaler in cleaning.py
+
+OPERATIONS = (
+    "drop_missing",
+    "fill_missing",
+    "remove_duplicates",
+    "remove_outliers",
+    "normalize",
+    "standardize",
+)
+
+
+class ColumnStats:
+    """Mergeable summary of one column, updated a batch at a time."""
+
+    def __init__(self, track_mode: bool = False, seed: int | None = 0, track_values: bool = False):
+        self.track_mode = track_mode
+        self.dtype = None
+        self.nulls = 0
+        self.values = set() if track_values else None  # distinct values, for categorical output
+        # Numeric moments (Chan et al. parallel variance)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(QUANTILE_EPSILON, seed)
+        # Misra–Gries heavy hitters: keeps the true mode for any value whose
+        # share of the column exceeds 1 / MODE_CAPACITY
+        self.counts = pd.Series(dtype="int64")
+
+    @property
+    def numeric(self) -> bool:
+        return self.dtype is not None and _is_number(self.dtype)
+
+    def update(self, series: pd.Series):
+        self.dtype = _merge_dtype(self.dtype, series.dtype)
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        if self.values is not None:
+            self.values.update(values.unique())
+        if self.track_mode and len(values):
+            counts = values.value_counts()
+            self.counts = self.counts.add(counts, fill_value=0) if len(self.counts) else counts
+            if len(self.counts) > MODE_CAPACITY:
+                floor = self.counts.nlargest(MODE_CAPACITY + 1).iloc[-1]
+                self.counts = self.counts[self.counts > floor] - floor
+        if not _is_number(series.dtype) or not len(values):
+            return
+
+        arr = values.to_numpy(dtype="float64")
+        n_b, mean_b = len(arr), float(arr.mean())
+        m2_b = float(((arr - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        lo, hi = float(arr.min()), float(arr.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.sketch.update(arr)
+
+    def quantile(self, q: float) -> float:
+        return self.sketch.quantile(q)
+
+    def std(self, ddof: int = 0) -> float:
+        return (self.m2 / (self.count - ddof)) ** 0.5 if self.count > ddof else np.nan
+
+    def mode(self):
+        if not len(self.counts):
+            return None
+        top = self.counts[self.counts == self.counts.max()].index
+        try:
+            return sorted(top)[0]  # same tie-break as Series.mode()
+        except TypeError:
+            return top[0]
+
+
+def collect_stats(batches, track_modes: bool = False, seed: int = 0, track_values=()) -> tuple:
+    """First pass: per-column statistics plus total row count; ``track_values`` columns also keep their distinct values."""
+    stats = {}
+    rows = 0
+    for batch in batches:
+        rows += len(batch)
+        for col in batch.columns:
+            if col not in stats:
+                stats[col] = ColumnStats(track_modes, seed, col in track_values)
+            stats[col].update(batch[col])
+    return stats, rows
+
+
+def clean_file(src_path: str, dst_stem: str, operation: str, csv_options: dict | None = None,
+               chunksize: int = CHUNK_ROWS, column_types: dict | None = None, **params) -> dict:
+    """Apply one cleaning operation to a file without loading it whole.
+
+    Writes ``dst_stem + ".feather"`` and returns its path together with
+    before/after row and missing-value counts. ``column_types`` is the
+    session's schema (see schema.py) for the output.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def batches():
+        return iter_batches(src_path, csv_options, chunksize)
+
+    strategy = params.get("strategy", "mean")
+    column_types = column_types or {}
+    categorical = [col for col, t in column_types.items() if t == "category"]
+    stats, rows_before = collect_stats(batches(), track_modes=operation == "fill_missing", track_values=categorical)
+    dtypes = {col: s.dtype for col, s in stats.items()}
+    missing_before = sum(s.nulls for s in stats.values())
+    numeric = [col for col, s in stats.items() if s.numeric]
+    subset = params.get("subset")
+    unknown = [c for c in subset or [] if c not in stats]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+
+    if operation == "fill_missing":
+        fills = {}
+        for col, s in stats.items():
+            if not s.nulls:
+                continue
+            if s.numeric and strategy == "mean":
+                fills[col] = s.mean
+            elif s.numeric and strategy == "median":
+                fills[col] = s.quantile(0.5)
+            else:
+                mode = s.mode()
+                fills[col] = mode if mode is not None else (0 if s.numeric else "Unknown")
+        # Categoricals only accept known categories: add the fill value to every batch's
+        for col, value in fills.items():
+            dtype = dtypes[col]
+            if isinstance(dtype, pd.CategoricalDtype) and value not in dtype.categories:
+                dtypes[col] = pd.CategoricalDtype(list(dtype.categories) + [value], dtype.ordered)
+    elif operation == "remove_outliers":
+        bounds = {}
+        for col in numeric:
+            q1, q3 = stats[col].quantile(0.25), stats[col].quantile(0.75)
+            bounds[col] = (q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+        # Same columns are capped (and widened to float) in every batch so
+        # the output schema stays fixed
+        clip_cols = [c for c, (lo, hi) in bounds.items() if stats[c].min < lo or stats[c].max > hi]
+
+    # Output types: scaled and capped columns hold fractions, which schema.apply would not cast back
+    rescaled = set()
+    if operation in ("normalize", "standardize"):
+        rescaled = set(numeric)
+    elif operation == "remove_outliers" and params.get("mode") == "clip":
+        rescaled = set(clip_cols)
+    categories = {}
+    for col in categorical:
+        if col in stats:
+            extra = {fills[col]} if operation == "fill_missing" and col in fills else set()
+            categories[col] = pd.CategoricalDtype(sorted(stats[col].values | extra))
+    column_types = {c: t for c, t in column_types.items() if t != "category" and c not in rescaled}
+
+    seen = np.empty(0, dtype=np.uint64)
+    path = dst_stem + ".feather"
+    rows_after = missing_after = outliers = 0
+    with _FeatherWriter(path, {**dtypes, **categories}) as writer:
+        for batch in batches():
+            batch = batch.astype({c: d for c, d in dtypes.items() if batch[c].dtype != d})
+            if operation == "drop_missing":
+                batch = batch.dropna()
+            elif operation == "fill_missing":
+                batch = batch.fillna(fills)
+            elif operation == "remove_duplicates":
+                # Content hashes, unlike row_fingerprints, are comparable across batches
+                key = batch if subset is None else batch[subset]
+                if params.get("near"):
+                    key = near_duplicate_key(key)
+                hashes = pd.util.hash_pandas_object(key, index=False).to_numpy()
+                keep = ~pd.Series(hashes).duplicated().to_numpy() & ~_contains(seen, hashes)
+                new = np.sort(hashes[keep])
+                seen = np.insert(seen, np.searchsorted(seen, new), new)
+                batch = batch[keep]
+            elif operation == "remove_outliers":
+                lower = pd.Series({c: b[0] for c, b in bounds.items()}, dtype="float64")
+                upper = pd.Series({c: b[1] for c, b in bounds.items()}, dtype="float64")
+                num = batch[list(bounds)]
+                outside = (num < lower) | (num > upper)
+                outliers += int(outside.to_numpy().sum())
+                if params.get("mode") == "clip":
+                    if clip_cols:
+                        capped = num[clip_cols].astype("float64")
+                        batch = batch.copy()
+                        batch[clip_cols] = capped.clip(lower=lower[clip_cols], upper=upper[clip_cols], axis=1)
+                else:
+                    batch = batch[~outside.any(axis=1).to_numpy()]
+            elif operation == "normalize":
+                batch = batch.copy()
+                for col in numeric:
+                    s = stats[col]
+                    if s.count:
+                        span = s.max - s.min
+                        batch[col] = (batch[col] - s.min) / span if span else 0.0
+            elif operation == "standardize":
+                batch = batch.copy()
+                for col in numeric:
+                    s = stats[col]
+                    if s.count:
+                        std = s.std(STANDARDIZE_DDOF)
+                        batch[col] = (batch[col] - s.mean) / std if std else 0.0
+            batch = schema.apply(batch.astype(categories), column_types)
+            rows_after += len(batch)
+            missing_after += int(batch.isnull().sum().sum())
+            writer.write(batch)
+
+    return {
+        "path": path,
+        "before": {"rows": rows_before, "missing": missing_before},
+        "after": {"rows": rows_after, "missing": missing_after},
+        "removed_rows": rows_before - rows_after,
+        "columns": len(dtypes),
+        "outliers": outliers,
+        **({"fill_values": {c: (v.item() if isinstance(v, np.generic) else v) for c, v in fills.items()}}
+           if operation == "fill_missing" else {}),
+    }
+
+
+class _FeatherWriter:
+    """Append DataFrame batches to a Feather (Arrow IPC file) working copy.
+
+    The schema is fixed by the first non-empty batch (columns that are all
+    null in it are typed as strings) and later batches are cast to it. The
+    file is renamed into place only on success.
+    """
+
+    def __init__(self, path: str, dtypes: dict):
+        self.path = path
+        self.tmp = path + ".tmp"
+        self.dtypes = dtypes
+        self.schema = None
+        self.sink = None
+        self.writer = None
+        self.empty = None
+
+    def __enter__(self):
+        return self
+
+    def write(self, batch: pd.DataFrame):
+        batch = batch.reset_index(drop=True)
+        if not len(batch):
+            self.empty = batch if self.empty is None else self.empty
+            return
+        if self.writer is None:
+            schema = pa.Schema.from_pandas(batch, preserve_index=False)
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self.schema = schema
+            self.sink = pa.OSFile(self.tmp, "wb")
+            self.writer = pa.ipc.new_file(self.sink, schema)
+        table = pa.Table.from_pandas(batch, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+        elif exc_type is None:
+            # Nothing survived the operation: still leave a valid, empty file
+            empty = self.empty if self.empty is not None else pd.DataFrame(
+                {c: pd.Series(dtype=d) for c, d in self.dtypes.items()}
+            )
+            feather.write_feather(empty, self.tmp, compression="uncompressed")
+        if exc_type is None:
+            os.replace(self.tmp, self.path)
+        elif os.path.exists(self.tmp):
+            os.remove(self.tmp)
+        return False
+
+
+def _contains(sorted_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Mask of the ``hashes`` present in the sorted array ``sorted_hashes``."""
+    pos = np.searchsorted(sorted_hashes, hashes)
+    found = pos < len(sorted_hashes)
+    found[found] = sorted_hashes[pos[found]] == hashes[found]
+    return found
+
+
+def _is_number(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _merge_dtype(current, new):
+    """Dtype a column needs to hold the values of every batch seen so far."""
+    if current is None or current == new:
+        return new
+    if _is_number(current) and _is_number(new):
+        try:
+            return np.result_type(current, new)
+        except TypeError:  # pandas extension dtypes (Int64, Float64, ...)
+            return np.dtype("float64")
+    return np.dtype(object)
@@ -1,12 +1,18 @@
+import time
+
 import pandas as pd
 import numpy as np
 from scipy import stats
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
 
+from parallel import map_columns
+
 
-def detect_missing(df: pd.DataFrame) -> dict:
+def detect_missing(df: pd.DataFrame, profile: dict | None = None, null_counts: pd.Series | None = None) -> dict:
+    if profile is not None:
+        return profile["missing"]
     total = df.shape[0]
-    missing = df.isnull().sum()
+    missing = df.isnull().sum() if null_counts is None else null_counts
     pct = (missing / total * 100).round(2)
     return {
         "total_rows": total,
@@ -19,116 +25,434 @@ def detect_missing(df: pd.DataFrame) -> dict:
     }
 
 
-def fill_missing(df: pd.DataFrame, strategy: str = "mean") -> pd.DataFrame:
-    """Fill missing values with mean/median/mode."""
-    df = df.copy()
-    for col in df.columns:
-        if df[col].isnull().sum() == 0:
+def _mode(series: pd.Series):
+    """Most frequent non-null value, or None for an all-null column.
+
+    Counts factorized codes with a single bincount instead of building a
+    value_counts table; ties resolve to the smallest value like Series.mode().
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    if not counts.any():
+        return None
+    top = uniques[counts == counts.max()]
+    try:
+        return min(top)
+    except TypeError:  # mixed, unorderable values
+        return top[0]
+
+
+def compute_fill_values(df: pd.DataFrame, strategy: str = "mean") -> dict:
+    """Per-column fill values for every column that has missing values.
+
+    Numeric columns (any int/float width, nullable included) get their mean
+    or median from one aggregate call over the numeric block; everything
+    else, and numeric columns under the "mode" strategy, get their mode.
+    """
+    missing = df.isnull().sum()
+    cols = missing.index[missing > 0]
+    numeric = [c for c in df.select_dtypes(include=[np.number]).columns if c in cols]
+    fills = {}
+    if numeric and strategy in ("mean", "median"):
+        agg = df[numeric].mean() if strategy == "mean" else df[numeric].median()
+        # An all-null column has no mean; filling it with NaN would be a no-op
+        fills.update(agg.dropna().to_dict())
+    for col in cols:
+        if col in fills or (col in numeric and strategy in ("mean", "median")):
             continue
-        if df[col].dtype in [np.float64, np.int64, float, int]:
-            if strategy == "mean":
-                df[col] = df[col].fillna(df[col].mean())
-            elif strategy == "median":
-                df[col] = df[col].fillna(df[col].median())
-            else:
-                mode_val = df[col].mode()
-                df[col] = df[col].fillna(mode_val[0] if not mode_val.empty else 0)
-        else:
-            mode_val = df[col].mode()
-            df[col] = df[col].fillna(mode_val[0] if not mode_val.empty else "Unknown")
-    return df
+        mode_val = _mode(df[col])
+        if mode_val is None:
+            mode_val = 0 if col in numeric else "Unknown"
+        fills[col] = mode_val
+    # Plain Python scalars so the values can be reported as JSON
+    return {col: (v.item() if isinstance(v, np.generic) else v) for col, v in fills.items()}
+
+
+def fill_missing(df: pd.DataFrame, strategy: str = "mean", fill_values: dict | None = None) -> pd.DataFrame:
+    """Fill missing values with mean/median/mode in a single fillna call.
+
+    Pass ``fill_values`` from :func:`compute_fill_values` to reuse them.
+    """
+    if fill_values is None:
+        fill_values = compute_fill_values(df, strategy)
+    # Integer columns can't hold a fractional mean, and categoricals only
+    # accept known categories: widen those before the batched fillna
+    casts = {}
+    for col, value in fill_values.items():
+        dtype = df[col].dtype
+        if pd.api.types.is_integer_dtype(dtype) and not float(value).is_integer():
+            casts[col] = "float64"
+        elif isinstance(dtype, pd.CategoricalDtype) and value not in dtype.categories:
+            casts[col] = pd.CategoricalDtype(list(dtype.categories) + [value], dtype.ordered)
+    df = df.astype(casts) if casts else df
+    return df.fillna(fill_values)
 
 
 def drop_missing(df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna()
 
 
-def detect_duplicates(df: pd.DataFrame) -> dict:
-    dup_count = int(df.duplicated().sum())
+def near_duplicate_key(df: pd.DataFrame, decimals: int = 6) -> pd.DataFrame:
+    """Canonical form of ``df`` for near-duplicate matching.
+
+    Text is trimmed, lower-cased and has inner whitespace collapsed; floats
+    are rounded to ``decimals`` places.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series.dtype):
+            series = series.round(decimals)
+        elif (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+              or isinstance(series.dtype, pd.CategoricalDtype)):
+            series = series.astype("string").str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+        out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+def _mix64(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: scrambles every bit of ``h`` into every other."""
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def row_fingerprints(df: pd.DataFrame, subset: list | None = None, near: bool = False) -> np.ndarray:
+    """One 64-bit fingerprint per row, over all columns or just ``subset``.
+
+    Each column is factorized once (the same hash-table pass df.duplicated()
+    makes) and the integer codes are folded into a running 64-bit hash, so
+    later duplicate queries compare one integer per row. Codes are local to
+    the frame: fingerprints are only comparable between rows of the same
+    frame. With ``near=True`` rows are compared in the canonical form of
+    :func:`near_duplicate_key`. Two distinct rows collide with probability
+    about 2**-64.
+    """
+    key = df if subset is None else df[list(subset)]
+    if near:
+        key = near_duplicate_key(key)
+    if key.shape[1] == 0:
+        return np.arange(len(key), dtype="uint64")  # like duplicated(): no columns, no duplicates
+    h = np.zeros(len(key), dtype="uint64")
+    with np.errstate(over="ignore"):
+        for col in range(key.shape[1]):
+            codes = pd.factorize(key.iloc[:, col])[0].astype("uint64")  # nulls: -1, equal like duplicated()
+            h = _mix64(h * np.uint64(0x9E3779B97F4A7C15) + codes + np.uint64(1))
+    return h
+
+
+def duplicate_mask(fingerprints: np.ndarray) -> np.ndarray:
+    """True for every row whose fingerprint occurred earlier (keep="first")."""
+    return pd.Series(fingerprints).duplicated().to_numpy()
+
+
+def detect_duplicates(df: pd.DataFrame, profile: dict | None = None, fingerprints: np.ndarray | None = None) -> dict:
+    if profile is not None:
+        return profile["duplicates"]
+    if fingerprints is None:
+        fingerprints = row_fingerprints(df)
+    dup_count = int(duplicate_mask(fingerprints).sum())
     return {"duplicate_rows": dup_count}
 
 
-def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    return df.drop_duplicates()
+def remove_duplicates(df: pd.DataFrame, subset: list | None = None, near: bool = False,
+                      fingerprints: np.ndarray | None = None) -> pd.DataFrame:
+    """Keep the first of each group of rows with equal fingerprints.
+
+    ``fingerprints`` must have been computed with the same ``subset``/``near``.
+    """
+    if fingerprints is None:
+        fingerprints = row_fingerprints(df, subset, near)
+    return df[~duplicate_mask(fingerprints)]
+
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch of one numeric column.
+
+    Values are kept in a stack of compactors; an item at level ``h`` stands
+    for ``2**h`` input values. When a level outgrows its capacity it is
+    sorted and every other item (random offset) is promoted to the next
+    level. Capacities shrink geometrically towards the bottom, so memory is
+    O(k) for ``k ~ 3 / epsilon`` and quantile ranks are within about
+    ``epsilon * n`` of the exact ones. Until the first compaction every value
+    is kept and quantiles are exact.
+
+    An input much larger than the sketch is not sorted whole, which would
+    cost more than an exact quantile: a uniform sample of it (drawn with
+    replacement), one item per ``2**h`` values, goes straight to level ``h``.
+    The sample is large enough that its ranks are within ``epsilon`` of the
+    input's with probability ``1 - SAMPLE_FAILURE`` (Dvoretzky–Kiefer–Wolfowitz).
+
+    Sketches of parts of a column (chunks, partitions) combine with
+    :meth:`merge` into a sketch of the whole column.
+    """
+
+    SAMPLE_FAILURE = 0.01
+
+    def __init__(self, epsilon: float = 0.01, seed: int | None = 0):
+        self.epsilon = epsilon
+        self.k = max(16, int(np.ceil(3.0 / epsilon)))
+        self.sample_size = int(np.ceil(np.log(2 / self.SAMPLE_FAILURE) / (2 * epsilon * epsilon)))
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+
+    def _capacity(self, level: int) -> int:
+        return max(2, int(self.k * (2 / 3) ** (len(self.levels) - 1 - level)))
+
+    def update(self, values) -> "QuantileSketch":
+        """Add an array or Series of values; nulls are ignored."""
+        arr = np.asarray(values, dtype="float64")
+        arr = arr[~np.isnan(arr)]
+        if not len(arr):
+            return self
+        self.count += len(arr)
+        self.min = float(arr.min()) if np.isnan(self.min) else min(self.min, float(arr.min()))
+        self.max = float(arr.max()) if np.isnan(self.max) else max(self.max, float(arr.max()))
+        if len(arr) >= 2 * self.sample_size:
+            h = int(np.log2(len(arr) / self.sample_size))
+            sample = arr[self.rng.integers(0, len(arr), len(arr) >> h)]
+            while len(self.levels) <= h:
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], sample])
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], arr])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold ``other`` into this sketch (in place) and return it."""
+        if not other.count:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self.min = other.min if np.isnan(self.min) else min(self.min, other.min)
+        self.max = other.max if np.isnan(self.max) else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) <= self._capacity(h):
+                h += 1
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[h])
+            # An odd item out stays behind so total weight is preserved
+            keep = items[len(items) - len(items) % 2:]
+            promoted = items[self.rng.integers(2):len(items) - len(items) % 2:2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h = 0  # a new level shrinks the capacity of the ones below
+
+    def quantiles(self, qs) -> np.ndarray:
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], qs)  # nothing compacted yet: exact
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, np.asarray(qs, dtype="float64") * cum[-1], side="left")
+        out = items[np.minimum(idx, len(items) - 1)]
+        # The extremes are tracked exactly
+        return np.where(np.asarray(qs) <= 0, self.min, np.where(np.asarray(qs) >= 1, self.max, out))
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+def build_sketches(df: pd.DataFrame, epsilon: float = 0.01) -> dict:
+    """One :class:`QuantileSketch` per numeric column of ``df``.
+
+    Build them once per frame and pass them as ``sketches=`` to
+    :func:`iqr_bounds`, :func:`detect_outliers`, :func:`remove_outliers`,
+    :func:`build_profile` and ``visualization.boxplot_data``.
+    """
+    num = df.select_dtypes(include=[np.number])
+    return {
+        col: QuantileSketch(epsilon).update(num[col].to_numpy(dtype="float64", na_value=np.nan))
+        for col in num.columns
+    }
+
+
+def iqr_bounds(df: pd.DataFrame, sketches: dict | None = None) -> tuple:
+    """Lower/upper IQR fences for every numeric column.
+
+    All quartiles come from a single vectorized quantile call over the
+    numeric block, or from the columns' quantile ``sketches`` when given.
+    Returns ``(lower, upper)`` as Series indexed by column.
+    """
+    num = df.select_dtypes(include=[np.number])
+    if sketches is not None:
+        quartiles = pd.DataFrame(
+            {col: sketches[col].quantiles([0.25, 0.75]) for col in num.columns},
+            index=[0.25, 0.75], columns=num.columns, dtype="float64",
+        )
+    else:
+        quartiles = num.quantile([0.25, 0.75])
+    Q1 = quartiles.loc[0.25]
+    Q3 = quartiles.loc[0.75]
+    IQR = Q3 - Q1
+    return Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
 
 
-def detect_outliers(df: pd.DataFrame) -> dict:
-    result = {}
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        series = df[col].dropna()
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
-        IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        outlier_count = int(((series < lower) | (series > upper)).sum())
-        result[col] = {
-            "count": outlier_count,
-            "lower_bound": round(float(lower), 4),
-            "upper_bound": round(float(upper), 4),
+def _outlier_counts(num: pd.DataFrame, sketches: dict | None = None) -> dict:
+    lower, upper = iqr_bounds(num, sketches)
+    counts = ((num < lower) | (num > upper)).sum()
+    return {
+        col: {
+            "count": int(counts[col]),
+            "lower_bound": round(float(lower[col]), 4),
+            "upper_bound": round(float(upper[col]), 4),
         }
+        for col in num.columns
+    }
+
+
+def detect_outliers(df: pd.DataFrame, profile: dict | None = None, sketches: dict | None = None,
+                    executor=None) -> dict:
+    """IQR outlier counts and fences per numeric column.
+
+    With a ``parallel.ColumnExecutor`` the columns are split across its workers.
+    """
+    if profile is not None:
+        return profile["outliers"]
+    num = df.select_dtypes(include=[np.number])
+    result = map_columns(_outlier_counts, num, sketches, executor=executor)
     total_outliers = sum(v["count"] for v in result.values())
-    return {"outliers_per_column": result, "total_outliers": total_outliers}
+    return {
+        "outliers_per_column": result,
+        "total_outliers": total_outliers,
+        "approximate": sketches is not None,
+    }
 
 
-def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
+def remove_outliers(df: pd.DataFrame, mode: str = "drop", sketches: dict | None = None) -> pd.DataFrame:
+    """Drop rows with values outside the IQR fences, or cap them (mode="clip").
+
+    Fences for all numeric columns are computed once on the input and combined
+    into one row mask, so the frame is filtered once and the result does not
+    depend on column order. "clip" keeps every row and winsorizes the values.
+    """
+    num = df.select_dtypes(include=[np.number])
+    lower, upper = iqr_bounds(num, sketches)
+    outside = (num < lower) | (num > upper)
+    if mode != "clip":
+        return df[~outside.any(axis=1)]
+    cols = outside.columns[outside.any()]
+    if len(cols) == 0:
+        return df.copy()
+    # Fences are fractional, so integer columns are widened before capping
+    capped = num[cols].astype({c: "float64" for c in cols if pd.api.types.is_integer_dtype(num[c])})
     df = df.copy()
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        df = df[(df[col].isna()) | ((df[col] >= lower) & (df[col] <= upper))]
+    df[cols] = capped.clip(lower=lower[cols], upper=upper[cols], axis=1)
     return df
 
 
-def normalize_data(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def scaling_params(df: pd.DataFrame, op: str = "normalize") -> tuple:
+    """Fit min-max ("normalize") or z-score ("standardize") scaling.
+
+    Returns ``(offset, scale)`` as Series indexed by the numeric columns; a
+    column scales as ``(x - offset) / scale`` (see :func:`scale_column`).
+    Constant columns get a scale of 1, as in the sklearn scalers.
+    """
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     if len(numeric_cols) == 0:
-        return df
-    scaler = MinMaxScaler()
-    df[numeric_cols] = scaler.fit_transform(df[numeric_cols])
+        return pd.Series(dtype="float64"), pd.Series(dtype="float64")
+    if op == "normalize":
+        scaler = MinMaxScaler().fit(df[numeric_cols])
+        offset, scale = scaler.data_min_, np.where(scaler.data_range_ == 0, 1.0, scaler.data_range_)
+    else:
+        scaler = StandardScaler().fit(df[numeric_cols])
+        offset, scale = scaler.mean_, scaler.scale_
+    return pd.Series(offset, index=numeric_cols), pd.Series(scale, index=numeric_cols)
+
+
+def scale_column(series: pd.Series, offset: float, scale: float) -> pd.Series:
+    """Apply one column's fitted scaling; the result is float64, nulls stay NaN."""
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    return pd.Series((values - offset) / scale, index=series.index, name=series.name)
+
+
+def normalize_data(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    offset, scale = scaling_params(df, "normalize")
+    for col in offset.index:
+        df[col] = scale_column(df[col], offset[col], scale[col])
     return df
 
 
 def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) == 0:
-        return df
-    scaler = StandardScaler()
-    df[numeric_cols] = scaler.fit_transform(df[numeric_cols])
+    offset, scale = scaling_params(df, "standardize")
+    for col in offset.index:
+        df[col] = scale_column(df[col], offset[col], scale[col])
     return df
 
 
-def compute_quality_score(df: pd.DataFrame) -> dict:
+def build_profile(df: pd.DataFrame, sketches: dict | None = None, fingerprints: np.ndarray | None = None,
+                  null_counts: pd.Series | None = None, executor=None) -> dict:
+    """Compute every statistic the summary and report need, once.
+
+    Pass the result as ``profile=`` to the detect_*, scoring, insight and
+    suggestion helpers so none of them rescans the frame. With ``sketches``
+    the outlier fences use approximate quartiles; cached ``fingerprints``
+    and per-column ``null_counts`` skip rescanning the rows for those;
+    ``executor`` spreads the outlier statistics over its workers.
+    """
+    profile = {
+        "missing": detect_missing(df, null_counts=null_counts),
+        "duplicates": detect_duplicates(df, fingerprints=fingerprints),
+        "outliers": detect_outliers(df, sketches=sketches, executor=executor),
+        "numeric_columns": df.select_dtypes(include=[np.number]).columns.tolist(),
+    }
+    profile["quality"] = compute_quality_score(df, profile)
+    return profile
+
+
+def compute_quality_score(df: pd.DataFrame, profile: dict | None = None) -> dict:
     """Calculate a composite data quality score (0–100)."""
     total_cells = df.shape[0] * df.shape[1]
     if total_cells == 0:
         return {"score": 0, "grade": "F"}
+    if profile is None:
+        profile = {
+            "missing": detect_missing(df),
+            "duplicates": detect_duplicates(df),
+            "outliers": detect_outliers(df),
+        }
 
-    missing_ratio = df.isnull().sum().sum() / total_cells
-    dup_ratio = df.duplicated().sum() / max(df.shape[0], 1)
+    missing = profile["missing"]
+    outliers = profile["outliers"]
+    missing_ratio = missing["total_missing"] / total_cells
+    dup_ratio = profile["duplicates"]["duplicate_rows"] / max(df.shape[0], 1)
 
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    outlier_counts = 0
-    numeric_cells = 0
-    for col in numeric_cols:
-        series = df[col].dropna()
-        numeric_cells += len(series)
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
-        IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        outlier_counts += int(((series < lower) | (series > upper)).sum())
-
-    outlier_ratio = outlier_counts / max(numeric_cells, 1)
+    # Outliers are counted against the non-null numeric cells
+    numeric_cells = sum(
+        df.shape[0] - missing["missing_per_column"][col]["count"]
+        for col in outliers["outliers_per_column"]
+    )
+    outlier_ratio = outliers["total_outliers"] / max(numeric_cells, 1)
+    return quality_from_ratios(missing_ratio, dup_ratio, outlier_ratio)
 
+
+def quality_from_ratios(missing_ratio: float, dup_ratio: float, outlier_ratio: float) -> dict:
+    """Score (0–100) and grade for given missing-cell, duplicate-row and outlier-cell ratios."""
     # Weighted score
     score = 100 - (missing_ratio * 40 + dup_ratio * 30 + outlier_ratio * 30)
     score = max(0.0, min(100.0, score))
@@ -148,15 +472,17 @@ def compute_quality_score(df: pd.DataFrame) -> dict:
     return {"score": score, "grade": grade}
 
 
-def generate_insights(df: pd.DataFrame, quality: dict) -> list:
+def generate_insights(df: pd.DataFrame, quality: dict, profile: dict | None = None) -> list:
     """Return a list of AI-style insight strings."""
     insights = []
     score = quality["score"]
 
-    missing_info = detect_missing(df)
+    if profile is None:
+        profile = build_profile(df)
+    missing_info = profile["missing"]
     total_missing = missing_info["total_missing"]
-    dup_info = detect_duplicates(df)
-    outlier_info = detect_outliers(df)
+    dup_info = profile["duplicates"]
+    outlier_info = profile["outliers"]
 
     if score >= 90:
         insights.append("✅ Your dataset is in excellent shape with minimal issues detected.")
@@ -188,7 +514,7 @@ def generate_insights(df: pd.DataFrame, quality: dict) -> list:
             f"📊 {outlier_info['total_outliers']} outliers detected. '{worst_outlier[0]}' has the most extreme values."
         )
 
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    numeric_cols = profile["numeric_columns"]
     if numeric_cols:
         insights.append(
             f"🔢 {len(numeric_cols)} numeric column(s) found: {', '.join(numeric_cols[:5])}{'...' if len(numeric_cols) > 5 else ''}. Consider normalizing for ML pipelines."
@@ -197,12 +523,14 @@ def generate_insights(df: pd.DataFrame, quality: dict) -> list:
     return insights
 
 
-def get_suggested_actions(df: pd.DataFrame) -> list:
+def get_suggested_actions(df: pd.DataFrame, profile: dict | None = None) -> list:
     """Return suggested cleaning action strings."""
     suggestions = []
-    missing_info = detect_missing(df)
-    dup_info = detect_duplicates(df)
-    outlier_info = detect_outliers(df)
+    if profile is None:
+        profile = build_profile(df)
+    missing_info = profile["missing"]
+    dup_info = profile["duplicates"]
+    outlier_info = profile["outliers"]
 
     if missing_info["total_missing"] > 0:
         suggestions.append({"action": "fill_missing", "label": "Fill Missing Values", "reason": f"{missing_info['total_missing']} missing values detected"})
@@ -211,14 +539,34 @@ def get_suggested_actions(df: pd.DataFrame) -> list:
     if outlier_info["total_outliers"] > 0:
         suggestions.append({"action": "remove_outliers", "label": "Remove Outliers", "reason": f"{outlier_info['total_outliers']} outliers detected"})
 
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) > 0:
+    if profile["numeric_columns"]:
         suggestions.append({"action": "normalize", "label": "Normalize Data", "reason": "Numeric columns benefit from normalization for ML"})
 
     return suggestions
 
 
-def get_data_types_summary(df: pd.DataFrame) -> dict:
+def operation_delta(before: pd.DataFrame, after: pd.DataFrame, changed=()) -> dict:
+    """Describe what a cleaning step did, for incremental statistics.
+
+    Row-removing steps keep the index labels of the surviving rows, so the
+    removed rows are the labels missing from ``after``. ``changed`` lists the
+    columns whose values the step may have rewritten; new columns and columns
+    whose dtype changed are added to it.
+    """
+    removed = before[~before.index.isin(after.index)] if len(after) != len(before) else before.iloc[:0]
+    changed = set(changed) | {
+        col for col in after.columns if col not in before.columns or before[col].dtype != after[col].dtype
+    }
+    return {"removed": removed, "changed": [col for col in after.columns if col in changed]}
+
+
+def _nunique(frame: pd.DataFrame) -> dict:
+    return frame.nunique().to_dict()
+
+
+def get_data_types_summary(df: pd.DataFrame, unique_counts: dict | None = None, executor=None) -> dict:
+    if unique_counts is None:
+        unique_counts = map_columns(_nunique, df, executor=executor)
     result = {}
     for col in df.columns:
         dtype = str(df[col].dtype)
@@ -230,5 +578,95 @@ def get_data_types_summary(df: pd.DataFrame) -> dict:
             kind = "boolean"
         else:
             kind = "categorical"
-        result[col] = {"dtype": dtype, "kind": kind, "unique": int(df[col].nunique())}
+        result[col] = {"dtype": dtype, "kind": kind, "unique": int(unique_counts[col])}
     return result
+
+
+PIPELINE_OPS = ("missing", "duplicates", "outliers", "normalize", "standardize")
+MISSING_STRATEGIES = ("mean", "median", "mode", "drop")
+
+
+def parse_pipeline(steps, columns=None) -> list:
+    """Validate a list of pipeline steps and fill in their defaults.
+
+    Each step is a dict with an ``op`` from PIPELINE_OPS plus that
+    operation's parameters: ``strategy`` (missing), ``subset``/``near``
+    (duplicates) or ``mode`` (outliers). With ``columns`` the duplicate
+    subsets are checked against them. Raises ``ValueError`` naming the first
+    bad step, so nothing runs unless the whole pipeline is valid.
+    """
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("steps must be a non-empty list")
+    parsed = []
+    for i, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or step.get("op") not in PIPELINE_OPS:
+            raise ValueError(f"Step {i}: op must be one of {', '.join(PIPELINE_OPS)}")
+        op = step["op"]
+        if op == "missing":
+            strategy = step.get("strategy", "mean")
+            if strategy not in MISSING_STRATEGIES:
+                raise ValueError(f"Step {i}: strategy must be one of {', '.join(MISSING_STRATEGIES)}")
+            parsed.append({"op": op, "strategy": strategy})
+        elif op == "duplicates":
+            subset = step.get("subset") or None
+            if subset is not None and not isinstance(subset, list):
+                raise ValueError(f"Step {i}: subset must be a list of column names")
+            unknown = [c for c in subset or [] if columns is not None and c not in columns]
+            if unknown:
+                raise ValueError(f"Step {i}: unknown columns: {', '.join(map(str, unknown))}")
+            parsed.append({"op": op, "subset": subset, "near": bool(step.get("near", False))})
+        elif op == "outliers":
+            mode = step.get("mode", "drop")
+            if mode not in ("drop", "clip"):
+                raise ValueError(f"Step {i}: mode must be 'drop' or 'clip'")
+            parsed.append({"op": op, "mode": mode})
+        else:
+            parsed.append({"op": op})
+    return parsed
+
+
+def run_pipeline(df: pd.DataFrame, steps: list, epsilon: float | None = None, progress=None) -> tuple:
+    """Apply parsed pipeline steps in order to one in-memory frame.
+
+    Returns ``(cleaned, report, changed)``: the final frame; one report entry
+    per step with its parameters, before/after row and missing counts, wall
+    time in ``ms`` and step results (fill values, duplicates, outliers); and
+    the columns any step rewrote, for :func:`operation_delta` against ``df``.
+    With ``epsilon`` the outlier fences come from quantile sketches;
+    ``progress(done, total)`` is called after every step.
+    """
+    report = []
+    changed = set()
+    missing = int(df.isnull().sum().sum())
+    for step in steps:
+        op = step["op"]
+        entry = dict(step)
+        start = time.perf_counter()
+        if op == "missing":
+            fills = {} if step["strategy"] == "drop" else compute_fill_values(df, step["strategy"])
+            cleaned = drop_missing(df) if step["strategy"] == "drop" else fill_missing(df, step["strategy"], fills)
+            entry["fill_values"] = fills
+            changed.update(fills)
+        elif op == "duplicates":
+            mask = duplicate_mask(row_fingerprints(df, step["subset"], step["near"]))
+            entry["duplicates"] = int(mask.sum())
+            cleaned = df[~mask]
+        elif op == "outliers":
+            sketches = build_sketches(df, epsilon) if epsilon else None
+            info = detect_outliers(df, sketches=sketches)
+            entry["outliers"] = info["total_outliers"]
+            cleaned = remove_outliers(df, step["mode"], sketches)
+            if step["mode"] == "clip":
+                changed.update(col for col, c in info["outliers_per_column"].items() if c["count"])
+        else:
+            cleaned = normalize_data(df) if op == "normalize" else standardize_columns(df)
+            changed.update(df.select_dtypes(include=[np.number]).columns)
+        entry["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        after = int(cleaned.isnull().sum().sum())
+        entry["before"] = {"rows": len(df), "missing": missing}
+        entry["after"] = {"rows": len(cleaned), "missing": after}
+        report.append(entry)
+        if progress is not None:
+            progress(len(report), len(steps))
+        df, missing = cleaned, after
+    return df, report, [col for col in df.columns if col in changed]
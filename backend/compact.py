@@ -0,0 +1,97 @@
+"""
+Compact encodings of large API responses.
+
+With ``?format=columnar`` the preview, summary and chart payloads send each
+table once as a schema plus column arrays instead of as records that repeat
+every key in every row:
+
+* a list of dicts sharing the same keys becomes
+  ``{"$table": {"columns": [...], "data": [[...], ...]}}``, ``data`` holding
+  one array per column;
+* a dict of such dicts (per-column summaries keyed by column name) becomes
+  the same with an ``"index"`` of its keys;
+* preview rows carry their pandas ``"dtypes"`` in the table as well.
+
+Column arrays are encoded the same way recursively, so nested records
+compress too. ``decodeColumnar`` in ``frontend/src/services/api.js`` restores
+the original shape. Independently of the format, bodies past
+``COMPRESS_MIN_BYTES`` are compressed with brotli (when the ``brotli``
+package is installed) or gzip if the client accepts it.
+"""
+import gzip
+import json
+
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+FORMATS = ("records", "columnar")
+COMPRESS_MIN_BYTES = 1024
+
+
+def _same_keys(items) -> tuple | None:
+    """The shared key tuple of a run of dicts, or None if they differ."""
+    keys = None
+    for item in items:
+        if not isinstance(item, dict) or not item:
+            return None
+        if keys is None:
+            keys = tuple(item)
+        elif tuple(item) != keys:
+            return None
+    return keys
+
+
+def columnar(value):
+    """``value`` with its record lists and dicts of records as ``$table`` objects."""
+    if isinstance(value, list):
+        keys = _same_keys(value) if len(value) > 1 else None
+        if keys is None:
+            return [columnar(item) for item in value]
+        return {"$table": {"columns": list(keys),
+                           "data": [columnar([item[key] for item in value]) for key in keys]}}
+    if isinstance(value, dict):
+        keys = _same_keys(value.values()) if len(value) > 1 else None
+        if keys is None:
+            return {name: columnar(item) for name, item in value.items()}
+        rows = list(value.values())
+        return {"$table": {"index": list(value), "columns": list(keys),
+                           "data": [columnar([row[key] for row in rows]) for key in keys]}}
+    return value
+
+
+def frame_table(df: pd.DataFrame) -> str:
+    """JSON text of a ``$table`` of ``df``, each column encoded by pandas in one call."""
+    data = ", ".join(df.iloc[:, i].to_json(orient="values", date_format="iso", default_handler=str)
+                     for i in range(df.shape[1]))
+    header = json.dumps({"columns": [str(c) for c in df.columns], "dtypes": [str(t) for t in df.dtypes]})
+    return f'{{"$table": {{{header[1:-1]}, "data": [{data}]}}}}'
+
+
+def accepted_encoding(accept_encoding: str, size: int) -> str | None:
+    """Content encoding to compress a ``size``-byte body with, given the request's Accept-Encoding."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    offered = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        try:
+            weight = float(params.split("q=")[1]) if "q=" in params else 1.0
+        except ValueError:
+            weight = 0.0
+        if weight > 0:
+            offered.add(name.strip())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
@@ -0,0 +1,35 @@
+"""
+Fixtures for the tests that run the app through Flask's test client.
+
+test_api.py is a script for a running server (``python test_api.py``) and
+is not collected. Uploads made by the other tests go to a temporary folder.
+"""
+from pathlib import Path
+
+import pytest
+
+import app as server
+
+collect_ignore = ["test_api.py"]
+
+SAMPLE_CSV = Path(__file__).parent / "sample_data.csv"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_FOLDER", tmp_path)
+    return server.app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Upload a CSV (the sample data by default) and return the new session id."""
+
+    def upload(path=SAMPLE_CSV):
+        with open(path, "rb") as f:
+            response = client.post("/api/upload", data={"file": (f, Path(path).name)},
+                                   content_type="multipart/form-data")
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()["session_id"]
+
+    return upload
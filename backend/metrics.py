@@ -0,0 +1,241 @@
+"""
+Timing spans around the hot paths, exported as Prometheus text.
+
+A span is one timed call of an instrumented function (``load_df``, each
+cleaning and chart function, response serialization, ...). Spans aggregate
+per name into call counts, total and maximum seconds, a duration histogram,
+and the rows, columns and bytes they took in and gave out: frames count
+their rows, columns and NumPy buffer bytes (``memory_usage(deep=False)``,
+so object columns count pointers, not strings), paths count the file size,
+and text or bytes results their length. A call that raises is timed like
+any other and also counted as an error of its span.
+
+While a request is traced, the spans it runs on its own thread are also
+collected for its ``Server-Timing`` header. Work handed to pool threads is
+counted in the aggregates but not in the header. Nested spans each report
+their own time, so a span's time includes that of the spans it calls.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZES = ("rows", "columns", "bytes_in", "bytes_out")
+
+_traces = threading.local()
+
+
+def _frame_size(value) -> tuple | None:
+    """``(rows, columns, bytes)`` of a frame or series, ``(0, 0, bytes)`` of a file path, text or bytes."""
+    if isinstance(value, pd.DataFrame):
+        return len(value), value.shape[1], int(value.memory_usage(index=False, deep=False).sum())
+    if isinstance(value, pd.Series):
+        return len(value), 1, int(value.memory_usage(index=False, deep=False))
+    if isinstance(value, (bytes, bytearray)):
+        return 0, 0, len(value)
+    if isinstance(value, str):
+        return 0, 0, os.path.getsize(value) if os.path.isfile(value) else len(value)
+    return None
+
+
+def _series() -> dict:
+    return {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "buckets": [0] * len(BUCKETS),
+            **{size: 0 for size in SIZES}}
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Thread-safe span and request aggregates."""
+
+    def __init__(self, prefix: str = "dcb"):
+        self.prefix = prefix
+        self._spans = {}
+        self._requests = {}  # (endpoint, method, status) -> series
+        self._lock = threading.Lock()
+
+    # ── spans ──
+    @contextmanager
+    def span(self, name: str, **sizes):
+        """Time the block as span ``name``; the block may fill in the yielded dict's sizes."""
+        record = dict(sizes)
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield record
+            failed = False
+        finally:
+            self.observe(name, time.perf_counter() - start, failed=failed, **record)
+
+    def observe(self, name: str, seconds: float, failed: bool = False, **sizes):
+        with self._lock:
+            series = self._spans.get(name)
+            if series is None:
+                series = self._spans[name] = _series()
+            _add(series, seconds, sizes)
+            series["errors"] += failed
+        stack = getattr(_traces, "stack", None)
+        if stack:
+            stack[-1].append((name, seconds))
+
+    def timed(self, name: str, fn):
+        """``fn`` wrapped in span ``name``, sized by its first argument and its result."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result, failed = None, True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                sizes = {}
+                given = _frame_size(args[0]) if args else None
+                output = result[0] if isinstance(result, tuple) and result else result
+                produced = None if failed else _frame_size(output)
+                shape = given if given and given[:2] != (0, 0) else produced
+                if shape:
+                    sizes["rows"], sizes["columns"] = shape[:2]
+                if given:
+                    sizes["bytes_in"] = given[2]
+                if produced:
+                    sizes["bytes_out"] = produced[2]
+                self.observe(name, seconds, failed=failed, **sizes)
+        return wrapper
+
+    def instrument(self, module, prefix: str | None = None, names=None, exclude=()):
+        """Replace a module's public functions (or ``names``) with timed wrappers, in place.
+
+        Calls through the module attribute, including the module's calls to
+        its own functions, are timed; names imported from it beforehand are not.
+        """
+        prefix = prefix or module.__name__
+        if names is None:
+            names = [name for name, fn in vars(module).items()
+                     if inspect.isfunction(fn) and fn.__module__ == module.__name__ and not name.startswith("_")]
+        for name in names:
+            if name not in exclude and not hasattr(getattr(module, name), "__wrapped__"):
+                setattr(module, name, self.timed(f"{prefix}.{name}", getattr(module, name)))
+
+    # ── requests ──
+    def start_trace(self):
+        """Collect the spans this thread runs until :meth:`end_trace`; traces nest."""
+        if not hasattr(_traces, "stack"):
+            _traces.stack = []
+        _traces.stack.append([])
+
+    def end_trace(self) -> list:
+        """``(name, seconds)`` of the spans run since the matching :meth:`start_trace`."""
+        stack = getattr(_traces, "stack", None)
+        if not stack:
+            return []
+        spans = stack.pop()
+        if stack:
+            stack[-1].extend(spans)  # an inner dispatch (inline job) counts toward the outer request too
+        return spans
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float, bytes_out: int = 0):
+        key = (endpoint, method, status)
+        with self._lock:
+            series = self._requests.get(key)
+            if series is None:
+                series = self._requests[key] = _series()
+            _add(series, seconds, {"bytes_out": bytes_out})
+
+    # ── export ──
+    def render(self, gauges: dict | None = None) -> str:
+        """Prometheus text exposition of every span and request series plus ``gauges``.
+
+        ``gauges`` maps a metric name to ``{label value: number}``, labelled
+        by ``source`` (for instance cache statistics).
+        """
+        p = self.prefix
+        with self._lock:
+            spans = {name: _copy(series) for name, series in self._spans.items()}
+            requests = {key: _copy(series) for key, series in self._requests.items()}
+        lines = []
+        lines += _histogram(f"{p}_span_seconds", "Time spent in instrumented functions.",
+                            [({"span": name}, series) for name, series in sorted(spans.items())])
+        lines.append(f"# HELP {p}_span_max_seconds Longest single call of an instrumented function.")
+        lines.append(f"# TYPE {p}_span_max_seconds gauge")
+        lines += [f"{p}_span_max_seconds{_labels(span=name)} {series['max_seconds']:.6f}"
+                  for name, series in sorted(spans.items())]
+        lines.append(f"# HELP {p}_span_errors_total Calls of an instrumented function that raised.")
+        lines.append(f"# TYPE {p}_span_errors_total counter")
+        lines += [f"{p}_span_errors_total{_labels(span=name)} {series['errors']}"
+                  for name, series in sorted(spans.items())]
+        for size, text in (("rows", "Rows processed"), ("columns", "Columns processed"),
+                           ("bytes_in", "Bytes of input data"), ("bytes_out", "Bytes of output data")):
+            lines.append(f"# HELP {p}_span_{size}_total {text} by instrumented functions.")
+            lines.append(f"# TYPE {p}_span_{size}_total counter")
+            lines += [f"{p}_span_{size}_total{_labels(span=name)} {series[size]}"
+                      for name, series in sorted(spans.items())]
+        lines += _histogram(f"{p}_request_seconds", "API request latency.",
+                            [({"endpoint": e, "method": m, "status": s}, series)
+                             for (e, m, s), series in sorted(requests.items())])
+        lines.append(f"# HELP {p}_response_bytes_total Response body bytes sent.")
+        lines.append(f"# TYPE {p}_response_bytes_total counter")
+        lines += [f"{p}_response_bytes_total{_labels(endpoint=e, method=m, status=s)} {series['bytes_out']}"
+                  for (e, m, s), series in sorted(requests.items())]
+        for name, values in (gauges or {}).items():
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines += [f"{p}_{name}{_labels(source=source)} {value}" for source, value in values.items()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._requests.clear()
+
+
+def _add(series: dict, seconds: float, sizes: dict):
+    series["calls"] += 1
+    series["seconds"] += seconds
+    series["max_seconds"] = max(series["max_seconds"], seconds)
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            series["buckets"][i] += 1
+            break
+    for size, value in sizes.items():
+        series[size] += int(value or 0)
+
+
+def _copy(series: dict) -> dict:
+    return {**series, "buckets": list(series["buckets"])}
+
+
+def _histogram(name: str, text: str, rows: list) -> list:
+    lines = [f"# HELP {name} {text}", f"# TYPE {name} histogram"]
+    for labels, series in rows:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, series["buckets"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {series['calls']}")
+        lines.append(f"{name}_sum{_labels(**labels)} {series['seconds']:.6f}")
+        lines.append(f"{name}_count{_labels(**labels)} {series['calls']}")
+    return lines
+
+
+def server_timing(spans: list, total: float | None = None) -> str:
+    """``Server-Timing`` header value: spans summed per name, in first-call order."""
+    summed = {}
+    for name, seconds in spans:
+        calls, elapsed = summed.get(name, (0, 0.0))
+        summed[name] = (calls + 1, elapsed + seconds)
+    entries = [f'{name};dur={elapsed * 1000:.2f};desc="{calls}x"' for name, (calls, elapsed) in summed.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
@@ -0,0 +1,104 @@
+"""
+Sorted, filtered and windowed views of a session's rows for the preview.
+
+Filters and the sort key are evaluated on whole columns and turn into an
+array of row positions; only the rows of the requested window are then read
+and serialized. Rows are encoded straight to JSON text by pandas and spliced
+into the response, so they are serialized exactly once.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+FILTER_OPS = ("eq", "ne", "lt", "le", "gt", "ge", "contains", "isnull", "notnull")
+_COMPARE = {"eq": "__eq__", "ne": "__ne__", "lt": "__lt__", "le": "__le__", "gt": "__gt__", "ge": "__ge__"}
+
+
+def parse_filters(raw: str | None, columns) -> list:
+    """Validate ``?filters=`` JSON: ``[{"column": ..., "op": ..., "value": ...}, ...]``.
+
+    Raises ``ValueError`` with a user-facing message on malformed input.
+    """
+    if not raw:
+        return []
+    try:
+        filters = json.loads(raw)
+    except json.JSONDecodeError:
+        raise ValueError("filters must be a JSON list")
+    if isinstance(filters, dict):
+        filters = [filters]
+    if not isinstance(filters, list):
+        raise ValueError("filters must be a JSON list")
+    columns = set(columns)
+    parsed = []
+    for flt in filters:
+        if not isinstance(flt, dict) or flt.get("column") not in columns:
+            raise ValueError(f"Unknown filter column: {flt.get('column') if isinstance(flt, dict) else flt}")
+        if flt.get("op", "eq") not in FILTER_OPS:
+            raise ValueError(f"filter op must be one of {', '.join(FILTER_OPS)}")
+        parsed.append({"column": flt["column"], "op": flt.get("op", "eq"), "value": flt.get("value")})
+    return parsed
+
+
+def key_columns(filters: list, sort: str | None) -> list:
+    """Columns the filters and sort read, in first-use order."""
+    names = [flt["column"] for flt in filters] + ([sort] if sort else [])
+    return list(dict.fromkeys(names))
+
+
+def _matches(series: pd.Series, op: str, value) -> np.ndarray:
+    if op == "isnull":
+        return series.isna().to_numpy()
+    if op == "notnull":
+        return series.notna().to_numpy()
+    if op == "contains":
+        text = series.astype("string").str.contains(str(value), case=False, regex=False)
+        return text.fillna(False).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Filter value for {series.name} must be a number")
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        try:
+            value = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Filter value for {series.name} must be a date")
+    else:
+        series, value = series.astype("string"), str(value)
+    result = getattr(series, _COMPARE[op])(value)
+    return pd.Series(result).fillna(False).to_numpy(dtype=bool)
+
+
+def row_order(df: pd.DataFrame, filters: list, sort: str | None = None, descending: bool = False) -> np.ndarray:
+    """Positions of the rows of ``df`` passing every filter, in sort order.
+
+    The sort is stable and puts missing values last; columns mixing types
+    that do not compare are sorted by their text.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for flt in filters:
+        mask &= _matches(df[flt["column"]], flt["op"], flt["value"])
+    positions = np.flatnonzero(mask)
+    if sort is None:
+        return positions
+    key = df[sort].iloc[positions].reset_index(drop=True)
+    try:
+        order = key.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    except TypeError:
+        order = key.astype("string").sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return positions[order.to_numpy()]
+
+
+def records_json(df: pd.DataFrame) -> str:
+    """Rows of ``df`` as JSON text (a list of records); missing values become null, dates ISO 8601 text."""
+    return df.to_json(orient="records", date_format="iso", default_handler=str)
+
+
+def json_object(fields: dict, **encoded: str) -> str:
+    """JSON object text of ``fields`` plus members whose values are already JSON text."""
+    members = [f"{json.dumps(name)}: {text}" for name, text in encoded.items()]
+    if fields:
+        members.append(json.dumps(fields)[1:-1])
+    return "{" + ", ".join(members) + "}"
@@ -0,0 +1,153 @@
+"""
+Memory-optimized column types, chosen when an upload is first parsed.
+
+``read_csv`` keeps text as object columns (one Python string per cell) and
+every number as int64 or float64. :func:`optimize` narrows them:
+
+* text columns with few distinct values become categoricals: a small
+  integer code per cell plus each distinct string once, which also makes
+  value counts, unique counts and modes a pass over the codes;
+* text columns whose values all parse as dates with one format become
+  datetime64;
+* integers go to the narrowest type holding their range.
+
+Floats stay float64. Even a column whose values all survive a round trip
+through float32 would have its means, fill values and scaled values
+computed and stored in float32, and those would no longer match the
+float64 results of the out-of-core path.
+
+The chosen types are the session's schema, ``{column: dtype name}``, stored
+with the session. :func:`apply` casts a frame back to it. It runs when a
+session file is parsed again and on the result of every cleaning step
+(``chunked.clean_file`` applies it batch by batch), so
+a step that widens a column (a fill value new to a categorical, rows
+dropped from a column) does not leave it at a wider type. A cast that
+would change a value is skipped: an integer column scaled to fractions
+stays float.
+"""
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+CATEGORY_MAX_RATIO = 0.5  # text columns with at most this share of distinct values become categoricals
+DATE_SAMPLE = 100  # leading values a text column must parse as dates before the whole column is tried
+
+
+def column_memory(df: pd.DataFrame) -> dict:
+    """Bytes held by each column, strings included."""
+    return {col: int(n) for col, n in df.memory_usage(index=False, deep=True).items()}
+
+
+def _parse_dates(values: pd.Series) -> pd.Series | None:
+    """``values`` (strings) parsed as dates with the format of the first one, or None unless all parse."""
+    first = values.dropna()
+    fmt = guess_datetime_format(first.iloc[0])
+    if fmt is None or ("%Y" not in fmt and "%y" not in fmt):  # month names or bare numbers are not dates
+        return None
+    if pd.to_datetime(first.iloc[:DATE_SAMPLE], format=fmt, errors="coerce").isna().any():
+        return None
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    return parsed if parsed.isna().sum() == values.isna().sum() else None
+
+
+def _narrow(series: pd.Series) -> pd.Series | None:
+    """``series`` in a narrower type, or None to keep it as it is."""
+    dtype = series.dtype
+    if not isinstance(dtype, np.dtype) or dtype.kind == "b":
+        return None
+    if dtype.kind in "iu":
+        narrow = pd.to_numeric(series, downcast="integer" if dtype.kind == "i" else "unsigned")
+        return narrow if narrow.dtype.itemsize < dtype.itemsize else None
+    if dtype == object:
+        values = series.dropna()
+        if not len(values) or pd.api.types.infer_dtype(values, skipna=False) != "string":
+            return None
+        dates = _parse_dates(series)
+        if dates is not None:
+            return dates
+        if values.nunique() <= CATEGORY_MAX_RATIO * len(series):
+            return series.astype("category")
+    return None
+
+
+def optimize(df: pd.DataFrame) -> tuple:
+    """``(frame, schema, report)``: ``df`` with narrowed column types.
+
+    ``schema`` maps each column to its dtype name; ``report`` gives each
+    column's type and memory before and after.
+    """
+    before = column_memory(df)
+    dtypes_before = {col: str(t) for col, t in df.dtypes.items()}
+    columns = {}
+    for col in df.columns:
+        narrow = _narrow(df[col])
+        if narrow is not None:
+            columns[col] = narrow
+    df = _replace(df, columns) if columns else df
+    after = column_memory(df)
+    report = {
+        "bytes_before": sum(before.values()),
+        "bytes_after": sum(after.values()),
+        "columns": {
+            str(col): {"dtype_before": dtypes_before[col], "dtype": str(df[col].dtype),
+                       "bytes_before": before[col], "bytes_after": after[col]}
+            for col in df.columns
+        },
+    }
+    return df, {str(col): str(t) for col, t in df.dtypes.items()}, report
+
+
+def _replace(df: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    df = df.copy(deep=False)
+    for col, series in columns.items():
+        df[col] = series
+    return df
+
+
+def _cast(series: pd.Series, dtype: str):
+    """``series`` as ``dtype`` when no value changes, else None."""
+    current = series.dtype
+    if dtype == "category":
+        if isinstance(current, pd.CategoricalDtype):
+            used = series.cat.remove_unused_categories()
+            return used if len(used.cat.categories) < len(current.categories) else None
+        return series.astype("category") if current == object else None
+    if dtype.startswith("datetime64"):
+        if current != object:
+            return None
+        parsed = pd.to_datetime(series, errors="coerce")
+        return parsed if parsed.isna().sum() == series.isna().sum() else None
+    target = np.dtype(dtype)
+    if not isinstance(current, np.dtype) or current.kind not in "iuf" or target.kind not in "iuf":
+        return None
+    values = series.to_numpy()
+    if target.kind in "iu":
+        if current.kind == "f" and (np.isnan(values).any() or not np.array_equal(values, np.round(values))):
+            return None
+        info = np.iinfo(target)
+        if len(values) and (values.min() < info.min or values.max() > info.max):
+            return None
+        return series.astype(target)
+    if target.itemsize < current.itemsize:
+        return None  # floats are never narrowed, see above
+    with np.errstate(over="ignore"):
+        narrow = values.astype(target)
+    return series.astype(target) if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True) else None
+
+
+def apply(df: pd.DataFrame, schema: dict | None) -> pd.DataFrame:
+    """``df`` with each column the schema lists cast back to its type where that is lossless.
+
+    Categoricals also drop categories no row uses any more.
+    """
+    if not schema:
+        return df
+    columns = {}
+    for col in df.columns:
+        dtype = schema.get(str(col))
+        if dtype is None or (str(df[col].dtype) == dtype and dtype != "category"):
+            continue
+        cast = _cast(df[col], dtype)
+        if cast is not None:
+            columns[col] = cast
+    return _replace(df, columns) if columns else df
@@ -0,0 +1,300 @@
+"""
+Per-session column statistics, maintained incrementally across cleaning steps.
+
+Statistics are computed per column on first use and kept for the session's
+current working-copy version. A cleaning step describes what it did as a
+delta (see ``cleaning.operation_delta``): the rows it removed and the
+columns whose values it changed. Applying the delta
+
+* drops and lazily recomputes only the changed columns;
+* subtracts the removed rows from null counts, value counts, sums,
+  histogram bins and the pairwise correlation sums of every other column;
+* recomputes a min/max (and the histogram built on it) only when a removed
+  row held the extreme.
+
+Quartile-based summaries (``describe``) cannot be updated by subtraction and
+are recomputed per column after rows are removed.
+
+Columns computed together (the first summary of a version, say) are split
+across the workers of the store's ``parallel.ColumnExecutor``.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from parallel import map_columns
+
+VALUE_COUNTS_MAX = 100_000  # distinct values kept per column for unique counts / bar charts
+
+
+def _is_number(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _column_stats(series: pd.Series) -> dict:
+    values = series.dropna()
+    counts = values.value_counts(sort=False)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = counts[counts > 0]  # categories no row uses are counted as zero
+    st = {
+        "dtype": series.dtype,
+        "nulls": len(series) - len(values),
+        "unique": len(counts),
+        "counts": counts if len(counts) <= VALUE_COUNTS_MAX else None,
+        "hist": {},
+    }
+    if _is_number(series.dtype):
+        arr = values.to_numpy(dtype="float64")
+        # Sums are taken around a shift so large offsets don't cancel out
+        st["shift"] = float(arr[0]) if len(arr) else 0.0
+        d = arr - st["shift"]
+        st.update(n=len(arr), s=float(d.sum()), ss=float((d * d).sum()),
+                  min=float(arr.min()) if len(arr) else np.nan,
+                  max=float(arr.max()) if len(arr) else np.nan)
+    return st
+
+
+def _columns_stats(frame: pd.DataFrame) -> dict:
+    return {col: _column_stats(frame[col]) for col in frame.columns}
+
+
+def _describe_columns(frame: pd.DataFrame) -> dict:
+    return {col: frame[col].describe() for col in frame.columns}
+
+
+def _histograms(frame: pd.DataFrame, bins: int) -> dict:
+    return {col: np.histogram(frame[col].dropna(), bins=bins) for col in frame.columns}
+
+
+def _subtract_rows(st: dict, removed: pd.Series):
+    """Remove ``removed`` (rows of this column) from the column's summary."""
+    values = removed.dropna()
+    st["nulls"] -= len(removed) - len(values)
+    if st["counts"] is not None:
+        # Subtract in place of the existing order so ties keep first-occurrence order
+        counts = st["counts"] - values.value_counts(sort=False).reindex(st["counts"].index, fill_value=0)
+        st["counts"] = counts[counts > 0]
+        st["unique"] = len(st["counts"])
+    elif len(values):
+        st["unique"] = None  # too many distinct values to track: recount on demand
+    if "n" not in st or not len(values):
+        return
+    arr = values.to_numpy(dtype="float64")
+    d = arr - st["shift"]
+    st["n"] -= len(arr)
+    st["s"] -= float(d.sum())
+    st["ss"] -= float((d * d).sum())
+    if st["min"] is None:
+        return  # extremes already stale; recomputed on next use
+    if arr.min() <= st["min"] or arr.max() >= st["max"]:
+        st["min"] = st["max"] = None  # an extreme left with the rows
+        st["hist"] = {}
+    else:
+        st["hist"] = {
+            bins: (counts - np.histogram(arr, bins=edges)[0], edges)
+            for bins, (counts, edges) in st["hist"].items()
+        }
+
+
+def _pair_sums(X: np.ndarray, M: np.ndarray) -> tuple:
+    """Pairwise-complete sums between all columns of ``X`` (NaN = missing).
+
+    ``sx[i, j]`` is the sum of column i over the rows where both i and j are
+    present, and likewise for ``sxx``; ``n`` and ``sxy`` are symmetric.
+    """
+    X0, Mf = np.where(M, X, 0.0), M.astype("float64")
+    return Mf.T @ Mf, X0.T @ Mf, (X0 * X0).T @ Mf, X0.T @ X0
+
+
+class FrameStats:
+    """Statistics of one version of a session frame, computed per column on demand.
+
+    Every accessor takes the frame the statistics describe, used to compute
+    what is not known yet.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self._columns = {}
+        self._describe = {}
+        self._corr = None  # {"cols", "index", "shift", "n", "sx", "sxx", "sxy"}
+        self._lock = threading.Lock()
+
+    def _column(self, df: pd.DataFrame, col) -> dict:
+        st = self._columns.get(col)
+        if st is None:
+            st = self._columns[col] = _column_stats(df[col])
+        elif st.get("min", 0) is None:
+            values = df[col].dropna()
+            st["min"], st["max"] = float(values.min()), float(values.max())
+        if st["unique"] is None:
+            st["unique"] = int(df[col].nunique())
+        return st
+
+    def _prime(self, df: pd.DataFrame, cols):
+        """Compute the statistics of every column in ``cols`` not known yet, in parallel."""
+        todo = [col for col in cols if col not in self._columns]
+        if len(todo) > 1:
+            self._columns.update(map_columns(_columns_stats, df[todo], executor=self.executor))
+
+    def null_counts(self, df: pd.DataFrame) -> pd.Series:
+        self._prime(df, df.columns)
+        return pd.Series({col: self._column(df, col)["nulls"] for col in df.columns}, dtype="int64")
+
+    def unique_counts(self, df: pd.DataFrame) -> dict:
+        self._prime(df, df.columns)
+        return {col: self._column(df, col)["unique"] for col in df.columns}
+
+    def value_counts(self, df: pd.DataFrame, col) -> pd.Series:
+        """Like ``df[col].value_counts()``: non-null counts, most frequent first."""
+        counts = self._column(df, col)["counts"]
+        if counts is None:
+            return df[col].value_counts()
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def mean(self, df: pd.DataFrame, col) -> float:
+        st = self._column(df, col)
+        return st["shift"] + st["s"] / st["n"] if st["n"] else np.nan
+
+    def histogram(self, df: pd.DataFrame, col, bins: int) -> tuple:
+        """``np.histogram(df[col].dropna(), bins)`` for a numeric column."""
+        st = self._column(df, col)
+        if bins not in st["hist"]:
+            st["hist"][bins] = np.histogram(df[col].dropna(), bins=bins)
+        return st["hist"][bins]
+
+    def histograms(self, df: pd.DataFrame, cols: list, bins: int) -> dict:
+        """:meth:`histogram` of each of ``cols``, the missing ones computed in parallel."""
+        self._prime(df, cols)
+        todo = [col for col in cols if bins not in self._column(df, col)["hist"]]
+        if todo:
+            for col, hist in map_columns(_histograms, df[todo], bins, executor=self.executor).items():
+                self._columns[col]["hist"][bins] = hist
+        return {col: self._columns[col]["hist"][bins] for col in cols}
+
+    def correlation(self, df: pd.DataFrame, cols: list) -> pd.DataFrame:
+        """Pairwise-complete Pearson correlation, like ``df[cols].corr()``."""
+        with self._lock:
+            corr = self._corr
+            if corr is None or corr["cols"] != list(cols):
+                corr = self._corr = self._corr_sums(df, list(cols), corr)
+            n, sx, sxx, sxy = corr["n"], corr["sx"], corr["sxx"], corr["sxy"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = n * sxy - sx * sx.T
+            var = n * sxx - sx * sx
+            r = cov / np.sqrt(var * var.T)
+        r = np.where((var > 0) & (var.T > 0) & (n > 1), np.clip(r, -1.0, 1.0), np.nan)
+        return pd.DataFrame(r, index=cols, columns=cols)
+
+    @staticmethod
+    def _corr_sums(df: pd.DataFrame, cols: list, previous: dict | None) -> dict:
+        """Correlation sums for ``cols``, reusing the blocks ``previous`` holds
+        for the columns listed in its ``index``."""
+        X = df[cols].to_numpy(dtype="float64", na_value=np.nan)
+        M = ~np.isnan(X)
+        known = previous["index"] if previous is not None else {}
+        keep = [j for j, c in enumerate(cols) if c in known]
+        fresh = [j for j, c in enumerate(cols) if c not in known]
+        # Sums are taken around a per-column shift so large offsets don't cancel out
+        shift = np.zeros(len(cols))
+        for j in keep:
+            shift[j] = previous["shift"][known[cols[j]]]
+        for j in fresh:
+            present = X[M[:, j], j]
+            shift[j] = present[0] if len(present) else 0.0
+        out = {"cols": list(cols), "shift": shift, "index": {c: j for j, c in enumerate(cols)}}
+        for name in ("n", "sx", "sxx", "sxy"):
+            out[name] = np.zeros((len(cols), len(cols)))
+        if keep:
+            old = [known[cols[j]] for j in keep]
+            for name in ("n", "sx", "sxx", "sxy"):
+                out[name][np.ix_(keep, keep)] = previous[name][np.ix_(old, old)]
+        if fresh:
+            X0, Mf = np.where(M, X - shift, 0.0), M.astype("float64")
+            Xf, Mff = X0[:, fresh], Mf[:, fresh]
+            blocks = {
+                "n": (Mff.T @ Mf, Mf.T @ Mff),
+                "sx": (Xf.T @ Mf, X0.T @ Mff),
+                "sxx": ((Xf * Xf).T @ Mf, (X0 * X0).T @ Mff),
+                "sxy": (Xf.T @ X0, X0.T @ Xf),
+            }
+            for name, (rows, columns) in blocks.items():
+                out[name][fresh, :] = rows
+                out[name][:, fresh] = columns
+        return out
+
+    def describe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df.describe(include="all")`` assembled from per-column results."""
+        todo = [col for col in df.columns if col not in self._describe]
+        if todo:
+            self._describe.update(map_columns(_describe_columns, df[todo], executor=self.executor))
+        parts = [self._describe[col] for col in df.columns]
+        # Same row order as DataFrame.describe: shortest index first
+        names = []
+        for index in sorted((part.index for part in parts), key=len):
+            names.extend(name for name in index if name not in names)
+        out = pd.concat([part.reindex(names) for part in parts], axis=1, ignore_index=True, sort=False)
+        out.columns = df.columns.copy()
+        return out
+
+    def apply(self, delta: dict, after: pd.DataFrame):
+        """Bring the statistics from the frame before a cleaning step to ``after``."""
+        changed = set(delta["changed"])
+        removed = delta["removed"]
+        for col in list(self._columns):
+            if col in changed or col not in after.columns:
+                del self._columns[col]
+            elif removed is not None and len(removed):
+                _subtract_rows(self._columns[col], removed[col])
+        if removed is not None and len(removed):
+            self._describe.clear()
+        for col in changed:
+            self._describe.pop(col, None)
+
+        corr = self._corr
+        if corr is None:
+            return
+        cols = [c for c in corr["cols"] if c in after.columns and c not in changed]
+        if removed is not None and len(removed) and cols:
+            X = removed[corr["cols"]].to_numpy(dtype="float64", na_value=np.nan) - corr["shift"]
+            for name, part in zip(("n", "sx", "sxx", "sxy"), _pair_sums(X, ~np.isnan(X))):
+                corr[name] = corr[name] - part
+        corr["index"] = {c: j for j, c in enumerate(corr["cols"]) if c in cols}
+        new_cols = [c for c in after.columns if _is_number(after[c].dtype)]
+        self._corr = self._corr_sums(after, new_cols, corr) if new_cols else None
+
+
+class StatsStore:
+    """Thread-safe map of session id to the FrameStats of its current version."""
+
+    def __init__(self, executor=None):
+        self.executor = executor  # shared by every FrameStats, see parallel.py
+        self._entries = {}  # session_id -> (version, FrameStats)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str, version) -> FrameStats:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] != version:
+                entry = self._entries[session_id] = (version, FrameStats(self.executor))
+            return entry[1]
+
+    def advance(self, session_id: str, old_version, new_version, delta: dict, after: pd.DataFrame):
+        """Carry the statistics of ``old_version`` over to ``new_version``.
+
+        Falls back to starting empty when nothing was known about the old
+        version (e.g. after a restart or a chunked step).
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        if entry is None or entry[0] != old_version:
+            return
+        stats = entry[1]
+        stats.apply(delta, after)
+        with self._lock:
+            self._entries[session_id] = (new_version, stats)
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
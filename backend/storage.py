@@ -0,0 +1,400 @@
+"""
+Dataset file I/O.
+
+Uploaded originals stay in the user's format (CSV/XLSX). Working copies
+produced by cleaning steps are stored in a binary columnar format
+(uncompressed Feather / Arrow IPC) so they can be memory-mapped on read and
+keep every dtype — datetimes, categoricals, nullable ints — exactly between
+steps. CSV/XLSX is only produced again at export time.
+"""
+import codecs
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; fall back to pickle working copies
+    pa = None
+    feather = None
+
+import schema
+
+WORKING_EXT = ".feather" if feather is not None else ".pkl"
+SNIFF_BYTES = 64 * 1024
+ROW_INDEX_STRIDE = 10_000  # CSV rows between two byte-offset checkpoints
+SCAN_BYTES = 4 * 1024 * 1024
+
+
+def sniff_csv(path: str) -> dict:
+    """Detect encoding, delimiter, quoting and header from the head of a CSV.
+
+    Returns keyword arguments for ``pd.read_csv``; they are JSON-serialisable
+    so they can be stored with the session and reused on later loads.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(SNIFF_BYTES)
+    complete = len(raw) < SNIFF_BYTES
+
+    if raw.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+        text = raw[len(codecs.BOM_UTF8):].decode("utf-8", errors="replace")
+    else:
+        # latin-1 decodes any byte sequence, so it is the final fallback
+        for encoding in ("utf-8", "cp1252", "latin-1"):
+            try:
+                # Incremental decode tolerates a multi-byte char cut at the sample edge
+                text = codecs.getincrementaldecoder(encoding)().decode(raw, final=complete)
+                break
+            except UnicodeDecodeError:
+                continue
+
+    # Only give the sniffer whole lines
+    if not complete and "\n" in text:
+        text = text[: text.rindex("\n")]
+
+    options = {"encoding": encoding, "sep": ",", "quotechar": '"', "doublequote": True,
+               "skipinitialspace": False, "header": 0}
+    if not text.strip():
+        return options
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(text, delimiters=",;\t|")
+        # doublequote stays True: the sniffer reports False whenever the
+        # sample simply has no escaped quotes, which would break RFC 4180 files
+        options.update(sep=dialect.delimiter, quotechar=dialect.quotechar or '"',
+                       skipinitialspace=dialect.skipinitialspace)
+    except csv.Error:
+        pass  # single column or irregular sample: keep the comma defaults
+
+    # Sniffer.has_header votes "no header" for all-text tables, so only trust
+    # it when the first row also looks like data (contains a number).
+    try:
+        first_row = next(csv.reader([text.split("\n", 1)[0]], delimiter=options["sep"],
+                                    quotechar=options["quotechar"]))
+        if not sniffer.has_header(text) and any(_is_number(v) for v in first_row):
+            options["header"] = None
+    except (csv.Error, StopIteration):
+        pass
+    return options
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _label_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with string column labels, the names :func:`scan_shape` reports.
+
+    A headerless CSV is parsed with the column numbers 0, 1, ... as labels
+    (and an Excel header can hold numbers); requests name columns by text.
+    """
+    if not all(isinstance(c, str) for c in df.columns):
+        df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def load_df(path: str, csv_options: dict | None = None) -> pd.DataFrame:
+    """Load an original upload or a working copy.
+
+    CSVs are parsed once with ``csv_options`` (from :func:`sniff_csv`); pass
+    the options stored with the session to skip detection.
+    """
+    if path.endswith(".feather"):
+        return read_working(path)
+    if path.endswith(".pkl"):
+        return pd.read_pickle(path)
+    if path.endswith(".xlsx") or path.endswith(".xls"):
+        return _label_columns(pd.read_excel(path))
+    options = csv_options or sniff_csv(path)
+    try:
+        df = pd.read_csv(path, **options)
+    except UnicodeDecodeError:
+        # Undecodable bytes past the sniffed sample; latin-1 accepts anything
+        df = pd.read_csv(path, **{**options, "encoding": "latin-1"})
+    except pd.errors.ParserError:
+        # Ragged rows: keep what parses rather than failing the upload
+        df = pd.read_csv(path, on_bad_lines="skip", **options)
+    return _label_columns(df)
+
+
+def iter_csv_chunks(path: str, csv_options: dict, chunksize: int = 100_000):
+    """Yield a CSV as DataFrames of at most ``chunksize`` rows."""
+    with pd.read_csv(path, chunksize=chunksize, **csv_options) as reader:
+        for chunk in reader:
+            yield _label_columns(chunk)
+
+
+def iter_batches(path: str, csv_options: dict | None = None, chunksize: int = 100_000):
+    """Yield any session file as DataFrames of at most ``chunksize`` rows.
+
+    Feather working copies are sliced from a memory map and CSVs are parsed
+    incrementally, so only one batch is materialized at a time. Excel and
+    pickle files have no incremental reader and are loaded whole first.
+    """
+    if path.endswith(".feather"):
+        table = feather.read_table(path, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    elif path.endswith(".csv"):
+        yield from iter_csv_chunks(path, csv_options or sniff_csv(path), chunksize)
+    else:
+        df = load_df(path)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def write_upload(stream, path: str, max_bytes: int, chunk_size: int = 1024 * 1024) -> int:
+    """Copy an upload stream to ``path`` in fixed-size chunks.
+
+    Stops as soon as more than ``max_bytes`` have arrived, removes the partial
+    file and raises ``ValueError``. Returns the number of bytes written.
+    """
+    written = 0
+    with open(path, "wb") as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                break
+            out.write(chunk)
+    if written > max_bytes:
+        os.remove(path)
+        raise ValueError("File size limit exceeded")
+    return written
+
+
+def scan_shape(path: str, csv_options: dict | None = None) -> tuple:
+    """Return ``(row_count, column_names, csv_options)`` without loading the file.
+
+    CSVs are counted chunk by chunk and XLSX sheets are streamed through
+    openpyxl's read-only mode, so memory stays bounded by one chunk. For CSVs
+    the returned options are the ones that parsed the whole file, with the
+    same fallbacks as :func:`load_df`; store them so later loads parse once.
+    """
+    if path.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, ())
+            count = last_filled = 0
+            for row in rows:
+                count += 1
+                if any(v is not None for v in row):
+                    last_filled = count  # pandas drops trailing blank rows
+        finally:
+            wb.close()
+        columns = [f"Unnamed: {i}" if v is None else str(v) for i, v in enumerate(header)]
+        return last_filled, columns, None
+    if not path.endswith(".csv"):
+        df = load_df(path)
+        return len(df), [str(c) for c in df.columns], None
+
+    options = csv_options or sniff_csv(path)
+    try:
+        return _count_csv(path, options) + (options,)
+    except UnicodeDecodeError:
+        options = {**options, "encoding": "latin-1"}
+    except pd.errors.ParserError:
+        options = {**options, "on_bad_lines": "skip"}
+    return _count_csv(path, options) + (options,)
+
+
+def scan_dtypes(path: str, csv_options: dict | None = None) -> dict:
+    """The dtype names a whole-file ``read_csv`` gives a CSV's columns, found chunk by chunk.
+
+    Chunks that disagree widen the column as a whole-file parse would:
+    integers and floats to float64, anything else to object.
+    """
+    dtypes = {}
+    for chunk in iter_csv_chunks(path, csv_options or sniff_csv(path)):
+        for col, dtype in chunk.dtypes.items():
+            current = dtypes.setdefault(col, dtype)
+            if current != dtype:
+                numbers = current.kind in "iuf" and dtype.kind in "iuf"
+                dtypes[col] = np.dtype("float64") if numbers else np.dtype(object)
+    return {col: str(dtype) for col, dtype in dtypes.items()}
+
+
+def _count_csv(path: str, csv_options: dict) -> tuple:
+    rows = 0
+    columns = []
+    for chunk in iter_csv_chunks(path, csv_options):
+        if not columns:
+            columns = [str(c) for c in chunk.columns]
+        rows += len(chunk)
+    return rows, columns
+
+
+def save_df(df: pd.DataFrame, path: str):
+    if path.endswith(".xlsx"):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def read_working(path: str) -> pd.DataFrame:
+    """Read a Feather working copy through a memory map.
+
+    Columns without nulls are wrapped rather than copied where Arrow allows it.
+    """
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def save_working(df: pd.DataFrame, stem: str) -> str:
+    """Write ``df`` as a working copy next to ``stem`` and return its path.
+
+    The file is written to a temporary name and renamed into place, so frames
+    still memory-mapped from the previous version are never truncated under
+    a reader.
+    """
+    df = df.reset_index(drop=True)
+    df.columns = [str(c) for c in df.columns]
+    if feather is not None:
+        path = stem + ".feather"
+        try:
+            feather.write_feather(df, path + ".tmp", compression="uncompressed")
+            os.replace(path + ".tmp", path)
+            return path
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Mixed-type object columns can't be expressed in Arrow; pickle them
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+    path = stem + ".pkl"
+    df.to_pickle(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class RowIndex:
+    """Random row access into one session file.
+
+    ``rows`` and ``columns`` describe the file as ``load_df`` would parse it.
+    For CSVs ``offsets[k]`` is the byte offset of data row ``k * stride``;
+    Feather files need no offsets, their record batches are located from the
+    file footer through the memory map.
+    """
+
+    def __init__(self, rows: int, columns: list, offsets: np.ndarray | None = None,
+                 stride: int = ROW_INDEX_STRIDE):
+        self.rows = rows
+        self.columns = columns
+        self.offsets = offsets
+        self.stride = stride
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.offsets is None else self.offsets.nbytes
+
+
+def build_row_index(path: str, csv_options: dict | None = None, stride: int = ROW_INDEX_STRIDE) -> RowIndex | None:
+    """Index a Feather working copy or CSV for :func:`read_rows`.
+
+    CSVs are scanned once in fixed-size blocks; record ends are the newlines
+    outside quotes, found with vectorized quote parity, and blank lines are
+    not counted, as pandas skips them. Returns None for files without random
+    access: Excel, pickles, and CSVs parsed with bad lines skipped (the
+    skipped lines would shift every later offset).
+    """
+    if path.endswith(".feather"):
+        table = feather.read_table(path, memory_map=True)
+        return RowIndex(table.num_rows, table.schema.names)
+    if not path.endswith(".csv"):
+        return None
+    options = csv_options or sniff_csv(path)
+    if "on_bad_lines" in options:
+        return None
+    columns = [str(c) for c in pd.read_csv(path, nrows=0, **options).columns]
+    header = 0 if options.get("header", 0) is None else 1
+    quote = ord(options.get("quotechar") or '"')
+    offsets = [0] if header == 0 else []
+    records = 0  # records seen so far, the header included
+    in_quotes = False
+    last_end, last_byte = -1, 10  # previous newline position and the byte before the current block
+    base = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(SCAN_BYTES)
+            if not block:
+                break
+            arr = np.frombuffer(block, dtype=np.uint8)
+            parity = (np.cumsum(arr == quote) + in_quotes) % 2
+            newlines = np.flatnonzero((arr == 10) & (parity == 0))
+            if len(newlines):
+                previous = np.concatenate(([last_end - base], newlines[:-1]))
+                before = np.where(newlines > 0, arr[np.maximum(newlines - 1, 0)], last_byte)
+                length = newlines - previous - 1
+                ends = newlines[(length > 1) | ((length == 1) & (before != 13))]
+                # Record j ends data row j - header; row j - header + 1 starts after it
+                numbers = records + np.arange(len(ends))
+                offsets.extend((ends[(numbers - header + 1) % stride == 0] + base + 1).tolist())
+                records += len(ends)
+                last_end = int(newlines[-1]) + base
+            in_quotes = bool(parity[-1])
+            last_byte = int(arr[-1])
+            base += len(block)
+    tail = base - last_end - 1  # bytes after the last newline: an unterminated last record
+    if tail > 1 or (tail == 1 and last_byte != 13):
+        records += 1
+    rows = max(records - header, 0)
+    offsets = np.asarray([o for o in offsets if o < base], dtype=np.int64)
+    return RowIndex(rows, columns, offsets, stride)
+
+
+def read_rows(path: str, csv_options: dict | None, index: RowIndex, start: int, stop: int,
+              columns: list | None = None, dtypes: dict | None = None) -> pd.DataFrame:
+    """Rows ``[start, stop)`` of an indexed file, labelled with their row numbers.
+
+    Only the pages holding the window are read: Feather batches through the
+    memory map, CSV text from the nearest checkpoint at or before ``start``.
+    A CSV window is parsed into ``dtypes`` (``{column: dtype name}``, the
+    session's schema or :func:`scan_dtypes`) rather than the types its own
+    rows suggest, so every window matches the whole-file parse: float and
+    text columns are read as such and the other types cast with
+    ``schema.apply``.
+    """
+    start, stop = max(start, 0), min(stop, index.rows)
+    if start >= stop:
+        return pd.DataFrame(columns=columns if columns is not None else index.columns)
+    if path.endswith(".feather"):
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        df = table.slice(start, stop - start).to_pandas()
+    else:
+        options = {**(csv_options or sniff_csv(path)), "header": None}
+        k = min(start // index.stride, len(index.offsets) - 1)
+        with open(path, "rb") as f:
+            f.seek(int(index.offsets[k]))
+            parse = {c: t for c, t in (dtypes or {}).items() if t in ("float64", "object") and c in index.columns}
+            df = pd.read_csv(f, names=index.columns, usecols=columns, nrows=stop - k * index.stride,
+                             dtype=parse or None, **options)
+        df = df.iloc[start - k * index.stride:]
+        if columns is not None:
+            df = df[columns]
+        df = schema.apply(df, dtypes)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def read_working_columns(path: str, columns: list) -> pd.DataFrame:
+    """Whole columns of a Feather working copy, without reading the others."""
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def take_working_rows(path: str, positions: np.ndarray, columns: list | None = None) -> pd.DataFrame:
+    """Rows at ``positions`` of a Feather working copy, labelled with their row numbers."""
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    df = table.take(pa.array(positions, type=pa.int64())).to_pandas()
+    df.index = pd.Index(positions)
+    return df
@@ -18,10 +18,22 @@ print("MISSING:", s["missing"]["total_missing"])
 print("DUPES:", s["duplicates"]["duplicate_rows"])
 print("OUTLIERS:", s["outliers"]["total_outliers"])
 
+# Test conditional summary: an unchanged session answers 304
+etag = resp2.headers["ETag"]
+resp2b = requests.get(f"{BASE}/summary", params={"session_id": session_id}, headers={"If-None-Match": etag})
+print("SUMMARY UNCHANGED:", resp2b.status_code)
+assert resp2b.status_code == 304
+
 # Test clean missing
 resp3 = requests.post(f"{BASE}/clean/missing", params={"session_id": session_id}, json={"strategy": "mean"})
 print("CLEAN MISSING:", resp3.json())
 
+# The cleaning step changed the data, so the old ETag no longer matches
+resp3b = requests.get(f"{BASE}/summary", params={"session_id": session_id}, headers={"If-None-Match": etag})
+print("SUMMARY AFTER CLEAN:", resp3b.status_code)
+assert resp3b.status_code == 200 and resp3b.headers["ETag"] != etag
+assert resp3b.json()["missing"]["total_missing"] == 0
+
 # Test clean duplicates
 resp4 = requests.post(f"{BASE}/clean/duplicates", params={"session_id": session_id})
 print("CLEAN DUPES:", resp4.json())
@@ -35,4 +47,17 @@ print("VIZ CHARTS: bar_charts=%d histograms=%d boxplots=%d corr_cols=%d before_a
     len(v.get("before_after", []))
 ))
 
+# Test a CSV without a header row: columns are named "0", "1", ... everywhere
+headerless = b"1,2.5,x\n2,3.5,y\n2,3.5,y\n4,,z\n"
+resp6 = requests.post(f"{BASE}/upload", files={"file": ("headerless.csv", headerless, "text/csv")})
+h = resp6.json()
+print("HEADERLESS UPLOAD:", h["column_names"], h["rows"])
+assert h["column_names"] == ["0", "1", "2"] and h["rows"] == 4
+hp = requests.get(f"{BASE}/preview", params={"session_id": h["session_id"], "columns": "0,1", "sort": "0", "order": "desc"})
+print("HEADERLESS PREVIEW:", hp.status_code, hp.json()["rows"][0])
+assert hp.status_code == 200 and hp.json()["rows"][0] == {"0": 4, "1": None}
+hd = requests.post(f"{BASE}/clean/duplicates", params={"session_id": h["session_id"]}, json={"subset": ["1", "2"]})
+print("HEADERLESS DUPES:", hd.status_code, hd.json())
+assert hd.status_code == 200 and hd.json()["after"]["rows"] == 3
+
 print("ALL TESTS PASSED ✅")
@@ -0,0 +1,80 @@
+"""Baseline profile of the original upload: built once on first use, never by re-parsing the original afterwards."""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as server
+import baseline
+import visualization as viz
+from storage import load_df
+
+SAMPLE_CSV = Path(__file__).parent / "sample_data.csv"
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Paths of every whole-file parse the app makes."""
+    paths = []
+
+    def counting(path, *args, **kwargs):
+        paths.append(path)
+        return load_df(path, *args, **kwargs)
+
+    monkeypatch.setattr(server, "load_df", counting)
+    return paths
+
+
+def test_upload_only_streams(client, upload, parsed):
+    session_id = upload()
+    session = server.get_session(session_id)
+    assert parsed == []
+    assert session["baseline"] is None and not os.path.exists(server.baseline_path(session_id))
+
+
+def test_first_visualize_builds_the_baseline(client, upload, parsed):
+    session_id = upload()
+    query = {"session_id": session_id}
+    charts = client.get("/api/visualize", query_string=query).get_json()
+    session = server.get_session(session_id)
+    assert session["original_path"] in parsed
+    assert session["baseline"] and os.path.exists(server.baseline_path(session_id))
+
+    original = server.load_original(session)
+    profile = baseline.build_baseline(original)
+    assert charts["original_histograms"] == profile["histograms"]
+    assert [chart["data"][0]["value"] for chart in charts["before_after"]] == [
+        len(original), int(original.isnull().sum().sum()), int(original.duplicated().sum())]
+    assert charts["missing_heatmap"] == viz.missing_heatmap(original)
+
+
+def test_cleaning_compares_against_the_stored_baseline(client, upload, parsed):
+    session_id = upload()
+    query = {"session_id": session_id}
+    before = client.get("/api/visualize", query_string=query).get_json()
+    assert client.post("/api/clean/missing", query_string=query, json={"strategy": "drop"}).status_code == 200
+    server.df_cache.invalidate(session_id)
+    parsed.clear()
+
+    after = client.get("/api/visualize", query_string=query).get_json()
+    assert server.get_session(session_id)["original_path"] not in parsed
+    assert after["original_histograms"] == before["original_histograms"]
+    assert after["missing_heatmap"] == before["missing_heatmap"]
+    assert [c["data"][0] for c in after["before_after"]] == [c["data"][0] for c in before["before_after"]]
+    assert after["before_after"][1]["data"][1]["value"] == 0
+
+    raw = pd.read_csv(SAMPLE_CSV)
+    assert before["before_after"][0]["data"][0]["value"] == len(raw)
+
+
+def test_patterns_round_trip(tmp_path):
+    df = pd.DataFrame({"a": [1, None, 3, None], "b": ["x", None, None, None]})
+    labels, patterns = viz.missing_patterns(df)
+    path = str(tmp_path / "p.npz")
+    baseline.save_patterns(path, labels, patterns)
+    with np.load(path) as data:
+        assert data["labels"].dtype == np.uint8
+    loaded_labels, loaded_patterns = baseline.load_patterns(path)
+    np.testing.assert_array_equal(loaded_patterns[loaded_labels], df.isna().to_numpy())
@@ -0,0 +1,65 @@
+"""Out-of-core cleaning (chunked.clean_file) must give the frames the in-memory operations give."""
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+import chunked
+import cleaning as cl
+from storage import load_df
+
+CHUNK = 37  # small batches, so duplicates fall in different batches than their first copies
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(11)
+    n = 300
+    df = pd.DataFrame({
+        "a": rng.integers(0, 20, n) / 4,
+        "b": rng.integers(0, 5, n),
+        "c": rng.choice(["x", "y", " X", "y  ", None], n),
+    })
+    df.loc[rng.choice(n, 25, replace=False), "a"] = np.nan
+    df = pd.concat([df, df.sample(120, random_state=2)], ignore_index=True)
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def run_chunked(csv_path, tmp_path, operation, **params):
+    result = chunked.clean_file(csv_path, str(tmp_path / "out"), operation, chunksize=CHUNK, **params)
+    out = feather.read_feather(result["path"])
+    assert result["after"]["rows"] == len(out)
+    assert result["removed_rows"] == result["before"]["rows"] - len(out)
+    return out
+
+
+def assert_same_rows(result, want):
+    result = result.astype(object).where(result.notna(), np.nan)  # Feather reads missing text as None
+    want = want.astype(object).where(want.notna(), np.nan)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), want.reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("params", [{}, {"subset": ["b", "c"]}, {"near": True}, {"subset": ["c"], "near": True}])
+def test_remove_duplicates_matches_memory(csv_path, tmp_path, params):
+    df = load_df(csv_path)
+    assert_same_rows(run_chunked(csv_path, tmp_path, "remove_duplicates", **params),
+                     cl.remove_duplicates(df, **params))
+
+
+@pytest.mark.parametrize("operation, memory", [
+    ("drop_missing", cl.drop_missing),
+    ("normalize", cl.normalize_data),
+    ("fill_missing", lambda df: cl.fill_missing(df, "mean")),
+])
+def test_operation_matches_memory(csv_path, tmp_path, operation, memory):
+    assert_same_rows(run_chunked(csv_path, tmp_path, operation), memory(load_df(csv_path)))
+
+
+def test_seen_hashes_lookup():
+    seen = np.array([3, 8, 2**63 + 5], dtype=np.uint64)
+    hashes = np.array([2**63 + 5, 1, 8, 2**64 - 1, 3], dtype=np.uint64)
+    assert chunked._contains(seen, hashes).tolist() == [True, False, True, False, True]
+    assert not chunked._contains(np.empty(0, dtype=np.uint64), hashes).any()
@@ -0,0 +1,78 @@
+"""Columnar encoding and compression of API responses (compact.py) decode back to the records format."""
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import compact
+
+
+def decode(value):
+    """Python twin of ``decodeColumnar`` in frontend/src/services/api.js."""
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    table = value.get("$table")
+    if table is not None and len(value) == 1:
+        data = [decode(column) for column in table["data"]]
+        length = len(data[0]) if data else len(table.get("index", []))
+        rows = [{col: data[j][i] for j, col in enumerate(table["columns"])} for i in range(length)]
+        return dict(zip(table["index"], rows)) if "index" in table else rows
+    return {key: decode(item) for key, item in value.items()}
+
+
+def test_columnar_round_trip():
+    payload = {
+        "histograms": [{"column": "a", "bins": [{"range": "0-1", "count": 3}, {"range": "1-2", "count": 0}]},
+                       {"column": "b", "bins": [{"range": "5-6", "count": 1}, {"range": "6-7", "count": 2}]}],
+        "stats": {"a": {"mean": 1.5, "nulls": 0}, "b": {"mean": None, "nulls": 4}},
+        "mixed": [{"x": 1}, {"y": 2}],
+        "single": [{"x": 1}],
+        "empty": [],
+        "scalar": 3,
+    }
+    encoded = compact.columnar(payload)
+    assert encoded["stats"]["$table"]["index"] == ["a", "b"]
+    assert encoded["histograms"]["$table"]["columns"] == ["column", "bins"]
+    assert encoded["mixed"] == payload["mixed"] and encoded["single"] == payload["single"]
+    assert decode(json.loads(json.dumps(encoded))) == payload
+
+
+def test_frame_table_keeps_values_and_dtypes():
+    df = pd.DataFrame({"n": [1, 2, 3], "f": [0.5, np.nan, 2.0], "s": ["x", None, "z"],
+                       "d": pd.to_datetime(["2024-01-01", None, "2024-03-01"])})
+    table = json.loads(compact.frame_table(df))["$table"]
+    assert table["dtypes"] == ["int64", "float64", "object", "datetime64[ns]"]
+    assert decode({"$table": table}) == [
+        {"n": 1, "f": 0.5, "s": "x", "d": "2024-01-01T00:00:00.000"},
+        {"n": 2, "f": None, "s": None, "d": None},
+        {"n": 3, "f": 2.0, "s": "z", "d": "2024-03-01T00:00:00.000"},
+    ]
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    ("gzip, deflate", 10_000, "gzip"),
+    ("gzip", compact.COMPRESS_MIN_BYTES - 1, None),
+    ("gzip;q=0, deflate", 10_000, None),
+    ("", 10_000, None),
+    ("br;q=0.5, gzip", 10_000, "br" if compact.brotli is not None else "gzip"),
+])
+def test_accepted_encoding(header, size, expected):
+    assert compact.accepted_encoding(header, size) == expected
+
+
+@pytest.mark.parametrize("url", ["/api/summary", "/api/visualize", "/api/preview"])
+def test_columnar_responses_match_records(client, upload, url):
+    session_id = upload()
+    records = client.get(url, query_string={"session_id": session_id}).get_json()
+    columnar = client.get(url, query_string={"session_id": session_id, "format": "columnar"},
+                          headers={"Accept-Encoding": "gzip"})
+    assert columnar.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in columnar.headers["Vary"]
+    body = json.loads(gzip.decompress(columnar.data))
+    if url == "/api/preview":
+        assert body["rows"]["$table"]["dtypes"]
+    assert decode(body) == records
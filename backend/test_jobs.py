@@ -0,0 +1,177 @@
+"""Background jobs: submit, poll and fetch results, failures, and recovery from the database after a restart."""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app as server
+import jobs
+import metadata
+
+
+def wait(client, job_id, timeout=30.0):
+    """Poll a job until it finishes; returns its last status."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+def submit(client, session_id, kind, **body):
+    response = client.post("/api/jobs", query_string={"session_id": session_id}, json={"kind": kind, **body})
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()
+
+
+def test_submit_poll_result(client, upload):
+    session_id = upload()
+    steps = [{"op": "missing", "strategy": "median"}, {"op": "duplicates"}]
+    job = submit(client, session_id, "pipeline", params={"steps": steps})
+    assert job["status"] in ("queued", "running", "done")
+    assert "result_path" not in job
+
+    job = wait(client, job["job_id"])
+    assert job["status"] == "done" and job["progress"] == 1.0 and job["error"] is None
+    result = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert result.status_code == 200
+    assert result.get_json() == job["result"]
+    assert [step["op"] for step in job["result"]["steps"]] == ["missing", "duplicates"]
+    assert job["result"]["after"]["missing"] == 0
+
+    # The job's step was saved as the working copy
+    summary = client.get("/api/summary", query_string={"session_id": session_id}).get_json()
+    assert summary["rows"] == job["result"]["after"]["rows"]
+    listed = client.get("/api/jobs", query_string={"session_id": session_id}).get_json()["jobs"]
+    assert [j["job_id"] for j in listed] == [job["job_id"]]
+
+
+def test_download_job_serves_file(client, upload):
+    session_id = upload()
+    job = wait(client, submit(client, session_id, "download", args={"format": "csv"})["job_id"])
+    assert job["status"] == "done"
+    response = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert response.status_code == 200
+    assert response.data == client.get("/api/download", query_string={"session_id": session_id}).data
+
+
+def test_jobs_of_a_session_run_in_order(client, upload):
+    session_id = upload()
+    first = submit(client, session_id, "missing", params={"strategy": "drop"})
+    second = submit(client, session_id, "summary")
+    first, second = wait(client, first["job_id"]), wait(client, second["job_id"])
+    assert second["result"]["missing"]["total_missing"] == 0
+    assert second["result"]["rows"] == first["result"]["after"]["rows"]
+
+
+def test_failed_job_reports_error(client, upload):
+    session_id = upload()
+    job = wait(client, submit(client, session_id, "outliers", params={"mode": "zap"})["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "mode must be 'drop' or 'clip'"
+    response = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert response.status_code == 500
+    assert response.get_json() == {"error": job["error"]}
+
+
+def test_unknown_jobs_and_kinds(client, upload):
+    session_id = upload()
+    assert client.get("/api/jobs/no-such-job").status_code == 404
+    assert client.get("/api/jobs/no-such-job/result").status_code == 404
+    response = client.post("/api/jobs", query_string={"session_id": session_id}, json={"kind": "bogus"})
+    assert response.status_code == 400
+    response = client.post("/api/jobs", query_string={"session_id": "missing"}, json={"kind": "summary"})
+    assert response.status_code == 404
+
+
+def test_jobs_reload_from_database_after_restart(client, upload):
+    session_id = upload()
+    # A process that accepted two jobs and stopped while running the first
+    before = jobs.JobQueue(server.metadata.connection, server.run_job, workers=1)
+    running = before.submit(session_id, "missing", {"strategy": "drop"})
+    queued = before.submit(session_id, "summary")
+    before.update(running["job_id"], status="running")
+    assert before.get(queued["job_id"])["status"] == "queued"
+
+    # The next process finds both in the jobs table
+    after = jobs.JobQueue(server.metadata.connection, server.run_job, workers=0)
+    after.start()
+    interrupted, resumed = after.get(running["job_id"]), after.get(queued["job_id"])
+    assert interrupted["status"] == "failed"
+    assert interrupted["error"] == "Interrupted by a server restart"
+    assert resumed["status"] == "done"
+    assert resumed["result"]["rows"] == 50
+    assert [j["job_id"] for j in after.list(session_id)] == [running["job_id"], queued["job_id"]]
+    assert client.get(f"/api/jobs/{queued['job_id']}/result").get_json() == resumed["result"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = metadata.MetadataStore(tmp_path / "jobs.db")
+    store.migrate()
+    return store
+
+
+def blocking_queue(store, run):
+    """A one-worker queue whose first job waits for ``release`` so later jobs queue behind it."""
+    release = threading.Event()
+
+    def blocked(job):
+        release.wait(5)
+        return run(job)
+
+    work = jobs.JobQueue(store.connection, blocked, workers=1)
+    work.start()
+    return work, release
+
+
+def wait_for(work, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = work.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+def test_unserializable_result_fails_the_job(store):
+    work, release = blocking_queue(store, lambda job: ({"value": object()} if job["kind"] == "bad" else {"ok": 1}, {}))
+    bad, good = work.submit("s1", "bad"), work.submit("s1", "good")
+    release.set()
+    bad, good = wait_for(work, bad["job_id"]), wait_for(work, good["job_id"])
+    assert bad["status"] == "failed" and "not JSON serializable" in bad["error"]
+    assert good["status"] == "done" and good["result"] == {"ok": 1}
+    assert work._waiting == {}
+
+
+def test_session_is_released_when_bookkeeping_fails(store, monkeypatch):
+    work, release = blocking_queue(store, lambda job: ({"ok": 1}, {}))
+    update = work.update
+
+    def flaky(job_id, **fields):
+        if fields.get("status") == "done" and job_id == first["job_id"]:
+            raise sqlite3.OperationalError("database is locked")
+        update(job_id, **fields)
+
+    monkeypatch.setattr(work, "update", flaky)
+    first, second = work.submit("s1", "summary"), work.submit("s1", "summary")
+    release.set()
+    first, second = wait_for(work, first["job_id"]), wait_for(work, second["job_id"])
+    assert first["status"] == "failed" and first["error"] == "database is locked"
+    assert second["status"] == "done"
+
+    def broken(job_id, **fields):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(work, "update", broken)
+    work.submit("s2", "summary")  # not even the failure can be stored
+    deadline = time.monotonic() + 5
+    while work._waiting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert work._waiting == {}
+    monkeypatch.setattr(work, "update", update)
+    assert wait_for(work, work.submit("s2", "summary")["job_id"])["status"] == "done"  # the worker survived
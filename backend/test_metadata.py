@@ -0,0 +1,75 @@
+"""Metadata store: per-thread connections, nested blocks and schema migrations."""
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+import metadata
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = metadata.MetadataStore(tmp_path / "metadata.db")
+    store.migrate()
+    return store
+
+
+def connection_id(store):
+    with store.connection() as conn:
+        return id(conn)
+
+
+def in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    gc.collect()
+    return result[0]
+
+
+def test_a_thread_keeps_its_connection(store):
+    with store.connection() as first:
+        pass
+    with store.connection() as second:
+        pass
+    assert first is second
+    assert in_thread(lambda: connection_id(store)) != id(first)
+
+
+def test_connections_of_exited_threads_are_reused(store):
+    first = in_thread(lambda: connection_id(store))
+    assert store.stats()["idle_connections"] == 1
+    assert in_thread(lambda: connection_id(store)) == first
+    stats = store.stats()
+    assert stats["opened_connections"] == 2  # this thread's and the one the workers shared
+    assert stats["thread_connections"] == 1
+
+
+def test_nested_blocks_share_one_transaction(store):
+    store.create_session("a", original_filename="a.csv")
+    with pytest.raises(RuntimeError):
+        with store.connection():
+            with store.connection():
+                store.update_session("a", original_filename="b.csv")
+            raise RuntimeError
+    assert store.get_session("a")["original_filename"] == "a.csv"
+    store.update_session("a", bump_version=True, row_count=5)
+    assert store.get_session("a")["version"] == 1
+
+
+def test_migrates_an_unversioned_database(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, original_filename TEXT, upload_time TEXT,"
+                     " original_path TEXT, cleaned_path TEXT)")
+        conn.execute("INSERT INTO sessions (session_id, original_filename) VALUES ('old', 'x.csv')")
+    store = metadata.MetadataStore(path)
+    store.migrate()
+    store.migrate()
+    assert store.stats()["schema_version"] == len(metadata.MIGRATIONS)
+    assert store.get_session("old")["original_filename"] == "x.csv"
+    assert store.journal_mode == "wal"
+    with pytest.raises(ValueError):
+        store.update_session("old", nope=1)
@@ -0,0 +1,53 @@
+"""Span aggregates: timed calls, calls that raise, Prometheus text and Server-Timing."""
+import re
+
+import pandas as pd
+import pytest
+
+from metrics import Metrics, server_timing
+
+
+@pytest.fixture
+def metrics():
+    return Metrics(prefix="t")
+
+
+def boom(df):
+    raise ValueError("no")
+
+
+def test_timed_records_sizes(metrics):
+    double = metrics.timed("double", lambda df: pd.concat([df, df]))
+    double(pd.DataFrame({"a": range(5)}))
+    series = metrics._spans["double"]
+    assert series["calls"] == 1 and series["errors"] == 0
+    assert (series["rows"], series["columns"], series["bytes_in"], series["bytes_out"]) == (5, 1, 40, 80)
+
+
+def test_calls_that_raise_are_timed_and_counted(metrics):
+    failing = metrics.timed("boom", boom)
+    metrics.start_trace()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            failing(pd.DataFrame({"a": range(3)}))
+    with pytest.raises(KeyError):
+        with metrics.span("block"):
+            raise KeyError("x")
+    spans = metrics.end_trace()
+
+    assert [name for name, _ in spans] == ["boom", "boom", "block"]
+    assert metrics._spans["boom"]["calls"] == 2 and metrics._spans["boom"]["errors"] == 2
+    assert metrics._spans["boom"]["rows"] == 6 and metrics._spans["boom"]["bytes_out"] == 0
+    assert metrics._spans["block"]["errors"] == 1
+    text = metrics.render()
+    assert 't_span_errors_total{span="boom"} 2' in text
+    assert 't_span_seconds_count{span="boom"} 2' in text
+    assert server_timing(spans).startswith('boom;dur=')
+
+
+def test_metrics_endpoint_lists_errors(client, upload):
+    session_id = upload()
+    client.get("/api/preview", query_string={"session_id": session_id})
+    text = client.get("/api/metrics").get_data(as_text=True)
+    assert "# TYPE dcb_span_errors_total counter" in text
+    assert re.search(r'^dcb_span_errors_total\{span="storage.scan_shape"\} \d+$', text, re.M)
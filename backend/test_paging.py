@@ -0,0 +1,133 @@
+"""Preview windows: offsets, sorting with nulls, filters and total counts, from every row source."""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as server
+
+FILTERS = [{"column": "Department", "op": "eq", "value": "Engineering"}, {"column": "Age", "op": "gt", "value": 30}]
+
+
+@pytest.fixture(params=["csv", "memory", "feather", "lazy"])
+def session(request, client, upload):
+    """A session whose preview is read from the uploaded CSV's row index, the frame cache,
+    a Feather working copy, or evaluated from a queued lazy step."""
+    session_id = upload()
+    query = {"session_id": session_id}
+    if request.param == "memory":
+        server.load_working(server.get_session(session_id))
+    elif request.param == "feather":
+        assert client.post("/api/clean/duplicates", query_string=query).status_code == 200
+        server.df_cache.invalidate(session_id)
+    elif request.param == "lazy":
+        response = client.post("/api/clean/duplicates", query_string={**query, "execution": "lazy"})
+        assert response.status_code == 200
+    else:
+        server.df_cache.invalidate(session_id)
+    return session_id
+
+
+def preview(client, session_id, **args):
+    if "filters" in args:
+        args["filters"] = json.dumps(args["filters"])
+    return client.get("/api/preview", query_string={"session_id": session_id, **args})
+
+
+def expected(session_id):
+    """The session's rows as the preview should see them (runs any queued steps, so call it last)."""
+    with server.app.test_request_context():
+        return server.get_current_df(session_id).reset_index(drop=True)
+
+
+def test_offsets_past_the_end(client, session):
+    page = preview(client, session, offset=10_000, limit=20).get_json()
+    assert page["rows"] == [] and page["row_numbers"] == []
+    last = preview(client, session, offset=page["total_rows"] - 3, limit=20).get_json()
+    assert last["row_numbers"] == list(range(page["total_rows"] - 3, page["total_rows"]))
+    clamped = preview(client, session, offset=-5, limit=2).get_json()
+    assert clamped["offset"] == 0 and clamped["row_numbers"] == [0, 1]
+    assert preview(client, session, limit=0).get_json()["rows"] == []
+    assert page["total_rows"] == len(expected(session))
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_sort_puts_nulls_last(client, session, order):
+    pages = [preview(client, session, sort="Salary", order=order, offset=offset, limit=7).get_json()
+             for offset in range(0, 70, 7)]
+    rows = [row for page in pages for row in page["rows"]]
+    numbers = [n for page in pages for n in page["row_numbers"]]
+    df = expected(session)
+    want = df["Salary"].sort_values(ascending=order == "asc", kind="stable", na_position="last")
+    assert numbers == want.index.tolist()
+    salaries = [row["Salary"] for row in rows]
+    assert salaries[want.count():] == [None] * int(want.isna().sum())
+    np.testing.assert_allclose(salaries[:want.count()], want.dropna().to_numpy())
+
+
+def test_filters_and_total_rows(client, session):
+    pages = [preview(client, session, filters=FILTERS, sort="Age", offset=offset, limit=4).get_json()
+             for offset in range(0, 40, 4)]
+    df = expected(session)
+    mask = (df["Department"] == "Engineering") & (df["Age"] > 30)
+    assert {page["total_rows"] for page in pages} == {int(mask.sum())}
+    numbers = [n for page in pages for n in page["row_numbers"]]
+    assert sorted(numbers) == np.flatnonzero(mask.to_numpy()).tolist()
+    assert all(row["Department"] == "Engineering" and row["Age"] > 30 for page in pages for row in page["rows"])
+
+
+def test_unknown_columns_are_rejected(client, session):
+    response = preview(client, session, filters=[{"column": "Nope", "op": "eq", "value": 1}])
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown filter column: Nope"}
+    assert preview(client, session, sort="Nope").status_code == 400
+    assert preview(client, session, columns="Age,Nope").status_code == 400
+    response = preview(client, session, filters=[{"column": "Age", "op": "between", "value": 1}])
+    assert response.status_code == 400
+    response = preview(client, session, filters=[{"column": "Age", "op": "gt", "value": "old"}])
+    assert response.get_json() == {"error": "Filter value for Age must be a number"}
+
+
+def test_projection_keeps_totals(client, session):
+    page = preview(client, session, columns="Name,Salary", limit=5).get_json()
+    assert page["columns"] == ["Name", "Salary"]
+    assert all(set(row) == {"Name", "Salary"} for row in page["rows"])
+    assert page["total_rows"] == preview(client, session).get_json()["total_rows"]
+    assert page["total_columns"] == 8
+
+
+@pytest.fixture
+def late_csv(tmp_path):
+    """A CSV whose first rows look like integers in columns that turn float and text at row 55."""
+    lines = ["id,score,code"] + [f"{i},{i * 2},{i:03d}" for i in range(60)]
+    lines[56] = "55,,A55"
+    path = tmp_path / "late.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def page_table(client, session_id, offset):
+    body = preview(client, session_id, offset=offset, limit=10, format="columnar").get_json()
+    return body["rows"]["$table"]
+
+
+def test_csv_pages_keep_whole_file_types(client, upload, late_csv):
+    session_id = upload(late_csv)
+    server.df_cache.invalidate(session_id)
+    whole = pd.read_csv(late_csv)
+    pages = [page_table(client, session_id, offset) for offset in range(0, 60, 10)]
+    assert {tuple(page["dtypes"]) for page in pages} == {tuple(str(t) for t in whole.dtypes)}
+    assert pages[0]["data"][1][:3] == [0.0, 2.0, 4.0] and pages[0]["data"][2][:3] == ["000", "001", "002"]
+
+    # Once the first parse has chosen the session's types, pages come in those
+    client.get("/api/summary", query_string={"session_id": session_id})
+    saved = expected(session_id)
+    server.df_cache.invalidate(session_id)
+    pages = [page_table(client, session_id, offset) for offset in range(0, 60, 10)]
+    assert {tuple(page["dtypes"]) for page in pages} == {tuple(str(t) for t in saved.dtypes)}
+    downloaded = pd.read_csv(io.BytesIO(client.get("/api/download", query_string={"session_id": session_id}).data),
+                             dtype={"code": str})
+    rows = pd.DataFrame({col: sum((page["data"][i] for page in pages), []) for i, col in enumerate(pages[0]["columns"])})
+    pd.testing.assert_frame_equal(rows, downloaded, check_dtype=False)
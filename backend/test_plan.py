@@ -0,0 +1,93 @@
+"""Optimized lazy plans (plan.execute) must give the frames cleaning.run_pipeline gives."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import cleaning as cl
+import plan
+from storage import load_df
+
+SAMPLE_CSV = Path(__file__).parent / "sample_data.csv"
+
+PIPELINES = [
+    [{"op": "normalize"}, {"op": "duplicates"}],
+    [{"op": "duplicates"}, {"op": "outliers", "mode": "drop"}, {"op": "normalize"}],
+    [{"op": "outliers", "mode": "clip"}, {"op": "duplicates"}, {"op": "standardize"}],
+    [{"op": "normalize"}, {"op": "outliers", "mode": "drop"}, {"op": "duplicates"}],
+    [{"op": "missing", "strategy": "median"}, {"op": "normalize"}, {"op": "duplicates"}, {"op": "outliers"}],
+    [{"op": "standardize"}, {"op": "normalize"}, {"op": "duplicates", "near": True}],
+    [{"op": "missing", "strategy": "drop"}, {"op": "duplicates", "subset": ["c"]}, {"op": "standardize"}],
+    [{"op": "missing", "strategy": "mode"}, {"op": "outliers", "mode": "clip"}, {"op": "normalize"},
+     {"op": "duplicates"}, {"op": "outliers", "mode": "drop"}],
+]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(7)
+    n = 400
+    df = pd.DataFrame({
+        "a": rng.normal(10, 2, n),
+        "b": rng.integers(0, 50, n),
+        "c": rng.choice(["x", "y", "z", "X ", None], n),
+    })
+    df.loc[rng.choice(n, 8, replace=False), "a"] = [90, -70, 55, 60, -40, 80, 100, -90]
+    df.loc[rng.choice(n, 30, replace=False), "a"] = np.nan
+    df = pd.concat([df, df.sample(60, random_state=1)], ignore_index=True)
+    return {"synthetic": df, "sample": load_df(str(SAMPLE_CSV))}
+
+
+def pipeline(frame, steps):
+    return cl.parse_pipeline(steps, list(frame.columns))
+
+
+def expected(frame, steps):
+    return cl.run_pipeline(frame, steps)[0].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("steps", PIPELINES)
+@pytest.mark.parametrize("name", ["synthetic", "sample"])
+def test_plan_matches_run_pipeline(frames, name, steps):
+    frame = frames[name]
+    if name == "sample":
+        steps = [step for step in steps if "subset" not in step]
+    steps = pipeline(frame, steps)
+    result, total, _ = plan.execute(frame, steps)
+    want = expected(frame, steps)
+    assert total == len(want)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), want, check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("steps", PIPELINES[:4])
+def test_plan_head_and_projection(frames, steps):
+    frame = frames["synthetic"]
+    steps = pipeline(frame, steps)
+    result, total, _ = plan.execute(frame, steps, head=25, columns=["a", "c"])
+    want = expected(frame, steps)
+    assert total == len(want)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), want[["a", "c"]].head(25),
+                                  check_dtype=False, rtol=1e-9)
+
+
+def test_optimizer_reorders_and_fuses(frames):
+    steps = pipeline(frames["synthetic"], [{"op": "standardize"}, {"op": "normalize"}, {"op": "duplicates"}])
+    assert [step["op"] for step in plan.optimize(steps)] == ["duplicates", "normalize"]
+
+
+def test_lazy_preview_matches_pipeline(client, upload):
+    steps = PIPELINES[1] + [{"op": "missing", "strategy": "mean"}]
+    lazy, eager = upload(), upload()
+    response = client.post("/api/clean/pipeline", query_string={"session_id": lazy, "execution": "lazy"},
+                           json={"steps": steps})
+    assert response.status_code == 200, response.get_json()
+    response = client.post("/api/clean/pipeline", query_string={"session_id": eager, "execution": "memory"},
+                           json={"steps": steps})
+    assert response.status_code == 200, response.get_json()
+
+    pages = [client.get("/api/preview", query_string={"session_id": sid, "limit": 1000}).get_json()
+             for sid in (lazy, eager)]
+    assert pages[0]["pending_steps"] == len(steps)
+    assert pages[0]["total_rows"] == pages[1]["total_rows"]
+    pd.testing.assert_frame_equal(pd.DataFrame(pages[0]["rows"]), pd.DataFrame(pages[1]["rows"]), rtol=1e-9)
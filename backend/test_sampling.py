@@ -0,0 +1,107 @@
+"""Sampled summaries and charts (?sample=N): intervals, seeded draws, and estimates against exact results."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import sampling
+
+
+@pytest.fixture
+def big_csv(tmp_path):
+    rng = np.random.default_rng(1)
+    n = 20_000
+    df = pd.DataFrame({"a": rng.normal(10, 2, n), "b": rng.integers(0, 100, n).astype(float),
+                       "c": rng.choice(list("xyz"), n), "d": rng.exponential(1, n)})
+    df.loc[rng.random(n) < 0.1, "a"] = np.nan
+    df.loc[rng.random(n) < 0.05, "c"] = None
+    df = pd.concat([df, df.iloc[:1000]], ignore_index=True)
+    path = tmp_path / "big.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def within(value, interval):
+    return interval[0] <= value <= interval[1]
+
+
+def test_normal_quantiles():
+    assert sampling._z(0.95) == pytest.approx(1.959963984540054, abs=1e-12)
+    assert sampling._z(0.99) == pytest.approx(2.5758293035489004, abs=1e-12)
+
+
+def test_proportion_interval():
+    low, high = sampling.proportion_interval(10, 100)  # Wilson score interval
+    assert (low, high) == (pytest.approx(0.05523, abs=1e-5), pytest.approx(0.17437, abs=1e-5))
+    narrowed = sampling.proportion_interval(10, 100, population=200)
+    assert low < narrowed[0] < 0.1 < narrowed[1] < high
+    assert sampling.proportion_interval(10, 100, population=100) == (0.1, 0.1)  # a census
+    assert sampling.proportion_interval(0, 0) == (0.0, 1.0)
+    count, interval = sampling.estimate_count(10, 100, 1000)
+    assert count == 100 and within(100, interval)
+
+
+def test_order_statistic_and_fisher_intervals():
+    values = np.arange(1, 1001, dtype=float)
+    low, high = sampling.quantile_interval(values, 0.5)
+    assert low < 500.5 < high and high - low < 80
+    assert sampling.quantile_interval(np.array([]), 0.5) == [None, None]
+    low, high = sampling.correlation_interval(0.5, 103)
+    assert low < 0.5 < high
+    assert sampling.correlation_interval(None, 100) == [None, None]
+    assert sampling.correlation_interval(0.5, 3) == [None, None]
+
+
+def test_draw_is_seeded_and_sorted():
+    df = pd.DataFrame({"x": range(1000)})
+    first, second = sampling.draw(df, 100), sampling.draw(df, 100)
+    assert first.frame.index.tolist() == second.frame.index.tolist()
+    assert first.frame["x"].tolist() == first.frame.index.tolist() == sorted(first.frame.index)
+    assert first.fraction == 0.1 and not first.exact
+    assert sampling.draw(df, 5000).exact
+
+
+def test_duplicate_interval_coverage():
+    df = pd.DataFrame({"x": np.arange(20_000)})
+    df = pd.concat([df, df.iloc[:1000]], ignore_index=True)
+    covered = 0
+    for seed in range(200):
+        sample = sampling.Sample(df.iloc[sampling.sample_positions(len(df), 4000, seed)], len(df))
+        _, low, high = sampling._duplicate_rate(int(sample.frame.duplicated().sum()), sample, 0.95)
+        covered += low * len(df) <= 1000 <= high * len(df)
+    assert covered >= 0.88 * 200
+
+
+def test_sampled_summary_brackets_exact_values(client, upload, big_csv):
+    session_id = upload(big_csv)
+    query = {"session_id": session_id}
+    exact = client.get("/api/summary", query_string=query).get_json()
+    sampled = client.get("/api/summary", query_string={**query, "sample": 4000}).get_json()
+
+    info = sampled["sample"]
+    assert info["rows"] == 4000 and info["total_rows"] == exact["rows"] == sampled["rows"]
+    assert info["exact_job"] == "summary" and "quality" in info["approximate"]
+    assert within(exact["missing"]["total_missing"], sampled["missing"]["interval"])
+    for col, entry in exact["missing"]["missing_per_column"].items():
+        assert within(entry["count"], sampled["missing"]["missing_per_column"][col]["interval"]), col
+    # One seeded draw: the duplicate estimate is checked loosely here, its interval's coverage below
+    assert sampled["duplicates"]["duplicate_rows"] == pytest.approx(exact["duplicates"]["duplicate_rows"], rel=0.5)
+    assert within(exact["quality"]["score"], sampled["quality"]["interval"])
+
+    whole = client.get("/api/summary", query_string={**query, "sample": 10**6}).get_json()
+    assert "sample" not in whole and whole["missing"] == exact["missing"]
+
+
+def test_sampled_charts_scale_to_the_whole_frame(client, upload, big_csv):
+    session_id = upload(big_csv)
+    query = {"session_id": session_id}
+    exact = client.get("/api/visualize", query_string=query).get_json()
+    sampled = client.get("/api/visualize", query_string={**query, "sample": 4000}).get_json()
+    assert sampled["sample"]["exact_job"] == "visualize"
+    assert sum(b["count"] for b in sampled["histograms"][0]["data"]) == pytest.approx(
+        sum(b["count"] for b in exact["histograms"][0]["data"]), rel=0.02)
+    matrix = {row["column"]: row["values"] for row in exact["correlation"]["matrix"]}
+    intervals = sampled["correlation"]["intervals"]
+    assert set(intervals) == set(matrix) == {"a", "b", "d"}
+    for col, row in matrix.items():
+        for other, r in row.items():
+            assert within(r, intervals[col][other]), (col, other)
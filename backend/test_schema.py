@@ -0,0 +1,102 @@
+"""Column types from schema.optimize must keep every value, survive schema.apply and never change exports."""
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import schema
+
+SAMPLE_CSV = Path(__file__).parent / "sample_data.csv"
+
+
+@pytest.fixture
+def frame():
+    n = 120
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "small_int": rng.integers(-100, 100, n),
+        "big_int": rng.integers(0, 2**40, n),
+        "halves": rng.integers(0, 40, n) / 2,  # every value is exact in float32
+        "price": rng.normal(84583.33, 900, n),
+        "dept": rng.choice(["Sales", "Ops", "IT", None], n),
+        "when": pd.date_range("2024-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        "ids": [f"id{i}" for i in range(n)],
+        "empty_text": pd.Series([None] * n, dtype=object),
+        "empty_float": np.full(n, np.nan),
+        "mixed": [i if i % 3 else f"s{i}" for i in range(n)],
+        "flag": rng.random(n) < 0.5,
+    })
+
+
+def assert_same_values(result: pd.DataFrame, original: pd.DataFrame):
+    assert list(result.columns) == list(original.columns)
+    for col in original.columns:
+        want = original[col]
+        if pd.api.types.is_datetime64_any_dtype(result[col].dtype):
+            want = pd.to_datetime(want)
+        got, want = result[col].astype(object), want.astype(object)
+        assert got.isna().equals(want.isna()), col
+        assert got[got.notna()].tolist() == want[want.notna()].tolist(), col
+
+
+def test_optimize_keeps_values(frame):
+    optimized, types, report = schema.optimize(frame)
+    assert_same_values(optimized, frame)
+    assert types == {
+        "small_int": "int8", "big_int": "int64", "halves": "float64", "price": "float64", "dept": "category",
+        "when": "datetime64[ns]", "ids": "object", "empty_text": "object", "empty_float": "float64",
+        "mixed": "object", "flag": "bool",
+    }
+    assert sorted(optimized["dept"].cat.categories) == ["IT", "Ops", "Sales"]
+    assert report["bytes_after"] < report["bytes_before"]
+
+
+def test_apply_restores_types_after_a_reparse(frame):
+    optimized, types, _ = schema.optimize(frame)
+    reparsed = pd.read_csv(io.StringIO(optimized.to_csv(index=False)))
+    restored = schema.apply(reparsed, types)
+    # CSV text keeps no types: an all-null column reads as float64 and a mixed one as strings
+    assert {col: str(t) for col, t in restored.dtypes.items()} == {**types, "empty_text": "float64"}
+    assert_same_values(restored, optimized.assign(mixed=optimized["mixed"].astype(str)))
+    assert list(restored["dept"].cat.categories) == list(optimized["dept"].cat.categories)
+
+
+def test_apply_after_cleaning_steps(frame):
+    optimized, types, _ = schema.optimize(frame)
+    dropped = schema.apply(optimized[optimized["dept"] != "IT"], types)
+    assert sorted(dropped["dept"].cat.categories) == ["Ops", "Sales"]
+
+    filled = optimized.assign(dept=optimized["dept"].astype(object).fillna("Unknown"))
+    filled = schema.apply(filled, types)
+    assert str(filled["dept"].dtype) == "category" and "Unknown" in filled["dept"].cat.categories
+    assert_same_values(filled, optimized.assign(dept=optimized["dept"].astype(object).fillna("Unknown")))
+
+    scaled = optimized.assign(small_int=optimized["small_int"] / 7)
+    assert schema.apply(scaled, types)["small_int"].dtype == np.float64  # fractions are not cast back
+
+
+def test_floats_are_never_narrowed(frame):
+    optimized, types, _ = schema.optimize(frame)
+    assert optimized["halves"].dtype == np.float64
+    # A schema stored before floats stayed float64
+    restored = schema.apply(optimized, {**types, "halves": "float32", "price": "float32"})
+    assert restored["halves"].dtype == np.float64 and restored["price"].dtype == np.float64
+
+
+@pytest.mark.parametrize("execution", ["memory", "chunked"])
+def test_exported_values_match_float64(client, upload, execution):
+    session_id = upload()
+    query = {"session_id": session_id, "execution": execution}
+    client.get("/api/summary", query_string={"session_id": session_id})  # the first parse chooses the schema
+    response = client.post("/api/clean/missing", query_string=query, json={"strategy": "mean"})
+    assert response.status_code == 200, response.get_json()
+    assert client.post("/api/clean/normalize", query_string=query).status_code == 200
+    exported = pd.read_csv(io.BytesIO(client.get("/api/download", query_string=query).data))
+
+    raw = pd.read_csv(SAMPLE_CSV)
+    salary = raw["Salary"].fillna(raw["Salary"].mean())
+    assert response.get_json()["fill_values"]["Salary"] == raw["Salary"].mean()
+    want = (salary - salary.min()) / (salary.max() - salary.min())
+    np.testing.assert_allclose(exported["Salary"], want, rtol=1e-12, atol=0)
@@ -0,0 +1,68 @@
+"""Statistics carried across cleaning steps (stats.FrameStats.apply) must equal a fresh recompute."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as server
+from stats import FrameStats
+
+OPERATIONS = [
+    ("/api/clean/missing", {"strategy": "mean"}),
+    ("/api/clean/missing", {"strategy": "median"}),
+    ("/api/clean/missing", {"strategy": "mode"}),
+    ("/api/clean/missing", {"strategy": "drop"}),
+    ("/api/clean/duplicates", {}),
+    ("/api/clean/duplicates", {"near": True}),
+    ("/api/clean/outliers", {"mode": "drop"}),
+    ("/api/clean/outliers", {"mode": "clip"}),
+    ("/api/clean/normalize", {}),
+    ("/api/clean/standardize", {}),
+]
+
+
+def prime(client, session_id):
+    """Compute the session's statistics the way the summary and chart endpoints do."""
+    query = {"session_id": session_id}
+    assert client.get("/api/summary", query_string=query).status_code == 200
+    assert client.get("/api/visualize", query_string=query).status_code == 200
+
+
+def clean(client, session_id, url, body):
+    response = client.post(url, query_string={"session_id": session_id, "execution": "memory"}, json=body)
+    assert response.status_code == 200, response.get_json()
+
+
+def assert_matches_recompute(session_id):
+    df = server.load_working(server.get_session(session_id))
+    cached, fresh = server.get_stats(session_id), FrameStats()
+    assert cached._columns, "the cleaning step dropped the cached statistics instead of carrying them over"
+    numeric = list(df.select_dtypes(include=[np.number]).columns)
+
+    pd.testing.assert_series_equal(cached.null_counts(df), fresh.null_counts(df))
+    assert cached.unique_counts(df) == fresh.unique_counts(df)
+    for col in df.columns:
+        assert cached.value_counts(df, col).to_dict() == fresh.value_counts(df, col).to_dict(), col
+    for col in numeric:
+        assert cached.mean(df, col) == pytest.approx(fresh.mean(df, col), nan_ok=True), col
+        counts, edges = cached.histogram(df, col, 15)
+        fresh_counts, fresh_edges = fresh.histogram(df, col, 15)
+        np.testing.assert_array_equal(counts, fresh_counts, err_msg=col)
+        np.testing.assert_allclose(edges, fresh_edges, err_msg=col)
+    pd.testing.assert_frame_equal(cached.correlation(df, numeric), fresh.correlation(df, numeric), atol=1e-9)
+    pd.testing.assert_frame_equal(cached.correlation(df, numeric), df[numeric].corr(), atol=1e-9)
+
+
+@pytest.mark.parametrize("url, body", OPERATIONS)
+def test_step_keeps_statistics_exact(client, upload, url, body):
+    session_id = upload()
+    prime(client, session_id)
+    clean(client, session_id, url, body)
+    assert_matches_recompute(session_id)
+
+
+def test_chain_of_steps_keeps_statistics_exact(client, upload):
+    session_id = upload()
+    for url, body in [OPERATIONS[4], OPERATIONS[6], OPERATIONS[0], OPERATIONS[8]]:
+        prime(client, session_id)
+        clean(client, session_id, url, body)
+        assert_matches_recompute(session_id)
@@ -0,0 +1,44 @@
+"""CSV sniffing and column labels: every way of reading a file must name columns as scan_shape reports them."""
+import pytest
+
+from storage import build_row_index, iter_batches, load_df, read_rows, scan_shape, sniff_csv
+
+
+@pytest.fixture
+def headerless(tmp_path):
+    path = tmp_path / "headerless.csv"
+    path.write_text("1,2.5,x\n2,3.5,y\n2,3.5,y\n4,,z\n")
+    return str(path)
+
+
+def test_sniff_detects_missing_header(headerless, tmp_path):
+    assert sniff_csv(headerless)["header"] is None
+    with_header = tmp_path / "with_header.csv"
+    with_header.write_text("id,score,label\n1,2.5,x\n2,3.5,y\n")
+    assert sniff_csv(str(with_header))["header"] == 0
+    text_only = tmp_path / "text_only.csv"
+    text_only.write_text("name;city\nann;rome\nbob;oslo\n")
+    options = sniff_csv(str(text_only))
+    assert options["header"] == 0 and options["sep"] == ";"
+
+
+def test_headerless_labels_agree_across_readers(headerless):
+    rows, columns, options = scan_shape(headerless)
+    assert (rows, columns) == (4, ["0", "1", "2"])
+    assert load_df(headerless, options).columns.tolist() == columns
+    assert [batch.columns.tolist() for batch in iter_batches(headerless, options, chunksize=3)] == [columns] * 2
+    index = build_row_index(headerless, options)
+    assert index.columns == columns and index.rows == 4
+    window = read_rows(headerless, options, index, 1, 3, ["0", "2"])
+    assert window.to_dict("list") == {"0": [2, 2], "2": ["y", "y"]}
+
+
+def test_headerless_columns_through_the_api(client, upload, headerless):
+    session_id = upload(headerless)
+    query = {"session_id": session_id}
+    page = client.get("/api/preview", query_string={**query, "columns": "0,1", "sort": "0", "order": "desc"})
+    assert page.status_code == 200, page.get_json()
+    assert page.get_json()["rows"][0] == {"0": 4, "1": None}
+    response = client.post("/api/clean/duplicates", query_string=query, json={"subset": ["1", "2"]})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()["after"]["rows"] == 3
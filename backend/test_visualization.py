@@ -0,0 +1,75 @@
+"""Missing-value heatmaps: exact patterns, both encodings and every sampling strategy."""
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import visualization as viz
+
+
+def frame(columns, rows=500, seed=5):
+    rng = np.random.default_rng(seed)
+    data = {f"c{j}": np.where(rng.random(rows) < 0.2, np.nan, rng.normal(size=rows)) for j in range(columns)}
+    df = pd.DataFrame(data)
+    df["text"] = rng.choice(["a", "b", None], rows)
+    df.iloc[rows - 3:, :] = np.nan  # a rare pattern at the very end
+    return df
+
+
+def decode(heatmap) -> np.ndarray:
+    """The sampled isna() bitmap a heatmap encodes."""
+    rows, columns = len(heatmap["rows"]), len(heatmap["columns"])
+    if heatmap["encoding"] == "bits":
+        packed = np.frombuffer(base64.b64decode(heatmap["bits"]), dtype=np.uint8).reshape(rows, heatmap["row_bytes"])
+        return np.unpackbits(packed, axis=1)[:, :columns].astype(bool)
+    mask = np.zeros((rows, columns), dtype=bool)
+    for j, runs in enumerate(heatmap["runs"]):
+        assert sum(runs) == rows
+        edges = np.cumsum(runs)
+        for k in range(1, len(runs), 2):  # odd runs are missing cells
+            mask[edges[k - 1]:edges[k], j] = True
+    return mask
+
+
+@pytest.mark.parametrize("columns", [5, 63, 64, 130])
+def test_missing_patterns_are_exact(columns):
+    df = frame(columns)
+    labels, patterns = viz.missing_patterns(df)
+    np.testing.assert_array_equal(patterns[labels], df.isna().to_numpy())
+    assert len(patterns) == len({tuple(row) for row in df.isna().to_numpy()})
+    first_seen = pd.unique(labels)
+    np.testing.assert_array_equal(first_seen, np.arange(len(patterns)))  # numbered by first appearance
+
+
+@pytest.mark.parametrize("encoding", viz.HEATMAP_ENCODINGS)
+@pytest.mark.parametrize("strategy", viz.HEATMAP_STRATEGIES)
+def test_heatmap_encodes_the_sampled_rows(strategy, encoding):
+    df = frame(12)
+    heatmap = viz.missing_heatmap(df, max_rows=40, strategy=strategy, encoding=encoding)
+    rows = np.array(heatmap["rows"])
+    assert len(rows) <= 40 and np.all(np.diff(rows) > 0)
+    assert heatmap["total_rows"] == len(df) and heatmap["columns"] == list(df.columns)
+    np.testing.assert_array_equal(decode(heatmap), df.iloc[rows].isna().to_numpy())
+    labels, patterns = viz.missing_patterns(df)
+    assert viz.pattern_heatmap(df.columns, labels, patterns, 40, strategy, encoding) == heatmap
+
+
+def test_sampling_strategies():
+    df = frame(4)
+    assert viz.sample_positions(df, 40, "head").tolist() == list(range(40))
+    uniform = viz.sample_positions(df, 40, "uniform")
+    assert uniform[0] == 0 and uniform[-1] == len(df) - 1 and len(uniform) == 40
+    labels = viz.missing_patterns(df)[0]
+    stratified = viz.sample_positions(df, labels.max() + 10, "stratified")
+    assert set(labels[stratified]) == set(labels)  # every pattern, the rare one at the end included
+    assert len(viz.sample_positions(df, 10, "stratified")) == 10  # more patterns than rows to show
+    assert viz.sample_positions(df.head(10), 40, "stratified").tolist() == list(range(10))
+
+
+def test_unknown_options_are_rejected():
+    df = frame(2)
+    with pytest.raises(ValueError, match="encoding"):
+        viz.missing_heatmap(df, encoding="png")
+    with pytest.raises(ValueError, match="strategy"):
+        viz.missing_heatmap(df, strategy="random")
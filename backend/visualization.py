@@ -1,6 +1,13 @@
+import base64
+
 import pandas as pd
 import numpy as np
 
+from parallel import map_columns
+
+HEATMAP_STRATEGIES = ("head", "uniform", "stratified")
+HEATMAP_ENCODINGS = ("rle", "bits")
+
 
 def safe_float(val):
     """Convert numpy/pandas scalar to plain Python float."""
@@ -9,18 +16,23 @@ def safe_float(val):
     return float(val)
 
 
-def bar_chart_data(df: pd.DataFrame) -> list:
-    """Top categorical column value counts as bar chart data."""
+def bar_chart_data(df: pd.DataFrame, stats=None) -> list:
+    """Top categorical column value counts as bar chart data.
+
+    ``stats`` (a ``stats.FrameStats`` of ``df``) supplies cached counts and means.
+    """
     result = []
     cat_cols = df.select_dtypes(include=["object", "category"]).columns
     num_cols = df.select_dtypes(include=[np.number]).columns
 
     # Categorical bar charts
     for col in list(cat_cols)[:3]:
-        counts = df[col].value_counts().head(10)
+        counts = df[col].value_counts() if stats is None else stats.value_counts(df, col)
+        counts = counts[counts > 0].head(10)  # categoricals count unused categories as zero
         result.append({
             "type": "bar",
             "title": f"Value Counts – {col}",
+            "column": col,
             "data": [{"label": str(k), "value": int(v)} for k, v in counts.items()],
             "xKey": "label",
             "yKey": "value",
@@ -28,7 +40,10 @@ def bar_chart_data(df: pd.DataFrame) -> list:
 
     # Numeric mean bars
     if len(num_cols) >= 2:
-        means = df[num_cols].mean().dropna()
+        if stats is None:
+            means = df[num_cols].mean().dropna()
+        else:
+            means = pd.Series({col: stats.mean(df, col) for col in num_cols}, dtype="float64").dropna()
         result.append({
             "type": "bar",
             "title": "Column Means (Numeric)",
@@ -40,14 +55,26 @@ def bar_chart_data(df: pd.DataFrame) -> list:
     return result
 
 
-def histogram_data(df: pd.DataFrame, bins: int = 15) -> list:
+def _histograms(frame: pd.DataFrame, bins: int) -> dict:
+    return {col: np.histogram(frame[col].dropna(), bins=bins) for col in frame.columns}
+
+
+def histogram_data(df: pd.DataFrame, bins: int = 15, stats=None, executor=None) -> list:
+    """Histograms of the first numeric columns.
+
+    ``stats`` (a ``stats.FrameStats`` of ``df``) supplies cached bins;
+    otherwise ``executor`` splits the columns across its workers.
+    """
     result = []
-    num_cols = df.select_dtypes(include=[np.number]).columns
-    for col in list(num_cols)[:4]:
-        series = df[col].dropna()
-        if len(series) == 0:
+    num_cols = list(df.select_dtypes(include=[np.number]).columns)[:4]
+    if stats is not None:
+        hists = stats.histograms(df, num_cols, bins)
+    else:
+        hists = map_columns(_histograms, df[num_cols], bins, executor=executor)
+    for col in num_cols:
+        counts, bin_edges = hists[col]
+        if counts.sum() == 0:
             continue
-        counts, bin_edges = np.histogram(series, bins=bins)
         data = []
         for i in range(len(counts)):
             data.append({
@@ -65,42 +92,57 @@ def histogram_data(df: pd.DataFrame, bins: int = 15) -> list:
     return result
 
 
-def boxplot_data(df: pd.DataFrame) -> list:
-    result = []
-    num_cols = df.select_dtypes(include=[np.number]).columns
-    for col in list(num_cols)[:5]:
-        series = df[col].dropna()
+def _boxplots(frame: pd.DataFrame, sketches: dict | None = None) -> dict:
+    """Box plot entry of each column of ``frame``; None for all-null columns."""
+    result = {}
+    for col in frame.columns:
+        series = frame[col].dropna()
         if len(series) == 0:
+            result[col] = None
             continue
-        Q1 = series.quantile(0.25)
-        Q3 = series.quantile(0.75)
+        if sketches is not None:
+            Q1, median, Q3 = sketches[col].quantiles([0.25, 0.5, 0.75])
+        else:
+            Q1 = series.quantile(0.25)
+            median = series.median()
+            Q3 = series.quantile(0.75)
         IQR = Q3 - Q1
         lower_fence = Q1 - 1.5 * IQR
         upper_fence = Q3 + 1.5 * IQR
         whisker_low = float(series[series >= lower_fence].min())
         whisker_high = float(series[series <= upper_fence].max())
         outliers = series[(series < lower_fence) | (series > upper_fence)].tolist()
-        result.append({
+        result[col] = {
             "type": "boxplot",
             "title": f"Box Plot – {col}",
             "column": col,
             "min": safe_float(series.min()),
             "Q1": safe_float(Q1),
-            "median": safe_float(series.median()),
+            "median": safe_float(median),
             "Q3": safe_float(Q3),
             "max": safe_float(series.max()),
             "whisker_low": safe_float(whisker_low),
             "whisker_high": safe_float(whisker_high),
             "outliers": [safe_float(o) for o in outliers[:50]],
-        })
+        }
     return result
 
 
-def correlation_matrix(df: pd.DataFrame) -> dict:
+def boxplot_data(df: pd.DataFrame, sketches: dict | None = None, executor=None) -> list:
+    """Box plot summaries; quartiles come from ``sketches`` when given.
+
+    ``executor`` (a ``parallel.ColumnExecutor``) splits the columns across its workers.
+    """
+    num_cols = list(df.select_dtypes(include=[np.number]).columns)[:5]
+    boxes = map_columns(_boxplots, df[num_cols], sketches, executor=executor)
+    return [boxes[col] for col in num_cols if boxes[col] is not None]
+
+
+def correlation_matrix(df: pd.DataFrame, stats=None) -> dict:
     num_cols = df.select_dtypes(include=[np.number]).columns
     if len(num_cols) < 2:
         return {"columns": [], "matrix": []}
-    corr = df[num_cols].corr()
+    corr = df[num_cols].corr() if stats is None else stats.correlation(df, list(num_cols))
     columns = list(corr.columns)
     matrix = []
     for row_col in columns:
@@ -112,51 +154,153 @@ def correlation_matrix(df: pd.DataFrame) -> dict:
     return {"columns": columns, "matrix": matrix}
 
 
-def missing_heatmap(df: pd.DataFrame) -> dict:
-    cols = df.columns.tolist()
-    rows = []
-    sample = df.head(100)
-    for idx, row in sample.iterrows():
-        row_data = {}
-        for col in cols:
-            row_data[col] = 1 if pd.isna(row[col]) else 0
-        rows.append({"row": int(idx), **row_data})
-    return {"columns": cols, "rows": rows}
+def missing_patterns(df: pd.DataFrame) -> tuple:
+    """``(labels, patterns)``: each row's missing-value pattern id and each pattern's isna() row.
 
+    Pattern ids number the distinct patterns in order of first appearance,
+    so ``patterns[labels]`` is the frame's whole isna() bitmap.
+    """
+    # Each row's isna() bits packed into whole 64-bit words: an exact key of its pattern
+    width = max(1, -(-df.shape[1] // 64)) * 8
+    packed = np.zeros((len(df), width), dtype=np.uint8)
+    for j in range(df.shape[1]):
+        packed[:, j // 8] |= df.iloc[:, j].isna().to_numpy(dtype=np.uint8) << np.uint8(7 - j % 8)
+    if width == 8:
+        labels = pd.factorize(packed.view(np.uint64).ravel())[0]
+    else:
+        keys = packed.view(np.dtype((np.void, width))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.empty(len(first), dtype=np.intp)
+        order[np.argsort(first)] = np.arange(len(first))  # number patterns by first appearance
+        labels = order[inverse.ravel()]
+    _, first = np.unique(labels, return_index=True)
+    return labels, df.iloc[first].isna().to_numpy()
 
-def before_after_comparison(before_df: pd.DataFrame, after_df: pd.DataFrame) -> list:
-    result = []
-    # Row / column counts
-    result.append({
-        "type": "bar",
-        "title": "Row Count: Before vs After",
-        "data": [
-            {"label": "Before", "value": len(before_df)},
-            {"label": "After", "value": len(after_df)},
-        ],
-        "xKey": "label",
-        "yKey": "value",
-    })
-    # Missing values
-    result.append({
-        "type": "bar",
-        "title": "Missing Values: Before vs After",
-        "data": [
-            {"label": "Before", "value": int(before_df.isnull().sum().sum())},
-            {"label": "After", "value": int(after_df.isnull().sum().sum())},
-        ],
-        "xKey": "label",
-        "yKey": "value",
-    })
-    # Duplicate rows
-    result.append({
-        "type": "bar",
-        "title": "Duplicate Rows: Before vs After",
-        "data": [
-            {"label": "Before", "value": int(before_df.duplicated().sum())},
-            {"label": "After", "value": int(after_df.duplicated().sum())},
-        ],
-        "xKey": "label",
-        "yKey": "value",
-    })
+
+def sample_positions(df: pd.DataFrame | None, n: int, strategy: str = "head",
+                     labels: np.ndarray | None = None) -> np.ndarray:
+    """Sorted row positions of an ``n``-row sample of ``df``.
+
+    "head" takes the first rows, "uniform" spreads the sample evenly over the
+    whole frame, and "stratified" groups rows by their missing-value pattern
+    and samples each pattern in proportion to its size, with at least one
+    row per pattern while the sample has room, so rare patterns still show up.
+    Pass the ``labels`` of :func:`missing_patterns` to sample without ``df``.
+    """
+    total = len(df) if labels is None else len(labels)
+    if strategy not in HEATMAP_STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+    if total <= n:
+        return np.arange(total)
+    if strategy == "head":
+        return np.arange(n)
+    if strategy == "uniform":
+        return np.unique(np.linspace(0, total - 1, n).round().astype(np.int64))
+
+    if labels is None:
+        labels = missing_patterns(df)[0]
+    counts = np.bincount(labels)
+    # One row per pattern, the rest of the sample shared in proportion to pattern size: never more than n
+    quota = np.minimum(counts, 1 + max(n - len(counts), 0) * counts // total)
+    # Rows grouped by pattern (in file order); take `quota` evenly spaced ranks of each group
+    order = np.argsort(labels, kind="stable")
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(total) - np.repeat(starts, counts)
+    size, q = np.repeat(counts, counts), np.repeat(quota, counts)
+    positions = np.sort(order[(rank * q) // size != ((rank - 1) * q) // size])
+    if len(positions) > n:  # more patterns than rows to show
+        positions = positions[np.linspace(0, len(positions) - 1, n).astype(np.int64)]
+    return positions
+
+
+def missing_heatmap(df: pd.DataFrame, max_rows: int = 100, strategy: str = "head",
+                    encoding: str = "rle") -> dict:
+    """Missing-value map of a row sample, built from one isna() bitmap.
+
+    ``encoding="rle"`` gives, per column, alternating run lengths of present
+    and missing cells starting with a present run (possibly 0).
+    ``encoding="bits"`` packs the sample row-major, one bit per cell (1 =
+    missing, most significant bit first), ``row_bytes`` bytes per row,
+    base64-encoded. ``rows`` holds the sampled row positions.
+    """
+    if encoding not in HEATMAP_ENCODINGS:
+        raise ValueError(f"Unknown heatmap encoding: {encoding}")
+    positions = sample_positions(df, max_rows, strategy)
+    return _heatmap(df.columns, positions, len(df), df.iloc[positions].isna().to_numpy(), strategy, encoding)
+
+
+def pattern_heatmap(columns: list, labels: np.ndarray, patterns: np.ndarray, max_rows: int = 100,
+                    strategy: str = "head", encoding: str = "rle") -> dict:
+    """:func:`missing_heatmap` of the frame that :func:`missing_patterns` gave ``labels`` and ``patterns``."""
+    if encoding not in HEATMAP_ENCODINGS:
+        raise ValueError(f"Unknown heatmap encoding: {encoding}")
+    positions = sample_positions(None, max_rows, strategy, labels)
+    return _heatmap(columns, positions, len(labels), patterns[labels[positions]], strategy, encoding)
+
+
+def _heatmap(columns, positions: np.ndarray, total: int, mask: np.ndarray, strategy: str, encoding: str) -> dict:
+    result = {
+        "columns": [str(c) for c in columns],
+        "rows": positions.tolist(),
+        "total_rows": total,
+        "strategy": strategy,
+        "encoding": encoding,
+    }
+    if encoding == "bits":
+        packed = np.packbits(mask, axis=1)
+        result["row_bytes"] = packed.shape[1]
+        result["bits"] = base64.b64encode(packed.tobytes()).decode("ascii")
+        return result
+
+    runs = []
+    for column in mask.T:
+        edges = np.flatnonzero(np.diff(column)) + 1
+        lengths = np.diff(np.concatenate([[0], edges, [len(column)]])).tolist()
+        runs.append([0] + lengths if len(column) and column[0] else lengths)
+    result["runs"] = runs
     return result
+
+
+def _duplicate_count(df: pd.DataFrame, fingerprints: np.ndarray | None) -> int:
+    if fingerprints is None:
+        return int(df.duplicated().sum())
+    return int(pd.Series(fingerprints).duplicated().sum())
+
+
+def frame_counts(df: pd.DataFrame, fingerprints: np.ndarray | None = None,
+                 null_counts: pd.Series | None = None) -> dict:
+    """Row, missing-cell and duplicate-row counts of a frame, as compared before and after cleaning.
+
+    Cached ``cleaning.row_fingerprints`` and per-column ``null_counts``
+    skip rescanning the rows.
+    """
+    missing = df.isnull().sum() if null_counts is None else null_counts
+    return {"rows": len(df), "missing": int(missing.sum()), "duplicates": _duplicate_count(df, fingerprints)}
+
+
+def before_after_chart(before: dict, after: dict) -> list:
+    """Bar charts of two :func:`frame_counts` results (or anything with the same keys)."""
+    return [
+        {
+            "type": "bar",
+            "title": f"{title}: Before vs After",
+            "data": [
+                {"label": "Before", "value": before[key]},
+                {"label": "After", "value": after[key]},
+            ],
+            "xKey": "label",
+            "yKey": "value",
+        }
+        for key, title in (("rows", "Row Count"), ("missing", "Missing Values"), ("duplicates", "Duplicate Rows"))
+    ]
+
+
+def before_after_comparison(before_df: pd.DataFrame, after_df: pd.DataFrame,
+                            before_fingerprints: np.ndarray | None = None,
+                            after_fingerprints: np.ndarray | None = None) -> list:
+    """Row, missing and duplicate counts of the two frames.
+
+    Pass cached ``cleaning.row_fingerprints`` to count duplicates without
+    rescanning the rows.
+    """
+    return before_after_chart(frame_counts(before_df, before_fingerprints), frame_counts(after_df, after_fingerprints))
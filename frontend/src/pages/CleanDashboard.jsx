@@ -4,7 +4,7 @@ import toast from 'react-hot-toast'
 import { useApp } from '../context/AppContext'
 import {
     fetchSummary, cleanMissing, cleanDuplicates,
-    cleanOutliers, cleanNormalize, cleanStandardize, resetDataset,
+    cleanOutliers, cleanNormalize, cleanStandardize, cleanPipeline, resetDataset,
 } from '../services/api'
 import StatCard from '../components/StatCard'
 import QualityScore from '../components/QualityScore'
@@ -16,6 +16,14 @@ import {
 
 const STRATEGIES = ['mean', 'median', 'mode', 'drop']
 
+// Pipeline step for each suggested action (see /api/clean/pipeline)
+const SUGGESTION_STEPS = {
+    fill_missing: (strategy) => ({ op: 'missing', strategy }),
+    remove_duplicates: () => ({ op: 'duplicates' }),
+    remove_outliers: () => ({ op: 'outliers' }),
+    normalize: () => ({ op: 'normalize' }),
+}
+
 export default function CleanDashboard() {
     const navigate = useNavigate()
     const { sessionId, summary, setSummary, addCleaningLog } = useApp()
@@ -43,7 +51,11 @@ export default function CleanDashboard() {
         setLoading(true); setLoadingMsg(`${label}…`)
         try {
             const res = await fn()
-            addCleaningLog({ label, before: res.data.before, after: res.data.after, message: res.data.message })
+            const fills = Object.entries(res.data.fill_values || {})
+            const message = fills.length
+                ? `${res.data.message} Filled ${fills.map(([col, v]) => `${col}=${typeof v === 'number' ? +v.toFixed(4) : v}`).join(', ')}.`
+                : res.data.message
+            addCleaningLog({ label, before: res.data.before, after: res.data.after, message, fillValues: res.data.fill_values })
             toast.success(res.data.message)
             await loadSummary()
         } catch (err) {
@@ -148,7 +160,9 @@ export default function CleanDashboard() {
                                 <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(200px, 1fr))', gap: '0.6rem', marginTop: '0.25rem' }}>
                                     {[
                                         { label: 'Remove Duplicates', fn: () => cleanDuplicates(sessionId), icon: <Layers size={15} />, color: '#fbbf24' },
+                                        { label: 'Remove Near-Duplicates', fn: () => cleanDuplicates(sessionId, { near: true }), icon: <Layers size={15} />, color: '#facc15' },
                                         { label: 'Remove Outliers', fn: () => cleanOutliers(sessionId), icon: <TrendingDown size={15} />, color: '#f97316' },
+                                        { label: 'Cap Outliers', fn: () => cleanOutliers(sessionId, 'clip'), icon: <TrendingDown size={15} />, color: '#fb923c' },
                                         { label: 'Normalize (0–1)', fn: () => cleanNormalize(sessionId), icon: <RefreshCw size={15} />, color: '#6366f1' },
                                         { label: 'Standardize (Z)', fn: () => cleanStandardize(sessionId), icon: <RefreshCw size={15} />, color: '#22d3ee' },
                                     ].map(({ label, fn, icon, color }) => (
@@ -173,9 +187,20 @@ export default function CleanDashboard() {
                     {/* Suggestions */}
                     {s.suggestions?.length > 0 && (
                         <div className="card" style={{ marginBottom: '1.5rem' }}>
-                            <h3 style={{ fontWeight: 700, fontSize: '1rem', color: 'var(--text-primary)', marginBottom: '1rem' }}>
-                                💡 Suggested Actions
-                            </h3>
+                            <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '1rem' }}>
+                                <h3 style={{ fontWeight: 700, fontSize: '1rem', color: 'var(--text-primary)' }}>
+                                    💡 Suggested Actions
+                                </h3>
+                                <button
+                                    className="btn-primary"
+                                    onClick={() => runAction('Apply All Suggestions', () => cleanPipeline(
+                                        sessionId,
+                                        s.suggestions.filter((sug) => SUGGESTION_STEPS[sug.action]).map((sug) => SUGGESTION_STEPS[sug.action](missingStrategy)),
+                                    ))}
+                                >
+                                    <Zap size={15} /> Apply All
+                                </button>
+                            </div>
                             <div style={{ display: 'flex', flexDirection: 'column', gap: '0.5rem' }}>
                                 {s.suggestions.map((sug) => (
                                     <div key={sug.action} style={{
@@ -51,7 +51,7 @@ export default function Export() {
                             <p style={{ fontSize: '0.82rem', color: 'var(--text-muted)' }}>Comma-separated values format</p>
                         </div>
                     </div>
-                    <button className="btn-primary" onClick={() => { downloadCleaned(sessionId, 'csv'); toast.success('Downloading CSV…') }}>
+                    <button className="btn-primary" onClick={() => { toast.success('Preparing CSV…'); downloadCleaned(sessionId, 'csv').catch(() => toast.error('CSV export failed.')) }}>
                         <Download size={16} /> Download CSV
                     </button>
                 </div>
@@ -67,7 +67,7 @@ export default function Export() {
                             <p style={{ fontSize: '0.82rem', color: 'var(--text-muted)' }}>XLSX format for Excel / Sheets</p>
                         </div>
                     </div>
-                    <button className="btn-primary" style={{ background: 'linear-gradient(135deg,#4ade80,#22c55e)' }} onClick={() => { downloadCleaned(sessionId, 'xlsx'); toast.success('Downloading XLSX…') }}>
+                    <button className="btn-primary" style={{ background: 'linear-gradient(135deg,#4ade80,#22c55e)' }} onClick={() => { toast.success('Preparing XLSX…'); downloadCleaned(sessionId, 'xlsx').catch(() => toast.error('XLSX export failed.')) }}>
                         <Download size={16} /> Download XLSX
                     </button>
                 </div>
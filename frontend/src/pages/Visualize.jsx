@@ -6,10 +6,13 @@ import {
 } from 'recharts'
 import toast from 'react-hot-toast'
 import { useApp } from '../context/AppContext'
-import { fetchVisualize } from '../services/api'
+import { fetchVisualize, fetchVisualizeExact } from '../services/api'
 import Loader from '../components/Loader'
 import { AlertTriangle, RefreshCw } from 'lucide-react'
 
+// rows of the fast preview; larger datasets show sampled charts until the exact ones are ready
+const PREVIEW_SAMPLE = 100000
+
 const COLORS = ['#6366f1', '#22d3ee', '#4ade80', '#fbbf24', '#f87171', '#a78bfa', '#fb923c']
 const corrColor = (v) => {
     if (v === null) return '#1e293b'
@@ -30,6 +33,7 @@ export default function Visualize() {
     const { sessionId } = useApp()
     const [data, setData] = useState(null)
     const [loading, setLoading] = useState(false)
+    const [refining, setRefining] = useState(false)
 
     useEffect(() => {
         if (sessionId) loadData()
@@ -38,13 +42,24 @@ export default function Visualize() {
     const loadData = async () => {
         setLoading(true)
         try {
-            const res = await fetchVisualize(sessionId)
+            const res = await fetchVisualize(sessionId, { sample: PREVIEW_SAMPLE })
             setData(res.data)
+            if (res.data.sample) loadExact()
         } catch {
             toast.error('Failed to load visualizations.')
         } finally { setLoading(false) }
     }
 
+    const loadExact = async () => {
+        setRefining(true)
+        try {
+            const res = await fetchVisualizeExact(sessionId)
+            setData(res.data)
+        } catch {
+            toast.error('Failed to compute exact charts.')
+        } finally { setRefining(false) }
+    }
+
     if (!sessionId) {
         return (
             <div style={{ textAlign: 'center', padding: '5rem 2rem', color: 'var(--text-muted)' }}>
@@ -63,6 +78,12 @@ export default function Visualize() {
                 <div>
                     <h1 style={{ fontSize: '1.8rem', fontWeight: 800, color: 'var(--text-primary)' }}>Visualizations</h1>
                     <p style={{ color: 'var(--text-secondary)' }}>Interactive charts for your dataset</p>
+                    {data?.sample && (
+                        <p style={{ color: 'var(--text-muted)', fontSize: '0.85rem' }}>
+                            Approximate: based on {data.sample.rows.toLocaleString()} of {data.sample.total_rows.toLocaleString()} rows
+                            {refining ? ' — computing exact charts…' : ''}
+                        </p>
+                    )}
                 </div>
                 <button className="btn-secondary" onClick={loadData}><RefreshCw size={15} />Refresh</button>
             </div>
@@ -9,6 +9,50 @@ const api = axios.create({
     timeout: 30000,
 })
 
+// ── Server timing ───────────────────────────────────────────────────────────
+// Opt in with VITE_SERVER_TIMING=1 (or localStorage.serverTiming = '1'): requests then ask for a
+// Server-Timing header listing where the server spent its time (see backend/metrics.py)
+const SERVER_TIMING =
+    import.meta.env.VITE_SERVER_TIMING === '1' || globalThis.localStorage?.getItem('serverTiming') === '1'
+const timingListeners = new Set()
+
+// 'load_df;dur=2.45;desc="1x", total;dur=37.4' → [{ name, duration (ms), description }, ...]
+export const parseServerTiming = (header) =>
+    (header || '').split(',').filter((entry) => entry.trim()).map((entry) => {
+        const [name, ...params] = entry.trim().split(';')
+        const timing = { name, duration: null, description: '' }
+        params.forEach((param) => {
+            const [key, value = ''] = param.trim().split('=')
+            if (key === 'dur') timing.duration = Number(value)
+            if (key === 'desc') timing.description = value.replace(/^"|"$/g, '')
+        })
+        return timing
+    })
+
+// listener({ url, timings }) is called for every response that carries timings; returns an unsubscribe function
+export const onServerTiming = (listener) => {
+    timingListeners.add(listener)
+    return () => timingListeners.delete(listener)
+}
+
+const reportTiming = (url, header) => {
+    if (!SERVER_TIMING || !header) return
+    const timings = parseServerTiming(header)
+    console.debug(`Server-Timing ${url}`, timings)
+    timingListeners.forEach((listener) => listener({ url, timings }))
+}
+
+if (SERVER_TIMING) {
+    api.interceptors.request.use((config) => {
+        config.headers['X-Server-Timing'] = '1'
+        return config
+    })
+    api.interceptors.response.use((res) => {
+        reportTiming(res.config.url, res.headers['server-timing'])
+        return res
+    })
+}
+
 // ── Upload ──────────────────────────────────────────────────────────────────
 export const uploadFile = (file, onProgress) => {
     const formData = new FormData()
@@ -21,37 +65,142 @@ export const uploadFile = (file, onProgress) => {
     })
 }
 
+// ── Columnar payloads ───────────────────────────────────────────────────────
+// With ?format=columnar the server sends tables as { $table: { columns, data, index? } }
+// (one array per column, see backend/compact.py); this restores records / keyed objects
+export const decodeColumnar = (value) => {
+    if (Array.isArray(value)) return value.map(decodeColumnar)
+    if (value === null || typeof value !== 'object') return value
+    const table = value.$table
+    if (table && Object.keys(value).length === 1) {
+        const data = table.data.map(decodeColumnar)
+        const length = data.length ? data[0].length : (table.index?.length ?? 0)
+        const rows = Array.from({ length }, (_, i) => {
+            const row = {}
+            table.columns.forEach((col, j) => { row[col] = data[j][i] })
+            return row
+        })
+        return table.index ? Object.fromEntries(table.index.map((key, i) => [key, rows[i]])) : rows
+    }
+    return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, decodeColumnar(item)]))
+}
+
+const decodeResponse = (res) => ({ ...res, data: decodeColumnar(res.data) })
+
+// ── Conditional requests ────────────────────────────────────────────────────
+// Summary and chart payloads carry an ETag of the session's data version; a revisit
+// sends it back as If-None-Match and gets an empty 304 while the data is unchanged
+const validated = new Map() // request key -> { etag, data }
+
+const conditionalHeaders = (key) => {
+    const cached = validated.get(key)
+    return cached ? { 'If-None-Match': cached.etag } : {}
+}
+
+const remember = (key, etag, data) => {
+    if (etag) validated.set(key, { etag, data })
+    return data
+}
+
+const acceptNotModified = (status) => (status >= 200 && status < 300) || status === 304
+
+// ── Jobs ────────────────────────────────────────────────────────────────────
+// Long operations run as background jobs on the server: submit, then poll
+// until done, so large files are not cut off by the request timeout.
+export const submitJob = (sessionId, kind, params = {}, args = {}, headers = {}) =>
+    api.post('/jobs', { kind, params, args }, { params: { session_id: sessionId }, headers, validateStatus: acceptNotModified })
+
+export const fetchJob = (jobId) => api.get(`/jobs/${jobId}`)
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+// Resolves like an axios response ({ data: result, job }); onProgress(progress 0–1, message) while it runs.
+// With an If-None-Match header a still-current result resolves { notModified: true } without running
+export const runJob = async (sessionId, kind, params = {}, args = {}, onProgress, headers = {}) => {
+    const submitted = await submitJob(sessionId, kind, params, args, headers)
+    if (submitted.status === 304) return { data: null, job: null, notModified: true }
+    let job = submitted.data
+    for (let delay = 100; job.status === 'queued' || job.status === 'running'; delay = Math.min(delay * 2, 1000)) {
+        await sleep(delay)
+        job = (await fetchJob(job.job_id)).data
+        if (onProgress) onProgress(job.progress, job.message)
+    }
+    if (job.status === 'failed') throw { response: { data: { error: job.error } } }
+    reportTiming(`/jobs/${kind}`, job.timing)
+    return { data: job.result, job }
+}
+
 // ── Preview ─────────────────────────────────────────────────────────────────
-export const fetchPreview = (sessionId, n = 50) =>
-    api.get('/preview', { params: { session_id: sessionId, n } })
+// options: { offset, columns: [names], sort, order: 'asc' | 'desc', filters: [{ column, op, value }] }
+// res.data.total_rows counts the rows passing the filters; res.data.row_numbers gives each row's position
+export const fetchPreview = (sessionId, limit = 50, options = {}) => {
+    const { columns, filters, ...rest } = options
+    return api.get('/preview', {
+        params: {
+            session_id: sessionId,
+            limit,
+            format: 'columnar',
+            ...rest,
+            ...(columns ? { columns: columns.join(',') } : {}),
+            ...(filters ? { filters: JSON.stringify(filters) } : {}),
+        },
+    }).then(decodeResponse)
+}
 
 // ── Summary ─────────────────────────────────────────────────────────────────
-export const fetchSummary = (sessionId) =>
-    api.get('/summary', { params: { session_id: sessionId } })
+// options: { sample: N } profiles N sampled rows; res.data.sample then lists the approximate
+// fields, whose counts carry an `interval` (see backend/sampling.py)
+export const fetchSummary = async (sessionId, options = {}) => {
+    const args = { format: 'columnar', ...(options.sample ? { sample: options.sample } : {}) }
+    const key = `summary:${sessionId}:${options.sample || ''}`
+    const res = await runJob(sessionId, 'summary', {}, args, undefined, conditionalHeaders(key))
+    if (res.notModified) return { ...res, data: validated.get(key).data }
+    return { ...res, data: remember(key, res.job.etag, decodeColumnar(res.data)) }
+}
 
 // ── Cleaning ─────────────────────────────────────────────────────────────────
-export const cleanMissing = (sessionId, strategy = 'mean') =>
-    api.post('/clean/missing', { strategy }, { params: { session_id: sessionId } })
+export const cleanMissing = (sessionId, strategy = 'mean') => runJob(sessionId, 'missing', { strategy })
+
+// options: { subset: [columns] } to match on a key, { near: true } to ignore case/whitespace/float noise
+export const cleanDuplicates = (sessionId, options = {}) => runJob(sessionId, 'duplicates', options)
 
-export const cleanDuplicates = (sessionId) =>
-    api.post('/clean/duplicates', {}, { params: { session_id: sessionId } })
+// mode: 'drop' removes outlier rows, 'clip' caps values to the IQR fences
+export const cleanOutliers = (sessionId, mode = 'drop') => runJob(sessionId, 'outliers', { mode })
 
-export const cleanOutliers = (sessionId) =>
-    api.post('/clean/outliers', {}, { params: { session_id: sessionId } })
+export const cleanNormalize = (sessionId) => runJob(sessionId, 'normalize')
 
-export const cleanNormalize = (sessionId) =>
-    api.post('/clean/normalize', {}, { params: { session_id: sessionId } })
+export const cleanStandardize = (sessionId) => runJob(sessionId, 'standardize')
 
-export const cleanStandardize = (sessionId) =>
-    api.post('/clean/standardize', {}, { params: { session_id: sessionId } })
+// steps: [{ op: 'missing', strategy }, { op: 'duplicates', subset, near }, { op: 'outliers', mode }, { op: 'normalize' }, { op: 'standardize' }]
+// runs every step on one in-memory frame and saves once; res.data.steps has per-step metrics and ms
+export const cleanPipeline = (sessionId, steps, onProgress) => runJob(sessionId, 'pipeline', { steps }, {}, onProgress)
 
 // ── Visualize ────────────────────────────────────────────────────────────────
-export const fetchVisualize = (sessionId) =>
-    api.get('/visualize', { params: { session_id: sessionId } })
+// options: { sample: N } computes the charts on N sampled rows (fast preview, res.data.sample set)
+export const fetchVisualize = async (sessionId, options = {}) => {
+    const key = `visualize:${sessionId}:${options.sample || ''}`
+    const res = await api.get('/visualize', {
+        params: { session_id: sessionId, format: 'columnar', ...(options.sample ? { sample: options.sample } : {}) },
+        headers: conditionalHeaders(key),
+        validateStatus: acceptNotModified,
+    })
+    if (res.status === 304) return { ...res, data: validated.get(key).data }
+    return { ...res, data: remember(key, res.headers.etag, decodeColumnar(res.data)) }
+}
+
+// the exact charts, computed by a background job (for replacing a sampled preview)
+export const fetchVisualizeExact = async (sessionId, onProgress) => {
+    const key = `visualize:${sessionId}:`
+    const res = await runJob(sessionId, 'visualize', {}, { format: 'columnar' }, onProgress, conditionalHeaders(key))
+    if (res.notModified) return { ...res, data: validated.get(key).data }
+    return { ...res, data: remember(key, res.job.etag, decodeColumnar(res.data)) }
+}
 
 // ── Download ─────────────────────────────────────────────────────────────────
-export const downloadCleaned = (sessionId, format = 'csv') => {
-    window.location.href = `${BASE_URL}/download?session_id=${sessionId}&format=${format}`
+// the file is written by a background job, then fetched from its result URL
+export const downloadCleaned = async (sessionId, format = 'csv') => {
+    const { job } = await runJob(sessionId, 'download', {}, { format })
+    window.location.href = `${BASE_URL}/jobs/${job.job_id}/result`
 }
 
 export const downloadReport = (sessionId) => {